@@ -0,0 +1,125 @@
+import cProfile
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import HTMLResponse, JSONResponse, PlainTextResponse
+from fastapi.templating import Jinja2Templates
+from api.auth import verify_auth
+from scripts.settings import settings
+from scripts.tracing import Tracer
+from scripts.profiler import CPU, Memory, RequestProfiles
+from scripts.logger import logger
+
+router = APIRouter(prefix="/debug", tags=["Debug"], dependencies=[Depends(verify_auth)])
+templates = Jinja2Templates(directory=str(settings.templates_path))
+
+PROFILE_HEADER = "X-Profile"
+
+
+@router.get("/trace/{event_id}", response_class=HTMLResponse)
+async def trace_timeline(request: Request, event_id: int, format: str = "html"):
+    """事件从上传到入库的各阶段时间线，format=json 时返回原始数据"""
+    timeline = Tracer.timeline(event_id)
+    if not timeline:
+        raise HTTPException(404, "该事件没有 trace 记录")
+    if format == "json":
+        return JSONResponse(timeline)
+    return templates.TemplateResponse("trace.html", {"request": request, "trace": timeline})
+
+
+# ---- CPU 采样 ----
+@router.post("/profile/cpu/start")
+async def cpu_start(interval: float = 0.01):
+    if not 0.001 <= interval <= 1:
+        raise HTTPException(400, "interval 需在 0.001 ~ 1 秒之间")
+    if not CPU.start(interval):
+        raise HTTPException(409, "CPU 采样已在运行")
+    logger.info(f"[debug] CPU 采样开始 interval={interval}")
+    return CPU.status()
+
+
+@router.get("/profile/cpu")
+async def cpu_status():
+    return CPU.status()
+
+
+@router.post("/profile/cpu/stop", response_class=PlainTextResponse)
+async def cpu_stop():
+    """返回 folded 栈，可直接交给 flamegraph.pl 或 speedscope"""
+    if not CPU.running:
+        raise HTTPException(409, "CPU 采样未启动")
+    folded = CPU.stop()
+    logger.info(f"[debug] CPU 采样结束 samples={CPU.samples}")
+    return PlainTextResponse(folded, headers={"Content-Disposition": "attachment; filename=cpu.folded"})
+
+
+# ---- 内存快照 ----
+@router.post("/memory/start")
+async def memory_start(frames: int = 10):
+    if not Memory.start(frames):
+        raise HTTPException(409, "tracemalloc 已在运行")
+    logger.info(f"[debug] tracemalloc 开始 frames={frames}")
+    return {"msg": "tracemalloc 已启动", "frames": frames}
+
+
+@router.post("/memory/snapshot")
+async def memory_snapshot():
+    try:
+        return Memory.snapshot()
+    except RuntimeError as e:
+        raise HTTPException(409, str(e))
+
+
+@router.get("/memory/snapshots")
+async def memory_snapshots():
+    return {"snapshots": Memory.list()}
+
+
+@router.get("/memory/diff")
+async def memory_diff(base: str, target: str = None, top: int = 20, key_type: str = "lineno"):
+    if key_type not in ("lineno", "filename", "traceback"):
+        raise HTTPException(400, "key_type 只能是 lineno / filename / traceback")
+    try:
+        return {"base": base, "target": target, "stats": Memory.diff(base, target, top, key_type)}
+    except KeyError as e:
+        raise HTTPException(404, str(e))
+
+
+@router.post("/memory/stop")
+async def memory_stop():
+    Memory.stop()
+    logger.info("[debug] tracemalloc 已停止")
+    return {"msg": "tracemalloc 已停止"}
+
+
+# ---- 单请求分析 ----
+@router.get("/profile/request/{profile_id}", response_class=PlainTextResponse)
+async def request_profile(profile_id: str):
+    result = RequestProfiles.get(profile_id)
+    if result is None:
+        raise HTTPException(404, "分析结果不存在或已过期")
+    return PlainTextResponse(result)
+
+
+async def profile_request(request: Request, call_next):
+    """
+    请求带 X-Profile 头且已登录时，用 cProfile 记录本次请求，
+    结果 ID 通过响应头 X-Profile-Id 返回；不带该头时只多一次字典查找。
+    注意 cProfile 只记录事件循环线程，同步路由在线程池里执行的部分不在其中。
+    """
+    if PROFILE_HEADER.lower() not in request.headers:
+        return await call_next(request)
+    if request.cookies.get(settings.cookie_name) != "true":
+        return await call_next(request)
+    if not RequestProfiles.busy.acquire(blocking=False):
+        response = await call_next(request)
+        response.headers["X-Profile-Id"] = "busy"
+        return response
+
+    profile = cProfile.Profile()
+    try:
+        profile.enable()
+        response = await call_next(request)
+    finally:
+        profile.disable()
+        RequestProfiles.busy.release()
+    response.headers["X-Profile-Id"] = RequestProfiles.save(profile, f"{request.method} {request.url.path}")
+    return response
@@ -1,7 +1,16 @@
 from fastapi import APIRouter, Depends, Query, HTTPException
+from fastapi.responses import FileResponse, StreamingResponse
 from api.auth import verify_auth
 from database.processor import ProcessDB
 from database.dataSelect import Selector
+from app.ocr_text import unpack_lines, lines_to_text
+from scripts.settings import settings
+from app.retention import open_file
+from app.recurrence import materialize_event
+from app.date_norm import normalize, parse_timestamp
+from datetime import datetime, timedelta
+from pathlib import Path
+import re
 
 router = APIRouter(prefix="/events", tags=["Events"])
 
@@ -9,11 +18,138 @@ db = ProcessDB()
 
 @router.post("/", dependencies=[Depends(verify_auth)])
 async def create_event(data: dict):
+    ner = data.get("ner_extract")
+    if "starts_at" not in data and isinstance(ner, dict):
+        # 未给出起止时刻时按原文计算，相对日期以当前时间为基准
+        masked = [item["match"] for item in ner.get("recurrences") or [] if isinstance(item, dict)]
+        starts_at, ends_at = normalize(str(ner.get("events_full") or ""), datetime.now(), masked)
+        data = {**data, "starts_at": starts_at or "", "ends_at": ends_at or ""}
     event_id = db.create_event(data)
     if event_id == -1:
         raise HTTPException(500, "创建事件失败")
+    materialize_event(event_id)
     return {"event_id": event_id, "msg": "事件创建成功"}
 
+@router.get("/tags", dependencies=[Depends(verify_auth)])
+async def list_tags():
+    """所有标签及其事件数"""
+    tags = db.tag_counts()
+    return {"count": len(tags), "tags": tags}
+
+# 日历查询允许的最大跨度
+CALENDAR_MAX_DAYS = 366
+
+
+def _parse_bound(value: str, name: str) -> tuple:
+    """返回 (datetime, 是否只有日期)"""
+    for fmt, date_only in (("%Y-%m-%d", True), ("%Y-%m-%d %H:%M:%S", False), ("%Y-%m-%dT%H:%M:%S", False)):
+        try:
+            return datetime.strptime(value, fmt), date_only
+        except ValueError:
+            continue
+    raise HTTPException(400, f"{name} 格式应为 YYYY-MM-DD 或 YYYY-MM-DD HH:MM:SS")
+
+
+@router.get("/calendar", dependencies=[Depends(verify_auth)])
+async def calendar(
+    start: str = Query(..., alias="from", description="起始时刻（含），YYYY-MM-DD 或 YYYY-MM-DD HH:MM:SS"),
+    end: str = Query(..., alias="to", description="结束时刻；只给日期时包含当天，给时刻时不含"),
+):
+    """时间范围内周期事件的每次发生（occurrences 索引）与开始于该范围的事件（starts_at 索引）"""
+    begin, _ = _parse_bound(start, "from")
+    until, date_only = _parse_bound(end, "to")
+    if date_only:
+        until += timedelta(days=1)
+    if until <= begin:
+        raise HTTPException(400, "to 必须晚于 from")
+    if until - begin > timedelta(days=CALENDAR_MAX_DAYS):
+        raise HTTPException(400, f"查询跨度不能超过 {CALENDAR_MAX_DAYS} 天")
+
+    begin, until = begin.strftime("%Y-%m-%d %H:%M:%S"), until.strftime("%Y-%m-%d %H:%M:%S")
+    occurrences = db.search_occurrences(begin, until)
+    # 非周期事件按规范化后的开始时刻查询
+    scheduled = db.search_events_between(begin, until)
+    return {
+        "from": begin,
+        "to": until,
+        # 周期事件已展开到的时刻，晚于它的部分尚未生成；None 表示有规则正在等待展开
+        "horizon": db.occurrence_horizon(),
+        "count": len(occurrences),
+        "occurrences": occurrences,
+        "scheduled": scheduled,
+        "events": db.read_events([row["event_id"] for row in occurrences + scheduled]),
+    }
+
+@router.get("/changes", dependencies=[Depends(verify_auth)])
+async def list_changes(
+    since: int = Query(0, ge=0, description="上次同步返回的 next，首次同步为 0"),
+    limit: int = Query(500, ge=1, le=5000, description="本次最多返回的变更数"),
+):
+    """
+    增量同步：seq 大于 since 的新增 / 修改 / 删除，每个事件只出现最近一次变更，删除以 deleted=true 的墓碑表示。
+    has_more 为 true 时以 next 继续请求；since 大于 latest 说明服务端数据已重建，客户端应从 0 全量同步
+    """
+    latest = db.change_seq()
+    changes = db.search_changes(since, limit)
+    following = changes[-1]["seq"] if changes else since
+    return {
+        "since": since,
+        "next": following,
+        "latest": latest,
+        "has_more": following < latest,
+        "count": len(changes),
+        "changes": changes,
+    }
+
+# 批量操作一次最多指定的事件数
+BULK_MAX_IDS = 10000
+
+
+@router.post("/bulk", dependencies=[Depends(verify_auth)])
+async def bulk_events(data: dict):
+    """
+    批量 done / delete / tag / importance，一条 SQL、一个事务完成，返回实际改动的 event_id。
+    请求体：{"action": ..., "ids": [...], "filter": {"done": 0, "before": "2025-10-01", "after": ..., "tag": ...},
+            "tags": [...](tag), "importance": 0.8(importance)}；ids 与 filter 至少给出一个，同时给出时取交集
+    """
+    action = data.get("action")
+    ids = data.get("ids")
+    flt = dict(data.get("filter") or {})
+    if ids is not None:
+        if not isinstance(ids, list) or not all(isinstance(i, int) for i in ids):
+            raise HTTPException(400, "ids 应为整数列表")
+        if len(ids) > BULK_MAX_IDS:
+            raise HTTPException(400, f"一次最多操作 {BULK_MAX_IDS} 个事件")
+    unknown = set(flt) - {"done", "before", "after", "tag"}
+    if unknown:
+        raise HTTPException(400, f"未知筛选条件: {', '.join(sorted(unknown))}")
+    if ids is None and not flt:
+        raise HTTPException(400, "必须指定 ids 或 filter")
+    if "done" in flt and flt["done"] not in (0, 1):
+        raise HTTPException(400, "filter.done 应为 0 或 1")
+    for key in ("before", "after"):
+        if flt.get(key):
+            flt[key] = _parse_bound(str(flt[key]), f"filter.{key}")[0].strftime("%Y-%m-%d %H:%M:%S")
+
+    value = None
+    if action == "tag":
+        value = data.get("tags")
+        if isinstance(value, str):
+            value = [t.strip() for t in re.split(r"[,，]", value) if t.strip()]
+        if not value or not all(isinstance(t, str) for t in value):
+            raise HTTPException(400, "tag 操作需要 tags 标签列表")
+    elif action == "importance":
+        value = data.get("importance")
+        if not isinstance(value, (int, float)) or isinstance(value, bool):
+            raise HTTPException(400, "importance 操作需要数值 importance")
+    elif action not in ("done", "delete"):
+        raise HTTPException(400, "action 应为 done / delete / tag / importance")
+
+    affected = db.bulk_events(action, value, ids, flt)
+    if affected is None:
+        raise HTTPException(500, "批量操作失败")
+    return {"action": action, "count": len(affected), "event_ids": affected}
+
 @router.get("/{event_id}", dependencies=[Depends(verify_auth)])
 async def get_event(event_id: int):
     result = db.read_event(event_id)
@@ -22,15 +158,135 @@ async def get_event(event_id: int):
     return result
 
 
+@router.get("/{event_id}/transcript", dependencies=[Depends(verify_auth)])
+async def get_event_transcript(event_id: int):
+    """事件的抽取文本（ASR 转写 / OCR 文本 / 上传的文本）"""
+    transcript = db.read_transcript(event_id)
+    if transcript is not None:
+        return transcript
+    # 入库前创建的旧事件只有抽取文件
+    event = db.read_event(event_id)
+    if not event:
+        raise HTTPException(404, "事件不存在")
+    stream = open_file(event.get("file_processed"))
+    if stream is None:
+        raise HTTPException(404, "该事件没有抽取文本")
+    with stream:
+        text = stream.read().decode(settings.encoding, errors="replace")
+    return {"event_id": event_id, "source": "file", "chars": len(text), "text": text,
+            "created_at": event.get("created_at"), "updated_at": event.get("updated_at")}
+
+
+@router.get("/{event_id}/original", dependencies=[Depends(verify_auth)])
+async def get_event_original(event_id: int):
+    """事件的原始文件，已归档时从归档包中读出"""
+    event = db.read_event(event_id)
+    if not event:
+        raise HTTPException(404, "事件不存在")
+    ref = event.get("file_original")
+    name = Path(ref or "").name
+    if ref and Path(ref).is_file():
+        return FileResponse(path=ref, filename=name, media_type="application/octet-stream")
+    stream = open_file(ref)
+    if stream is None:
+        raise HTTPException(404, "原始文件不存在")
+
+    def iter_stream(chunk: int = 1024 * 1024):
+        with stream:
+            while data := stream.read(chunk):
+                yield data
+
+    return StreamingResponse(
+        iter_stream(),
+        media_type="application/octet-stream",
+        headers={"Content-Disposition": f'attachment; filename="{name}"'},
+    )
+
+
+@router.get("/{event_id}/ocr", dependencies=[Depends(verify_auth)])
+async def get_event_ocr(
+    event_id: int,
+    min_score: float = Query(None, ge=0, le=1, description="置信度阈值，默认使用识别时的阈值"),
+    order: str = Query("detected", pattern="^(detected|reading)$", description="detected 或 reading"),
+    include_lines: bool = Query(False, description="是否返回每个框的坐标与分数"),
+):
+    """从保存的 OCR 原始结果重新生成文本，不重新识别"""
+    blob = db.read_ocr_result(event_id)
+    if blob is None:
+        raise HTTPException(404, "该事件没有 OCR 结果")
+    lines, meta = unpack_lines(blob)
+    if min_score is None:
+        min_score = meta.get("sensitivity", 0.0)
+    result = {
+        "event_id": event_id,
+        "engine": meta.get("engine"),
+        "min_score": min_score,
+        "order": order,
+        "total_lines": len(lines),
+        "kept_lines": sum(1 for line in lines if line[2] > min_score),
+        "text": lines_to_text(lines, min_score, order),
+    }
+    if include_lines:
+        result["lines"] = [{"box": box, "text": text, "score": score} for box, text, score in lines]
+    return result
+
+
+def _check_schedule(fields: dict):
+    """详情页可直接修正起止时刻：校验并统一格式，空字符串 / null 表示没有日期"""
+    for key in ("starts_at", "ends_at"):
+        if key not in fields:
+            continue
+        if not fields[key]:
+            fields[key] = ""
+            continue
+        value = parse_timestamp(str(fields[key]).strip())
+        if value is None:
+            raise HTTPException(400, f"{key} 格式应为 YYYY-MM-DD HH:MM:SS")
+        fields[key] = value.strftime("%Y-%m-%d %H:%M:%S")
+
+
 @router.put("/{event_id}", dependencies=[Depends(verify_auth)])
 async def update_event(event_id: int, data: dict):
     # 处理数据适应数据库结构
     datanew = Selector.formator_to_db(data)
+    if isinstance(datanew, dict):
+        _check_schedule(datanew)
     ok = db.update_event(event_id, datanew)
     if not ok:
         raise HTTPException(500, "更新失败")
+    materialize_event(event_id)
     return {"msg": "事件更新成功", "event_id": event_id}
 
+@router.patch("/{event_id}", dependencies=[Depends(verify_auth)])
+async def patch_event(event_id: int, data: dict):
+    """
+    只修改请求体中出现的字段，ner_extract 内的键在数据库内用 json_set / json_remove 改写。
+    值为 null 表示删除该字段；带上读取时的 updated_at 则按版本修改，期间被别处改过时返回 409
+    """
+    fields = dict(data)
+    expected = fields.pop("updated_at", None)
+    try:
+        columns, ner_set, ner_unset = Selector.formator_to_patch(fields)
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+    if not (columns or ner_set or ner_unset):
+        raise HTTPException(400, "没有要修改的字段")
+    _check_schedule(columns)
+
+    status, result = db.patch_event(event_id, columns, ner_set, ner_unset, expected)
+    if status == "missing":
+        raise HTTPException(404, "事件不存在")
+    if status == "conflict":
+        raise HTTPException(409, f"事件已在别处修改（当前 updated_at={result}），请刷新后重试")
+    if status == "unsupported":
+        raise HTTPException(400, "旧版本事件不支持修改 ner_extract 字段")
+    if status != "ok":
+        raise HTTPException(500, "更新失败")
+    if ner_set or ner_unset or "starts_at" in columns:
+        # 触发器已重置该事件的周期规则，立即重新展开
+        materialize_event(event_id)
+    return {"msg": "事件更新成功", "event_id": event_id, "event": result}
+
 @router.delete("/{event_id}", dependencies=[Depends(verify_auth)])
 async def delete_event(event_id: int):
     ok = db.delete_event(event_id)
@@ -39,6 +295,6 @@ async def delete_event(event_id: int):
     return {"msg": "事件删除成功", "event_id": event_id}
 
 @router.get("/", dependencies=[Depends(verify_auth)])
-async def search_events():
-    results = db.search_events_all()
+async def search_events(tag: str = Query(None, description="只返回带有该标签的事件")):
+    results = db.search_events_by_tag(tag) if tag else db.search_events_all()
     return {"count": len(results), "events": results}
@@ -1,13 +1,30 @@
 from fastapi import APIRouter,File, UploadFile, Request, Form, HTTPException, Query
-from fastapi.responses import FileResponse, RedirectResponse, HTMLResponse
+from fastapi.responses import FileResponse, RedirectResponse, HTMLResponse, StreamingResponse
 from pathlib import Path
-from scripts.path_control import PM
+from scripts.settings import settings
 from scripts.unique_string_generate import unique_name
 from scripts.logger import logger
+from scripts.progress import Progress
+from scripts.tracing import Tracer, bind, span
+from scripts.storage import locate, sharded_path
+from app.retention import open_by_name
 
 
 router = APIRouter(tags=["Files"])
 
+def _after_upload(dst: Path, only_upload: bool, trace_id: str = None):
+    """需要解析的文件登记为排队任务，并在重定向中带上任务 ID"""
+    if only_upload:
+        return RedirectResponse(url="/", status_code=303)
+    Progress.job_update(dst.name, "queued", file=dst.name, trace_id=trace_id)
+    return RedirectResponse(url=f"/?job={dst.name}", status_code=303)
+
+def _destination(folder: Path, name: str) -> Path:
+    """收件箱保持平铺，存储目录按日期分片"""
+    if folder == settings.storage_dir:
+        return sharded_path(folder, name)
+    return folder / name
+
 @router.post("/upload/")
 async def upload_file(
     request: Request,  # 添加 request 参数
@@ -17,38 +34,56 @@ async def upload_file(
     form_data = await request.form()
     only_upload = form_data.get('only_upload') is not None
     if only_upload:
-        file_to_path = PM.get_env("STORAGE_DIR_PATH")  # 不需要处理文件夹
+        file_to_path = settings.storage_dir  # 不需要处理文件夹（按日期分片）
     else:
-        file_to_path = PM.get_env("UPLOAD_DIR_PATH") # 文件需要处理
+        file_to_path = settings.upload_dir # 文件需要处理
 
     client_ip = request.client.host  # 获取客户端 IP
 
-    file_to_path = Path(file_to_path)
-    
     if file:
-        dst = file_to_path / f"{unique_name() + Path(file.filename).suffix}"
-        with dst.open("wb") as buffer:
-            while chunk := await file.read(1024 * 1024):
-                buffer.write(chunk)
-        logger.info(f"File uploaded successfully from {client_ip}: {dst.name}")
-        return RedirectResponse(url="/", status_code=303)
+        dst = _destination(file_to_path, f"{unique_name() + Path(file.filename).suffix}")
+        # trace 必须在文件落盘前登记，否则监控线程可能先一步新建 trace
+        trace_id = None if only_upload else Tracer.start_trace(dst.name)
+        with bind(trace_id), span("upload.write", kind="file"):
+            with dst.open("wb") as buffer:
+                while chunk := await file.read(1024 * 1024):
+                    buffer.write(chunk)
+        logger.info(f"File uploaded successfully from {client_ip}: {dst.name} trace={trace_id}")
+        return _after_upload(dst, only_upload, trace_id)
 
     elif text:
         filename = unique_name() + '.txt'
-        dst = file_to_path / filename
-        dst.write_text(text, encoding= PM.get_env("ENCODING"))
-        logger.info(f"Text uploaded successfully from {client_ip}: {filename}")
-        return RedirectResponse(url="/", status_code=303)
+        dst = _destination(file_to_path, filename)
+        trace_id = None if only_upload else Tracer.start_trace(dst.name)
+        with bind(trace_id), span("upload.write", kind="text"):
+            dst.write_text(text, encoding=settings.encoding)
+        logger.info(f"Text uploaded successfully from {client_ip}: {filename} trace={trace_id}")
+        return _after_upload(dst, only_upload, trace_id)
 
     logger.error(f"Upload failed from {client_ip}: No file or text provided.")
     return HTMLResponse(content="<h1>上传失败：未提供文件或文本</h1>", status_code=400)
 
+def _iter_stream(stream, chunk: int = 1024 * 1024):
+    with stream:
+        while data := stream.read(chunk):
+            yield data
+
 @router.get("/download/{file_name}", response_class=FileResponse)
 async def download_file(file_name: str, request: Request):
-    file_path = Path(PM.get_env("UPLOAD_DIR_PATH")) / Path(file_name).name
+    name = Path(file_name).name
+    file_path = locate(name)
+    if file_path is not None:
+        logger.info(f"File downloaded successfully from {request.client.host}: {file_name}")
+        return FileResponse(path=file_path, filename=file_path.name, media_type="application/octet-stream")
 
-    if not file_path.is_file():
+    # 已归档的原件从归档包中读出
+    stream = open_by_name(name)
+    if stream is None:
         logger.error(f"Download failed from {request.client.host}: File not found - {file_name}")
         raise HTTPException(404, "文件不存在")
-    logger.info(f"File downloaded successfully from {request.client.host}: {file_name}")
-    return FileResponse(path=file_path, filename=file_path.name, media_type="application/octet-stream")
+    logger.info(f"Archived file downloaded from {request.client.host}: {file_name}")
+    return StreamingResponse(
+        _iter_stream(stream),
+        media_type="application/octet-stream",
+        headers={"Content-Disposition": f'attachment; filename="{name}"'},
+    )
@@ -0,0 +1,61 @@
+import asyncio
+import json
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from api.auth import verify_auth
+from scripts.progress import Progress
+
+router = APIRouter(prefix="/jobs", tags=["Jobs"])
+
+KEEPALIVE_SECONDS = 15
+
+
+def _sse(message: dict) -> str:
+    """格式化为 text/event-stream 报文"""
+    data = json.dumps(message["data"], ensure_ascii=False)
+    return f"id: {message['id']}\nevent: {message['kind']}\ndata: {data}\n\n"
+
+
+@router.get("/", dependencies=[Depends(verify_auth)])
+async def list_jobs(active: bool = False):
+    jobs = Progress.list_jobs(only_active=active)
+    return {"count": len(jobs), "jobs": jobs}
+
+
+@router.get("/stream", dependencies=[Depends(verify_auth)])
+async def stream(request: Request, job_id: str = None):
+    """
+    推送任务阶段变化（event: job）与事件增删改（event: event）。
+    指定 job_id 时只推送该任务的阶段变化。
+    """
+    queue = Progress.subscribe()
+
+    async def gen():
+        try:
+            # 先补发当前状态，避免订阅前的阶段丢失
+            if job_id:
+                job = Progress.get_job(job_id)
+                if job:
+                    yield _sse({"id": 0, "kind": "job", "data": job})
+            while not await request.is_disconnected():
+                try:
+                    message = await asyncio.wait_for(queue.get(), timeout=KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                if job_id and (message["kind"] != "job" or message["data"].get("job_id") != job_id):
+                    continue
+                yield _sse(message)
+        finally:
+            Progress.unsubscribe(queue)
+
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    return StreamingResponse(gen(), media_type="text/event-stream", headers=headers)
+
+
+@router.get("/{job_id}", dependencies=[Depends(verify_auth)])
+async def get_job(job_id: str):
+    job = Progress.get_job(job_id)
+    if not job:
+        raise HTTPException(404, "任务不存在")
+    return job
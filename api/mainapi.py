@@ -1,12 +1,19 @@
 # API.py
 import socket
+import time
 import logging
 from contextlib import asynccontextmanager
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from api.auth import router as auth_router
 from api.events import router as events_router
 from api.files import router as files_router
 from api.pages import router as pages_router
+from api.jobs import router as jobs_router
+from api.metrics import router as metrics_router
+from api.debug import router as debug_router, profile_request
+from scripts.metrics import HTTP_SECONDS
+from scripts.progress import Progress
+from scripts.settings import settings
 
 def create_app():
     app = FastAPI(title="HGRecorder API", debug=True)
@@ -15,9 +22,32 @@ def create_app():
     app.include_router(events_router)
     app.include_router(files_router)
     app.include_router(pages_router)
+    app.include_router(jobs_router)
+    app.include_router(metrics_router)
+    app.include_router(debug_router)
+    app.middleware("http")(profile_request)
+    app.middleware("http")(_time_request)
     return app
 
 
+async def _time_request(request: Request, call_next):
+    """按路由模板统计耗时，避免 /detail/{id} 之类的路径撑爆标签"""
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        route = request.scope.get("route")
+        HTTP_SECONDS.observe(
+            time.perf_counter() - start,
+            method=request.method,
+            route=getattr(route, "path", "unmatched"),
+            status=status,
+        )
+
+
 def _get_all_ipv4() -> list[str]:
     """获取所有可用的IPv4地址，用于显示服务访问地址"""
     try:
@@ -35,6 +65,9 @@ async def _api_lifespan(app: FastAPI):
     ips = _get_all_ipv4()
     logger = logging.getLogger("uvicorn.error")
     logger.info("✅ API服务已启动")
+    # 与摄取进程分开运行时，从共享消息表接收任务进度
+    if settings.progress_feed or Progress.feed is not None:
+        Progress.start_relay()
     for ip in ips:
         logger.info(f"🔗 服务访问地址：http://{ip}:8000")
     
@@ -1,7 +1,7 @@
 from fastapi import APIRouter, Request, Depends, HTTPException
 from fastapi.responses import FileResponse, RedirectResponse, HTMLResponse
 from fastapi.templating import Jinja2Templates
-from scripts.path_control import PM
+from scripts.settings import settings
 from scripts.logger import logger
 from api.auth import verify_auth
 from database.processor import ProcessDB
@@ -10,14 +10,14 @@ from app.bbcLearning import BbcLearning
 from pathlib import Path
 
 router = APIRouter(tags=["Pages"])
-templates = Jinja2Templates(directory=str(PM.get_env("TEMPLATES_PATH")))
+templates = Jinja2Templates(directory=str(settings.templates_path))
 db = ProcessDB()
 
 @router.get("/", response_class=HTMLResponse)
 async def index(request: Request):
-    if request.cookies.get(PM.get_env("COOKIE_NAME")) != "true":
+    if request.cookies.get(settings.cookie_name) != "true":
         return RedirectResponse("/login")
-    # files = [f.name for f in Path(PM.get_env("UPLOAD_DIR_PATH")).iterdir() if f.is_file()]
+    # files = [f.name for f in settings.upload_dir.iterdir() if f.is_file()]
     files = []
     return templates.TemplateResponse("index.html", {"request": request, "files": files})
 
@@ -27,17 +27,29 @@ async def daily(request: Request):
     events_selected = Selector.get_infomotions(events, needtype = 'daily')
     return templates.TemplateResponse("daily.html", {"request": request, "events": events_selected})
 
+def _userdata_url(value: str):
+    """userdata 目录内的文件路径（绝对路径或旧数据中的相对路径）-> "userdata/..."，目录外的返回 None"""
+    path = Path(value.replace("\\", "/"))
+    if path.is_absolute():
+        try:
+            path = path.resolve().relative_to(settings.userdata_dir.resolve())
+        except ValueError:
+            logger.warning(f"[learn] 文件不在 userdata 目录中: {value}")
+            return None
+    elif path.parts and path.parts[0] == "userdata":
+        path = Path(*path.parts[1:])
+    return "userdata/" + path.as_posix()
+
+
 @router.get("/learn/", response_class=HTMLResponse)
 async def learn(request: Request):
     article = BbcLearning().doing
     if not article:
         raise HTTPException(404, "文章不存在")
-    # 修正路径
+    # 文件路径 -> /userdata/ 下的相对 URL，页面中不出现服务器上的绝对路径
     for k in ['path_audio', 'path_pdf']:
-        if k in article:
-            article[k] = article[k].replace("\\", "/")
-            if not article[k].startswith("userdata/"):
-                article[k] = "userdata/" + article[k]
+        if article.get(k):
+            article[k] = _userdata_url(article[k])
     return templates.TemplateResponse("learn.html", {"request": request, "article": article})
 
 @router.get("/detail/{event_id}", response_class=HTMLResponse)
@@ -52,15 +64,14 @@ async def event_detail(request: Request, event_id: int):
 
 @router.get("/userdata/{file_path:path}")
 async def get_userdata_file(file_path: str):
-    USERDATA_DIR = Path(PM.get_env("USERDATA_DIR_PATH"))
+    USERDATA_DIR = settings.userdata_dir
 
-    # 修正：在文件路径前添加 "userdata/" 前缀
-    corrected_path = "userdata" / Path(file_path)
-    full_path = USERDATA_DIR / corrected_path
+    # URL 中 /userdata/ 之后的部分即为 userdata 目录下的相对路径
+    full_path = USERDATA_DIR / file_path
 
     # 安全检查
     try:
-        full_path.resolve().relative_to(USERDATA_DIR.resolve())
+        full_path.resolve().relative_to(USERDATA_DIR)
     except ValueError:
         raise HTTPException(status_code=403, detail="访问被拒绝")
     
@@ -1,33 +1,41 @@
-import whisper
-from dotenv import load_dotenv
-from opencc import OpenCC
-import os
-
-from scripts.Tools import w
-from scripts.path_control import PM
-from scripts.unique_string_generate import unique_name
-
-load_dotenv()
-ASR_MODEL_PATH = os.getenv("ASR_MODEL_PATH")
+from scripts.Tools import save_extract
+from scripts.settings import settings
+from scripts.tracing import span
+from scripts.cpu_budget import apply_thread_budget
+from app.asr_backends import create_backend
 
 
 class ASEProcessor:
-    def __init__(self):
-        self.model = whisper.load_model(ASR_MODEL_PATH)
+    def __init__(self, tiered: bool = None, backend: str = None):
+        """
+        tiered=True 时同时加载快速模型与精确模型：
+        新文件先用快速模型出临时转写，之后由流水线在后台用精确模型重转。
+        backend 默认取 ASR_BACKEND（whisper / faster-whisper）。
+        """
+        # 模型依赖很重，只在真正需要 ASR 时才导入；线程变量需在导入前设置
+        budget = apply_thread_budget()
+        from opencc import OpenCC
+        self.backend = backend or settings.asr_backend
+        self.tiered = settings.asr_tiered if tiered is None else tiered
+        self.models = {"accurate": create_backend(self.backend, "accurate", budget)}
+        if self.tiered:
+            self.models["fast"] = create_backend(self.backend, "fast", budget)
+        self.cc = OpenCC('t2s')
 
     def convert_t2s(self, text):
 
         try:
-            cc = OpenCC('t2s')
-            return cc.convert(text)
+            return self.cc.convert(text)
         except Exception:
             return text
 
-    def process_audio(self, target_path):
-        res_txt = self.model.transcribe(target_path)
-        res = self.convert_t2s(res_txt["text"])
-        # 写入文件
-        to_file = PM.get_path("EXTRACTED_DIR_PATH", file_name=f"ASR_result_{unique_name() + '.txt'}")
-        w(to_file, res)
-        return {"file_processed": to_file, "file_original": target_path}
-
+    def process_audio(self, target_path, tier: str = None):
+        """tier 为 fast / accurate，默认分级模式下用 fast，否则用 accurate"""
+        tier = tier or ("fast" if self.tiered else "accurate")
+        with span("asr.transcribe", tier=tier, backend=self.backend):
+            text = self.models[tier].transcribe(target_path)
+        with span("asr.convert_t2s"):
+            res = self.convert_t2s(text)
+        # 文本直接交给下一阶段，文件副本可选
+        return {"text": res, "file_processed": save_extract("ASR", res),
+                "file_original": target_path, "asr_tier": tier}
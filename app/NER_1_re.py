@@ -1,9 +1,7 @@
 import re
-from datetime import datetime, timedelta
-from dateutil.relativedelta import relativedelta
-from scripts.Tools import r, w
-from scripts.path_control import PM
-from scripts.unique_string_generate import unique_name  # pip install python-dateutil
+from datetime import datetime
+from scripts.tracing import span
+from app.date_norm import resolve_date, normalize
 
 
 class NERProcessor:
@@ -81,10 +79,10 @@ class NERProcessor:
             # 每天 / 每周 / 每月 / 每年
             "basic": re.compile(r"(?P<basic>每(?:天|日|周|月|年|工作日))"),
 
-            # 每周一 / 每周一三五 / 每周一到周五
+            # 每周一 / 每周一三五 / 每周一到周五（“周/星期”不可省略，否则“每天”会被当成每周日）
             "weekday_list": re.compile(
-                r"每(?:周|周的|星期)?(?P<days>[一二三四五六日天]"
-                r"(?:[、,，]\s*[一二三四五六日天])*(?:[至\-到][一二三四五六日天])?)"
+                r"每(?:周的?|星期)(?P<days>[一二三四五六日天]"
+                r"(?:[、,，]?\s*[一二三四五六日天])*(?:[至\-到](?:周|星期)?[一二三四五六日天])?)"
             ),
 
             # 隔X天 / 每隔X周
@@ -104,7 +102,7 @@ class NERProcessor:
 
             # 每月最后一天 / 工作日
             "monthly_last": re.compile(
-                r"每月最后(?:一天|日|个工作日)"
+                r"每月最后(?:一天|一日|日|一?个工作日)"
             ),
 
             # 每年X月X日
@@ -112,10 +110,10 @@ class NERProcessor:
                 r"每年(?P<month>\d{1,2})\s?月(?P<day>\d{1,2})\s?[日号]?"
             ),
 
-            # 每周的周一到周五
+            # 每周的周一到周五（“每”不可省略，否则“下周一至周三”这类一次性区间会被当作周期）
             "weekday_range": re.compile(
-                r"(?:每周的?|周|星期)"
-                r"(?P<start>[一二三四五六日天])\s*(?:到|至|—|-|–)\s*(?P<end>[一二三四五六日天])"
+                r"每(?:周的?|星期)(?:周|星期)?"
+                r"(?P<start>[一二三四五六日天])\s*(?:到|至|—|-|–)\s*(?:周|星期)?(?P<end>[一二三四五六日天])"
             ),
         }
 
@@ -138,12 +136,77 @@ class NERProcessor:
 
     # ----------------------------------------------------------------------
 
+    _BYDAY = ("MO", "TU", "WE", "TH", "FR", "SA", "SU")
+    _FREQ = {"天": "DAILY", "日": "DAILY", "周": "WEEKLY", "星期": "WEEKLY", "月": "MONTHLY", "年": "YEARLY"}
+    _CN_NUM = {"一": 1, "二": 2, "两": 2, "三": 3, "四": 4, "五": 5, "六": 6, "七": 7, "八": 8, "九": 9, "十": 10}
+
+    def _days(self, spec: str) -> list:
+        """“一三五” / “一、三” / “一到五” → 星期下标列表"""
+        days = [self.weekday_map[c] for c in spec if c in self.weekday_map]
+        if len(days) >= 2 and re.search(r"[至\-到—–]", spec):
+            start, end = days[0], days[-1]
+            return [(start + i) % 7 for i in range((end - start) % 7 + 1)]
+        return sorted(set(days))
+
+    def to_rrule(self, info: dict):
+        """把 extract_recurrence 的一条结果规范为 RRULE（RFC 5545 的 FREQ/INTERVAL/BY* 部分），无法规范时返回 None"""
+        kind, match = info["type"], info["match"]
+        if kind == "basic":
+            if match.endswith("工作日"):
+                return "FREQ=WEEKLY;BYDAY=MO,TU,WE,TH,FR"
+            return f"FREQ={self._FREQ[match[-1]]}"
+        if kind in ("interval", "every_n"):
+            n = int(info.get("num") or info.get("n"))
+            # “每隔 N 天”按字面理解为间隔 N 天，即每 N+1 天一次（“隔一天”= 每两天）
+            interval = n + 1 if kind == "interval" else n
+            if interval <= 0:
+                return None
+            rule = f"FREQ={self._FREQ[info['unit']]}"
+            return rule if interval == 1 else f"{rule};INTERVAL={interval}"
+        if kind in ("weekday_list", "weekday_range"):
+            days = self._days(info["days"] if kind == "weekday_list" else info["start"] + "到" + info["end"])
+            return f"FREQ=WEEKLY;BYDAY={','.join(self._BYDAY[d] for d in days)}" if days else None
+        if kind == "monthly_nth_weekday":
+            n = int(info["n"]) if info["n"].isdigit() else self._CN_NUM.get(info["n"])
+            if not n or n > 5:
+                return None
+            return f"FREQ=MONTHLY;BYDAY={n}{self._BYDAY[self.weekday_map[info['wd']]]}"
+        if kind == "monthly_last":
+            if "工作日" in match:
+                return "FREQ=MONTHLY;BYDAY=MO,TU,WE,TH,FR;BYSETPOS=-1"
+            return "FREQ=MONTHLY;BYMONTHDAY=-1"
+        if kind == "yearly_on":
+            month, day = int(info["month"]), int(info["day"])
+            if not (1 <= month <= 12 and 1 <= day <= 31):
+                return None
+            return f"FREQ=YEARLY;BYMONTH={month};BYMONTHDAY={day}"
+        return None
+
+    def to_rrules(self, recurrences: list) -> list:
+        """
+        规范化并去重；多个模式命中同一段文字时只保留最具体的一条
+        （“每周一三五”不再额外产生“每周”，“每月第二个周五”不再产生“每月”）
+        """
+        recurrences = recurrences or []
+        matches = [item["match"] for item in recurrences]
+        rules = []
+        for item in recurrences:
+            if any(item["match"] != other and item["match"] in other for other in matches):
+                continue
+            rule = self.to_rrule(item)
+            if rule and rule not in rules:
+                rules.append(rule)
+        return rules
+
+    # ----------------------------------------------------------------------
+
     def parse(self, text: str) -> dict:
         """提取原始事件信息（新增周期性识别）"""
         results = {
             "dates": [m[0] for m in self.date_full.findall(text)],
-            "times": [m[0] for m in self.time_simple.findall(text)],
-            "weeks": [m[0] for m in self.weekday.findall(text)],
+            # 单分组的模式 findall 返回字符串，取 [0] 只剩首字，这里取整段匹配
+            "times": [m.group(0) for m in self.time_simple.finditer(text)],
+            "weeks": [m.group(0) for m in self.weekday.finditer(text)],
             "places": [m[0] for m in self.place_pattern.findall(text)],
             "persons": [m[0] for m in self.person_pattern.findall(text)],
             "events_extract": [m[0] for m in self.event_pattern.findall(text)],
@@ -157,78 +220,31 @@ class NERProcessor:
     # ----------------------------------------------------------------------
 
     def resolve_date(self, token: str, base_date: datetime) -> str:
-        """将日期表达解析成 YYYY-MM-DD"""
-        token = token.strip()
-
-        if re.match(r"\d{4}[年/-]\d{1,2}[月/-]\d{1,2}", token):
-            token = token.replace("年", "-").replace("月", "-").replace("日", "").replace(" ", "")
-            return token
-
-        if re.match(r"\d{1,2}[月/-]\d{1,2}", token):
-            parts = re.split(r"[月/-]", token.replace("日", "").replace(" ", ""))
-            return f"{base_date.year}-{int(parts[0]):02d}-{int(parts[1]):02d}"
-
-        if token == "今天": return base_date.strftime("%Y-%m-%d")
-        if token == "明天": return (base_date + timedelta(days=1)).strftime("%Y-%m-%d")
-        if token == "后天": return (base_date + timedelta(days=2)).strftime("%Y-%m-%d")
-        if token == "大后天": return (base_date + timedelta(days=3)).strftime("%Y-%m-%d")
-
-        m = re.match(r"本周([一二三四五六日天])", token)
-        if m:
-            target = self.weekday_map[m.group(1)]
-            delta = (target - base_date.weekday()) % 7
-            return (base_date + timedelta(days=delta)).strftime("%Y-%m-%d")
-
-        m = re.match(r"下周([一二三四五六日天])", token)
-        if m:
-            target = self.weekday_map[m.group(1)]
-            delta = 7 + target - base_date.weekday()
-            return (base_date + timedelta(days=delta)).strftime("%Y-%m-%d")
-
-        m = re.match(r"(\d+)天(后|以后)", token)
-        if m:
-            return (base_date + timedelta(days=int(m.group(1)))).strftime("%Y-%m-%d")
-
-        m = re.match(r"(\d+)周(后|以后)", token)
-        if m:
-            return (base_date + timedelta(weeks=int(m.group(1)))).strftime("%Y-%m-%d")
-
-        if token == "下个月":
-            return (base_date + relativedelta(months=1)).strftime("%Y-%m-%d")
-        if token == "下下个月":
-            return (base_date + relativedelta(months=2)).strftime("%Y-%m-%d")
-
-        m = re.match(r"(\d+)个月(后|以后)", token)
-        if m:
-            return (base_date + relativedelta(months=int(m.group(1)))).strftime("%Y-%m-%d")
-
-        if token == "明年":
-            return (base_date + relativedelta(years=1)).strftime("%Y-%m-%d")
-        if token == "后年":
-            return (base_date + relativedelta(years=2)).strftime("%Y-%m-%d")
-
-        m = re.match(r"(\d+)年(后|以后)", token)
-        if m:
-            return (base_date + relativedelta(years=int(m.group(1)))).strftime("%Y-%m-%d")
-
-        m = re.match(r"(\d+)号", token)
-        if m:
-            return f"{base_date.year}-{base_date.month:02d}-{int(m.group(1)):02d}"
-
-        return token
+        """将日期表达解析成 YYYY-MM-DD（规则表见 app.date_norm），无法解析时原样返回"""
+        resolved = resolve_date(token, base_date.date() if isinstance(base_date, datetime) else base_date)
+        return resolved.isoformat() if resolved else token.strip()
 
     def resolve_dates(self, tokens: list, base_date: datetime) -> list:
         return [self.resolve_date(tok, base_date) for tok in tokens]
 
-    def process_text(self, text_path):
-        """处理文本并解析日期 + 周期信息"""
-        text = r(text_path)
-        result = self.parse(text)
-        base = datetime.today()
-        resolved = self.resolve_dates(result["dates"], base)
+    def process_text(self, text: str, base: datetime = None):
+        """
+        处理文本并解析日期 + 周期信息；text 为抽取阶段直接传入的文本，
+        base 为相对日期的基准（上传时间），默认为当前时间。
+        返回的 starts_at / ends_at 为绝对起止时刻，没有日期时间时为空字符串。
+        """
+        with span("ner.parse", chars=len(text)):
+            result = self.parse(text)
+        base = base or datetime.now()
+        with span("ner.resolve_dates"):
+            resolved = self.resolve_dates(result["dates"], base)
+            # 周期表达（“每周一”）不是具体日期，规范化起止时刻时抹去
+            starts_at, ends_at = normalize(text, base, [item["match"] for item in result["recurrences"]])
         result["dates"] = resolved
+        # 周期规则写入 ner_extract.rrules，数据库触发器据此维护 recurrences / occurrences
+        result["rrules"] = self.to_rrules(result["recurrences"])
 
         for key, value in result.items():
             if value == []:
                 result[key] = None
-        return {"ner_extract": result}
+        return {"ner_extract": result, "starts_at": starts_at or "", "ends_at": ends_at or ""}
@@ -1,31 +1,53 @@
-from paddleocr import PaddleOCR
-import paddleocr
-from scripts.unique_string_generate import unique_name
-from scripts.path_control import PM
-from scripts.Tools import w
+from scripts.settings import settings
+from scripts.Tools import save_extract
 from scripts.logger import logger
+from scripts.tracing import span
+from scripts.cpu_budget import apply_thread_budget
+from app.image_prep import ImagePreprocessor
+from app.ocr_text import lines_to_text
+from app.ocr_backends import create_backend
 class OCRProcessor:
-    def __init__(self,sensitivity = 0.5, lang='ch', use_gpu=False):
-        """Initialize OCR with specified model paths."""
-        self.ocr = PaddleOCR(
-            use_angle_cls=False,  # Set to True if you have a direction classification model
-            det_model_dir=PM.get_env("OCR_DET_PATH"),
-            rec_model_dir=PM.get_env("OCR_REC_PATH"),
-            lang=lang,
-            use_gpu=use_gpu
-        )
+    def __init__(self,sensitivity = 0.5, lang='ch', use_gpu=False, preprocess=None, backend=None):
+        """
+        Initialize OCR with specified model paths.
+        backend 默认取 OCR_BACKEND（paddle / onnx）。
+        """
+        # 推理库很重，只在真正需要 OCR 时才导入；线程变量需在导入前设置
+        budget = apply_thread_budget()
+        self.backend = backend or settings.ocr_backend
+        self.engine = create_backend(self.backend, budget, lang=lang, use_gpu=use_gpu)
         self.sensitivity = sensitivity
-    
+        preprocess = settings.ocr_preprocess if preprocess is None else preprocess
+        self.preprocessor = ImagePreprocessor() if preprocess else None
+
+    def detect(self, image_path) -> list:
+        """返回 [(box, text, score)]，box 为原图坐标下的四个顶点"""
+        if self.preprocessor is None:
+            with span("ocr.infer", backend=self.backend):
+                return self.engine.ocr(image_path)
+
+        with span("ocr.preprocess"):
+            prepared = self.preprocessor.prepare(image_path)
+        lines = []
+        # 分块共用同一个推理实例（非线程安全），块内并行由后端线程数提供
+        with span("ocr.infer", backend=self.backend, **prepared.info):
+            for tile in prepared.tiles:
+                for box, text, score in self.engine.ocr(tile.image):
+                    if tile.owns(box):
+                        lines.append((prepared.to_original(box, tile), text, score))
+        if len(prepared.tiles) > 1:
+            # 合并后按从上到下、从左到右排序
+            lines.sort(key=lambda line: (round(line[0][0][1] / max(prepared.text_px or 32, 1)), line[0][0][0]))
+        logger.debug("OCR 预处理 %s: %s", image_path, prepared.info)
+        return lines
+
     def process_image(self,image_path) -> str:
         """Run OCR on the given image and display the results."""
-        results = self.ocr.ocr(image_path, cls=False)
-        final_str = ""
-        for line in results[0]:
-            box, (text, score) = line
-            if score > self.sensitivity:
-                final_str += text + "\n"
-        # 写入文件
-        to_file = PM.get_path("EXTRACTED_DIR_PATH", file_name=f"OCR_result_{unique_name() + '.txt'}")
-        w(to_file, final_str)
-        return {"file_processed": to_file, "file_original": image_path}
+        lines = self.detect(image_path)
+        final_str = lines_to_text(lines, self.sensitivity)
+        # 文本直接交给下一阶段，文件副本可选
+        to_file = save_extract("OCR", final_str)
+        # 原始框与分数随事件一起保存，调整阈值时无需重新识别
+        ocr_raw = {"lines": lines, "engine": self.backend, "sensitivity": self.sensitivity}
+        return {"text": final_str, "file_processed": to_file, "file_original": image_path, "ocr_raw": ocr_raw}
 
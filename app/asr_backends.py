@@ -0,0 +1,69 @@
+"""
+ASR 推理后端。ASEProcessor 只依赖 transcribe(path) -> str，
+具体引擎由 ASR_BACKEND 选择：
+
+    whisper          openai-whisper，PyTorch fp32（原有实现）
+    faster-whisper   CTranslate2，CPU 上默认 int8 量化（ASR_COMPUTE_TYPE）
+
+各后端的重量级依赖都在构造时才导入。
+"""
+from scripts.settings import settings
+from scripts.logger import logger
+
+
+class ASRBackend:
+    name = "base"
+
+    def transcribe(self, audio_path: str) -> str:
+        raise NotImplementedError
+
+
+class WhisperBackend(ASRBackend):
+    name = "whisper"
+
+    def __init__(self, model_path, threads: int, interop_threads: int = 1):
+        import torch
+        import whisper
+        torch.set_num_threads(threads)
+        try:
+            torch.set_num_interop_threads(interop_threads)
+        except RuntimeError:
+            # inter-op 线程池已启动后不能再修改
+            logger.warning("[ASR] torch inter-op 线程数已固定，忽略预算设置")
+        self.model = whisper.load_model(str(model_path))
+
+    def transcribe(self, audio_path: str) -> str:
+        return self.model.transcribe(audio_path)["text"]
+
+
+class FasterWhisperBackend(ASRBackend):
+    name = "faster-whisper"
+
+    def __init__(self, model_path, threads: int, compute_type: str = "int8"):
+        from faster_whisper import WhisperModel
+        self.model = WhisperModel(str(model_path), device="cpu", compute_type=compute_type, cpu_threads=threads)
+
+    def transcribe(self, audio_path: str) -> str:
+        # segments 是生成器，遍历时才真正解码
+        segments, _ = self.model.transcribe(audio_path, beam_size=5)
+        return "".join(segment.text for segment in segments)
+
+
+BACKENDS = {
+    WhisperBackend.name: WhisperBackend,
+    FasterWhisperBackend.name: FasterWhisperBackend,
+}
+
+
+def create_backend(name: str, tier: str, budget) -> ASRBackend:
+    """按后端与档位（fast / accurate）从 settings 取模型路径并加载"""
+    if name == WhisperBackend.name:
+        path = settings.asr_fast_model_path if tier == "fast" else settings.asr_model_path
+        backend = WhisperBackend(path, budget.asr, budget.interop)
+    elif name == FasterWhisperBackend.name:
+        path = settings.asr_fast_ct2_model if tier == "fast" else settings.asr_ct2_model
+        backend = FasterWhisperBackend(path, budget.asr, settings.asr_compute_type)
+    else:
+        raise ValueError(f"未知的 ASR 后端: {name}，可选: {', '.join(BACKENDS)}")
+    logger.info(f"[ASR] 已加载 {name} ({tier}): {path}")
+    return backend
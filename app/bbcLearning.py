@@ -1,18 +1,15 @@
 import json
 import os
-import requests
-from bs4 import BeautifulSoup
-from scripts.path_control import PM
+from scripts.settings import settings
 from scripts.get_date_formate import today
-import ijson
 from scripts.logger import logger
 import urllib.parse
 
 class BbcLearning:
     def __init__(self):
         self.baseurl = "https://www.bbc.co.uk"
-        self.Bbc_dir = PM.get_env("BBC_DIR_PATH")
-        self.filepath = PM.get_env("BBC_JSON_PATH")
+        self.Bbc_dir = str(settings.bbc_dir)
+        self.filepath = str(settings.bbc_json_path)
         self.doing = self.daily_work()
         
     def save_json(self):
@@ -28,6 +25,7 @@ class BbcLearning:
 
     def read_json_items(self):
         """读取JSON中的所有item"""
+        import ijson
         with open(self.filepath, 'r', encoding='utf-8') as f:
             for item in ijson.items(f, 'item'):
                 yield item
@@ -62,6 +60,7 @@ class BbcLearning:
         if os.path.exists(path):
             return path
             
+        import requests
         r = requests.get(url)
         r.raise_for_status()
         with open(path, 'wb') as f:
@@ -76,6 +75,9 @@ class BbcLearning:
         返回一个字典，包含两个键：'transcript' 和 'audio'。
         """
 
+        import requests
+        from bs4 import BeautifulSoup
+
         # 请求网页内容
         url = f"{self.baseurl}{url}"
         response = requests.get(url)
@@ -169,6 +171,5 @@ class BbcLearning:
             logger.error(f"Daily work error: {e}")
             return None
 
-bbc = BbcLearning()
 if __name__ == "__main__":
     pass
\ No newline at end of file
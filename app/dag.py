@@ -0,0 +1,219 @@
+"""
+流水线定义层：阶段按媒体类型注册，以输出键声明依赖，由执行器并发运行互不依赖的分支。
+
+    dag = PipelineDAG()
+
+    @dag.stage("image", provides=("text",), engine="ocr")
+    def ocr(ctx): ...
+
+    @dag.stage("image", provides=("tags",), optional=True, enabled=lambda: settings.tagging)
+    def tag(ctx): ...
+
+    @dag.stage(("audio", "image", "text"), requires=("text",), provides=("ner_extract",))
+    def ner(ctx): ...
+
+- 阶段函数接收 StageContext，返回的字典合并进 ctx.outputs，供后续阶段与最终入库使用；
+- requires 中的每个键必须恰好由同一媒体类型下的一个阶段 provides，执行计划在首次使用时校验并缓存；
+- optional 阶段失败只记警告，依赖它的阶段随之跳过；必需阶段失败则取消尚未开始的阶段并抛出；
+- 各阶段耗时写入 ctx.timings、hg_stage_seconds 与 trace span。
+"""
+import contextvars
+import threading
+import time
+from contextlib import nullcontext
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from dataclasses import dataclass, field
+from typing import Callable, Optional
+from scripts.logger import logger
+from scripts.progress import Progress
+from scripts.metrics import STAGE_SECONDS
+from scripts.tracing import span
+
+
+@dataclass
+class StageContext:
+    """单个文件在流水线中的状态"""
+    file_path: str
+    job_id: str
+    media: str
+    file_ext: str
+    size: str
+    outputs: dict = field(default_factory=dict)
+    timings: dict = field(default_factory=dict)
+
+
+@dataclass(frozen=True)
+class Stage:
+    name: str
+    func: Callable[[StageContext], dict]
+    provides: tuple = ()
+    requires: tuple = ()
+    optional: bool = False
+    enabled: Optional[Callable[[], bool]] = None
+    engine: Optional[str] = None       # 需要独占的引擎（asr / ocr），由 PipelineDAG.engine_guard 提供
+    progress: Optional[str] = None     # 开始时上报的进度阶段
+    progress_done: Optional[str] = None
+
+
+class PipelineDAG:
+    def __init__(self, max_workers: int = 8, engine_guard: Callable = None):
+        """
+        max_workers: 所有文件共用的阶段线程池大小
+        engine_guard: engine_guard(kind) 返回上下文管理器，阶段声明 engine 时在其中运行
+        """
+        self.stages = {}        # media -> [Stage]
+        self.engine_guard = engine_guard
+        self.max_workers = max_workers
+        self._executor = None
+        self._plans = {}
+        self._lock = threading.Lock()
+
+    # ---------------- 定义 ----------------
+
+    def stage(self, media, provides=(), requires=(), **options):
+        """注册阶段的装饰器；media 为单个媒体类型或其元组"""
+        def decorator(func):
+            stage = Stage(name=func.__name__.lstrip("_"), func=func,
+                          provides=tuple(provides), requires=tuple(requires), **options)
+            for kind in ((media,) if isinstance(media, str) else media):
+                self.stages.setdefault(kind, []).append(stage)
+            with self._lock:
+                self._plans.clear()
+            return func
+        return decorator
+
+    def media_types(self) -> list:
+        return list(self.stages)
+
+    def plan(self, media: str) -> dict:
+        """返回 {阶段名: (Stage, 前置阶段名集合)}，校验依赖是否完整、无环"""
+        with self._lock:
+            cached = self._plans.get(media)
+            if cached is not None:
+                return cached
+        stages = self.stages.get(media)
+        if not stages:
+            raise ValueError(f"没有为 {media} 注册流水线")
+        providers = {}
+        for stage in stages:
+            for key in stage.provides:
+                if key in providers:
+                    raise ValueError(f"[{media}] 输出 {key} 同时由 {providers[key]} 与 {stage.name} 提供")
+                providers[key] = stage.name
+        plan = {}
+        for stage in stages:
+            missing = [key for key in stage.requires if key not in providers]
+            if missing:
+                raise ValueError(f"[{media}] 阶段 {stage.name} 依赖的 {missing} 没有阶段提供")
+            after = {providers[key] for key in stage.requires}
+            for name in after:
+                upstream = next(s for s in stages if s.name == name)
+                if upstream.optional and not stage.optional:
+                    raise ValueError(f"[{media}] 必需阶段 {stage.name} 不能依赖可选阶段 {name}")
+            plan[stage.name] = (stage, after)
+        self._check_acyclic(media, plan)
+        with self._lock:
+            self._plans[media] = plan
+        return plan
+
+    @staticmethod
+    def _check_acyclic(media: str, plan: dict):
+        state = {}
+
+        def visit(name, path):
+            if state.get(name) == "done":
+                return
+            if state.get(name) == "visiting":
+                raise ValueError(f"[{media}] 阶段依赖成环: {' -> '.join(path + [name])}")
+            state[name] = "visiting"
+            for upstream in plan[name][1]:
+                visit(upstream, path + [name])
+            state[name] = "done"
+
+        for name in plan:
+            visit(name, [])
+
+    # ---------------- 执行 ----------------
+
+    def _pool(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="stage")
+            return self._executor
+
+    def _run_stage(self, stage: Stage, ctx: StageContext) -> dict:
+        if stage.progress:
+            Progress.job_update(ctx.job_id, stage.progress, file=ctx.job_id)
+        # 等待引擎的时间由 engine_guard 自行统计，不计入阶段耗时
+        guard = self.engine_guard(stage.engine) if stage.engine and self.engine_guard else nullcontext()
+        with guard, span(f"stage.{stage.name}"):
+            start = time.perf_counter()
+            try:
+                with STAGE_SECONDS.time(stage=stage.name, file_type=ctx.file_ext, size=ctx.size):
+                    output = stage.func(ctx)
+            finally:
+                ctx.timings[stage.name] = time.perf_counter() - start
+        if stage.progress_done:
+            Progress.job_update(ctx.job_id, stage.progress_done)
+        return output or {}
+
+    @staticmethod
+    def _skip_dependents(ctx: StageContext, pending: dict, skipped: set):
+        """前置阶段被跳过（未启用或可选阶段失败）时，可选阶段随之跳过，必需阶段报错"""
+        changed = True
+        while changed:
+            changed = False
+            for name, (stage, after) in list(pending.items()):
+                if not after & skipped:
+                    continue
+                if not stage.optional:
+                    raise RuntimeError(f"阶段 {name} 的前置阶段 {sorted(after & skipped)} 未执行")
+                del pending[name]
+                skipped.add(name)
+                changed = True
+                logger.info(f"[{ctx.job_id}] 跳过阶段 {name}：前置阶段未执行")
+
+    def run(self, ctx: StageContext) -> StageContext:
+        """按依赖并发执行 ctx.media 的全部已启用阶段，返回填好 outputs / timings 的 ctx"""
+        plan = self.plan(ctx.media)
+        pending, skipped = {}, set()
+        for name, entry in plan.items():
+            if entry[0].enabled is None or entry[0].enabled():
+                pending[name] = entry
+            else:
+                skipped.add(name)
+        finished = set()
+        running = {}
+        pool = self._pool()
+
+        try:
+            while pending or running:
+                self._skip_dependents(ctx, pending, skipped)
+                ready = [name for name, (_, after) in pending.items() if after <= finished]
+                for name in ready:
+                    stage = pending.pop(name)[0]
+                    # 复制上下文，trace 绑定随阶段进入线程池
+                    context = contextvars.copy_context()
+                    running[pool.submit(context.run, self._run_stage, stage, ctx)] = stage
+                if not running:
+                    if pending:
+                        raise RuntimeError(f"阶段无法调度: {list(pending)}")
+                    break
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    stage = running.pop(future)
+                    try:
+                        ctx.outputs.update(future.result())
+                        finished.add(stage.name)
+                    except Exception as e:
+                        if not stage.optional:
+                            raise
+                        skipped.add(stage.name)
+                        logger.warning(f"[{ctx.job_id}] 可选阶段 {stage.name} 失败，已跳过: {e}")
+        except Exception:
+            for future in running:
+                future.cancel()
+            raise
+        logger.info(f"[{ctx.job_id}] 阶段耗时: "
+                    + ", ".join(f"{name}={seconds:.3f}s" for name, seconds in ctx.timings.items()))
+        return ctx
@@ -0,0 +1,374 @@
+"""
+日期 / 时间规范化：把中文的日期、时间、星期、相对日期与区间表达转换为绝对的起止时刻。
+
+规则表 DATE_RULES / TIME_RULES / DURATION_RULES 的每一项为 (名称, 正则, 处理函数)，导入时编译一次：
+- 所有规则合并为一个扫描正则，一遍扫描找出文本中的全部表达，同一位置按表中顺序优先；
+- 单个表达再由所属规则的正则 fullmatch 取出分组，结果按 (规则, 表达, 基准日期) 缓存，
+  同一批上传中反复出现的“明天”“下午3点”只解析一次。
+
+    normalize("下周三下午3点到5点在会议室", datetime(2025, 9, 30, 10))
+    → ("2025-10-08 15:00:00", "2025-10-08 17:00:00")
+
+基准时刻为上传时间；结束时刻不含，只有日期时为最后一天的次日零点，只有开始时间时与开始相同。
+"""
+import re
+from datetime import date, datetime, time, timedelta
+from functools import lru_cache
+from dateutil.relativedelta import relativedelta
+
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+_CN_DIGITS = {"零": 0, "〇": 0, "一": 1, "二": 2, "两": 2, "三": 3, "四": 4,
+              "五": 5, "六": 6, "七": 7, "八": 8, "九": 9}
+_WEEKDAYS = {"一": 0, "二": 1, "三": 2, "四": 3, "五": 4, "六": 5, "日": 6, "天": 6}
+
+_NUM = r"(?:\d+|[零〇一二两三四五六七八九十]+)"
+_HOUR = r"(?:[01]?\d|2[0-4]|[零一二两三四五六七八九十]{1,3})"
+_MINUTE = r"(?:[0-5]?\d|[零一二三四五六七八九十]{1,3})"
+_PERIOD = r"(?:凌晨|早上|早晨|上午|中午|下午|傍晚|晚上|今晚|晚)"
+_CONNECTOR = r"\s*(?:至|到|—|–|-|~|～)\s*"
+# “3号楼”“10号线”“5号房”中的“号”是编号而不是日期
+_DAY_END = r"[日号](?![楼线房室床门号院栋层座位厅馆口车])"
+
+
+def cn_int(text: str) -> int:
+    """“12” / “十二” / “二十” / “两” → 整数"""
+    if text.isdigit():
+        return int(text)
+    if "十" in text:
+        tens, _, ones = text.partition("十")
+        return (_CN_DIGITS[tens] if tens else 1) * 10 + (_CN_DIGITS[ones] if ones else 0)
+    value = 0
+    for char in text:
+        value = value * 10 + _CN_DIGITS[char]
+    return value
+
+
+# ---------------- 日期 ----------------
+
+def _monday(base: date, weeks: int = 0) -> date:
+    return base - timedelta(days=base.weekday()) + timedelta(weeks=weeks)
+
+
+def _weekday(m, base: date) -> date:
+    prefix, day = m.group(1), _WEEKDAYS[m.group(2)]
+    if prefix is None:
+        # 不带前缀的“周三”指今天起最近的一个
+        return base + timedelta(days=(day - base.weekday()) % 7)
+    weeks = {"上上": -2, "上个": -1, "上": -1, "本": 0, "这个": 0, "这": 0, "下下": 2, "下个": 1, "下": 1}[prefix]
+    return _monday(base, weeks) + timedelta(days=day)
+
+
+def _relative(m, base: date) -> date:
+    n = cn_int(m.group(1)) * (-1 if m.group(3).endswith("前") else 1)
+    unit = m.group(2)
+    if unit in ("天", "日"):
+        return base + timedelta(days=n)
+    if unit in ("周", "星期", "个星期", "个礼拜"):
+        return base + timedelta(weeks=n)
+    if unit == "个月":
+        return base + relativedelta(months=n)
+    return base + relativedelta(years=n)
+
+
+_DAY_WORDS = {"大前天": -3, "前天": -2, "昨天": -1, "昨日": -1, "今天": 0, "今日": 0,
+              "明天": 1, "明日": 1, "后天": 2, "大后天": 3}
+_MONTH_WORDS = {"上个月": -1, "本月": 0, "这个月": 0, "下个月": 1, "下下个月": 2}
+_YEAR_WORDS = {"前年": -2, "去年": -1, "今年": 0, "明年": 1, "后年": 2, "大后年": 3}
+_MONTH_WORD_RE = "|".join(sorted(_MONTH_WORDS, key=len, reverse=True))
+_YEAR_WORD_RE = "|".join(sorted(_YEAR_WORDS, key=len, reverse=True))
+
+
+def _year_md(m, base: date) -> date:
+    """“明年3月5日”：年份词只决定年份"""
+    return date(base.year + _YEAR_WORDS[m.group(1)], cn_int(m.group(2)), cn_int(m.group(3)))
+
+
+def _month_day(m, base: date) -> date:
+    """“下个月3号”：月份词只决定月份"""
+    month = date(base.year, base.month, 1) + relativedelta(months=_MONTH_WORDS[m.group(1)])
+    return month.replace(day=cn_int(m.group(2)))
+
+
+def _md_span(m, base: date) -> tuple:
+    """“10月1-3日” → (开始日期, 结束日期)"""
+    start = date(base.year, cn_int(m.group(1)), cn_int(m.group(2)))
+    return start, start.replace(day=cn_int(m.group(3)))
+
+
+def _day_span(m, base: date) -> tuple:
+    """“1-3号” → (开始日期, 结束日期)，“30日至2日”跨月"""
+    start = date(base.year, base.month, cn_int(m.group(1)))
+    end = start.replace(day=cn_int(m.group(2)))
+    if end < start:
+        end = date(start.year, start.month, 1) + relativedelta(months=1, day=cn_int(m.group(2)))
+    return start, end
+
+
+# 组合表达（年份 / 月份词 + 月日）排在单独的年份 / 月份词之前，同一位置优先整体匹配；
+# *_span 规则的结果为 (开始日期, 结束日期)
+DATE_RULES = [
+    ("year_md", rf"({_YEAR_WORD_RE})\s*({_NUM})\s*月\s*({_NUM})\s*(?:{_DAY_END})?", _year_md),
+    ("month_day", rf"({_MONTH_WORD_RE})\s*({_NUM})\s*{_DAY_END}", _month_day),
+    ("ymd", r"(\d{4})\s*[年/.-]\s*(\d{1,2})\s*[月/.-]\s*(\d{1,2})\s*[日号]?",
+     lambda m, base: date(int(m.group(1)), int(m.group(2)), int(m.group(3)))),
+    ("mdy", r"(\d{1,2})/(\d{1,2})/(\d{4})",
+     lambda m, base: date(int(m.group(3)), int(m.group(1)), int(m.group(2)))),
+    ("md_span", rf"({_NUM})\s*月\s*({_NUM}){_CONNECTOR}({_NUM})\s*{_DAY_END}", _md_span),
+    ("md_cn", rf"({_NUM})\s*月\s*({_NUM})\s*(?:{_DAY_END})?",
+     lambda m, base: date(base.year, cn_int(m.group(1)), cn_int(m.group(2)))),
+    # 后面跟量词时是数量区间（“3-5人”“2-3次”），不是月日
+    ("md_num", r"(\d{1,2})[/-](\d{1,2})(?![\d:：天日周月年个小分号点人次岁元块位名条份本件张台辆米%])",
+     lambda m, base: date(base.year, int(m.group(1)), int(m.group(2)))),
+    ("day_span", rf"({_NUM}){_CONNECTOR}({_NUM})\s*{_DAY_END}", _day_span),
+    ("day", rf"({_NUM})\s*{_DAY_END}",
+     lambda m, base: date(base.year, base.month, cn_int(m.group(1)))),
+    ("rel_day", "|".join(sorted(_DAY_WORDS, key=len, reverse=True)),
+     lambda m, base: base + timedelta(days=_DAY_WORDS[m.group(0)])),
+    ("rel_n", rf"({_NUM})\s*(天|日|个星期|个礼拜|星期|周|个月|年)\s*(以后|之后|后|以前|之前|前)", _relative),
+    ("weekday", r"(上上|上个|上|本|这个|这|下下|下个|下)?\s*(?:周|星期|礼拜)([一二三四五六日天])", _weekday),
+    ("rel_month", _MONTH_WORD_RE,
+     lambda m, base: base + relativedelta(months=_MONTH_WORDS[m.group(0)])),
+    ("rel_year", _YEAR_WORD_RE,
+     lambda m, base: base + relativedelta(years=_YEAR_WORDS[m.group(0)])),
+]
+
+# 区间的结束端省略年份或月份时（“10月1日至7日”）以开始日期为基准
+_INHERIT_FROM_START = {"date_md_cn", "date_md_num", "date_day"}
+
+
+def _inherits(key: str, token: str) -> bool:
+    """区间结束端是否以开始日期为基准：省略年月的日期，或不带“上 / 下”前缀的星期（“下周一至周三”）"""
+    if key in _INHERIT_FROM_START:
+        return True
+    return key == "date_weekday" and _RULES[key][1].fullmatch(token).group(1) is None
+
+
+# ---------------- 时间 ----------------
+
+# 这些时段下的“12点”指当天结束，即次日零点
+_EVENING = ("晚上", "今晚", "晚")
+
+
+def _next_day(hour: str, period: str = None) -> int:
+    """“晚上12点”“24点”为次日 0 点，返回需要顺延的天数"""
+    h = cn_int(hour)
+    return int(h == 24 or (h == 12 and period in _EVENING))
+
+
+def _clock(hour: str, minute: str, period: str = None):
+    h = cn_int(hour)
+    if minute in (None, ""):
+        m = 0
+    elif minute == "半":
+        m = 30
+    elif minute == "一刻":
+        m = 15
+    elif minute == "三刻":
+        m = 45
+    else:
+        m = cn_int(minute)
+    if period in ("下午", "傍晚", "晚上", "今晚", "晚") and h < 12:
+        h += 12
+    elif period == "中午" and h < 11:
+        h += 12
+    elif period in ("凌晨", "晚上", "今晚", "晚") and h == 12:
+        h = 0
+    if h == 24:
+        h = 0
+    return time(h, m)
+
+
+# 时间规则的结果为 (开始 time, 结束 time 或 None, 开始时刻顺延的天数)
+
+def _clock_range(m, base=None) -> tuple:
+    start = _clock(m.group(1), m.group(2))
+    end = _clock(m.group(3), m.group(4)) if m.group(3) else None
+    return start, end, 0
+
+
+def _hour_range(m, base=None) -> tuple:
+    period = m.group(1)
+    if not (period or m.group(2).isdigit() or m.group(3) or m.group(4)):
+        # 单独的“一点”多为“快一点”之类的口语，不当作时间
+        raise ValueError(m.group(0))
+    start = _clock(m.group(2), m.group(3) or m.group(4), period)
+    days = _next_day(m.group(2), period)
+    if not m.group(6):
+        return start, None, days
+    # “下午3点到5点”：结束端沿用开始端的时段
+    end = _clock(m.group(6), m.group(7) or m.group(8), m.group(5) or period)
+    return start, end, days
+
+
+_MINUTE_PART = rf"(?:(半|一刻|三刻)|({_MINUTE})\s*分?)?"
+
+TIME_RULES = [
+    ("clock", rf"([01]?\d|2[0-3])\s*[:：]\s*([0-5]\d)(?:{_CONNECTOR}([01]?\d|2[0-3])\s*[:：]\s*([0-5]\d))?",
+     _clock_range),
+    ("hour", rf"({_PERIOD})?\s*({_HOUR})\s*[点时]\s*{_MINUTE_PART}"
+             rf"(?:{_CONNECTOR}({_PERIOD})?\s*({_HOUR})\s*[点时]\s*{_MINUTE_PART})?",
+     _hour_range),
+]
+
+
+# ---------------- 持续时间 ----------------
+
+def _duration(m, base=None) -> timedelta:
+    amount = 0.5 if m.group(1) == "半" else cn_int(m.group(1))
+    return timedelta(minutes=amount) if m.group(2) == "分钟" else timedelta(hours=amount)
+
+
+DURATION_RULES = [
+    ("hours", rf"({_NUM}|半)\s*个?\s*(小时|钟头|分钟|h|H)(?![a-zA-Z])", _duration),
+    ("half_day", r"半天", lambda m, base=None: timedelta(hours=4)),
+]
+
+
+# ---------------- 扫描 ----------------
+
+_KINDS = {"date": DATE_RULES, "time": TIME_RULES, "duration": DURATION_RULES}
+_RULES = {}
+for _kind, _table in _KINDS.items():
+    for _name, _pattern, _handler in _table:
+        _RULES[f"{_kind}_{_name}"] = (_kind, re.compile(_pattern), _handler)
+
+# 时间放在日期之前：“14:00-16:00” 不会被当作 “00-16” 月日
+_SCANNER = re.compile("|".join(
+    f"(?P<{key}>{regex.pattern})"
+    for kind in ("time", "date", "duration")
+    for key, (k, regex, _) in _RULES.items() if k == kind
+))
+_RANGE_GAP = re.compile(_CONNECTOR)
+
+
+@lru_cache(maxsize=8192)
+def _resolve(key: str, token: str, base: date):
+    """按规则解析单个表达，无法解析（如 2 月 30 日）时返回 None"""
+    _, regex, handler = _RULES[key]
+    m = regex.fullmatch(token)
+    if not m:
+        return None
+    try:
+        return handler(m, base)
+    except (ValueError, KeyError, OverflowError):
+        return None
+
+
+def _rule_for(kind: str, token: str):
+    for key, (k, regex, _) in _RULES.items():
+        if k == kind and regex.fullmatch(token):
+            return key
+    return None
+
+
+@lru_cache(maxsize=8192)
+def resolve_date(token: str, base: date):
+    """单个日期表达 → date（区间取开始日期），无法识别时返回 None"""
+    key = _rule_for("date", token.strip())
+    value = _resolve(key, token.strip(), base) if key else None
+    return value[0] if isinstance(value, tuple) else value
+
+
+@lru_cache(maxsize=4096)
+def resolve_time(token: str):
+    """单个时间表达 → (开始 time, 结束 time 或 None, 开始时刻顺延的天数)，无法识别时返回 None"""
+    key = _rule_for("time", token.strip())
+    return _resolve(key, token.strip(), None) if key else None
+
+
+def scan(text: str, base: date) -> list:
+    """[(类别, 规则名, 开始下标, 结束下标, 解析结果)]，解析失败的表达已剔除"""
+    found = []
+    for m in _SCANNER.finditer(text):
+        key = m.lastgroup
+        value = _resolve(key, m.group(0), base if _RULES[key][0] == "date" else None)
+        if value is not None:
+            found.append((_RULES[key][0], key, m.start(), m.end(), value))
+    return found
+
+
+def _gap(text: str, begin: int, end: int, times: list) -> str:
+    """text[begin:end] 去掉其中的时间表达后剩下的部分"""
+    pieces, cursor = [], begin
+    for item in times:
+        if begin <= item[2] and item[3] <= end:
+            pieces.append(text[cursor:item[2]])
+            cursor = item[3]
+    pieces.append(text[cursor:end])
+    return "".join(pieces)
+
+
+def normalize(text: str, base: datetime, masked=()) -> tuple:
+    """
+    文本 → (starts_at, ends_at)，格式为 TIMESTAMP_FORMAT；没有日期和时间时为 (None, None)。
+    masked 中的片段（周期表达，如“每周一三五”）先抹去，不当作具体日期。
+    """
+    for fragment in masked:
+        if fragment:
+            text = text.replace(fragment, " " * len(fragment))
+    found = scan(text, base.date())
+    dates = [item for item in found if item[0] == "date"]
+    times = [item for item in found if item[0] == "time"]
+    durations = [item for item in found if item[0] == "duration"]
+
+    start_date = end_date = None
+    ranged = False
+    if dates:
+        start_date = dates[0][4]
+        if isinstance(start_date, tuple):
+            # “1-3号”“10月1-3日”本身就是区间
+            start_date, end_date = start_date
+        # 紧接着“至 / 到 / -”的第二个日期构成区间，中间的时间（“9月30日 10:00至”）不算间隔
+        elif len(dates) > 1 and _RANGE_GAP.fullmatch(_gap(text, dates[0][3], dates[1][2], times)):
+            end_key, end_token = dates[1][1], text[dates[1][2]:dates[1][3]]
+            end_date = (_resolve(end_key, end_token, start_date) if _inherits(end_key, end_token)
+                        else dates[1][4])
+            if isinstance(end_date, tuple):
+                end_date = end_date[-1]
+            if end_date is not None and end_date < start_date and end_key in _INHERIT_FROM_START:
+                # “12月30日至1月3日”跨年、“30日至3日”跨月
+                end_date += relativedelta(months=1) if end_key == "date_day" else relativedelta(years=1)
+            ranged = end_date is not None
+        if end_date is not None and end_date < start_date:
+            end_date = None
+            ranged = False
+    if start_date is None:
+        if not times:
+            return None, None
+        start_date = base.date()
+
+    if times:
+        start_time, end_time, days = times[0][4]
+        start = datetime.combine(start_date, start_time) + timedelta(days=days)
+        if (ranged and end_time is None and len(times) > 1
+                and times[0][3] <= dates[1][2] and times[1][2] >= dates[1][3]):
+            # “9月30日 10:00至10月2日 12:00”：第二个时间落在结束日期上
+            end_start, _, end_days = times[1][4]
+            end = datetime.combine(end_date, end_start) + timedelta(days=end_days)
+            if end <= start:
+                end = start
+        elif end_time is not None:
+            end = datetime.combine(end_date or start.date(), end_time)
+            if end <= start:
+                end += timedelta(days=1)    # 跨午夜
+        elif durations:
+            end = start + durations[0][4]
+        elif end_date is not None:
+            end = datetime.combine(end_date + timedelta(days=1), time())
+        else:
+            end = start
+    else:
+        start = datetime.combine(start_date, time())
+        end = datetime.combine((end_date or start_date) + timedelta(days=1), time())
+    return start.strftime(TIMESTAMP_FORMAT), end.strftime(TIMESTAMP_FORMAT)
+
+
+def parse_timestamp(value: str):
+    """TIMESTAMP_FORMAT 或只有日期的字符串 → datetime，格式不符时返回 None"""
+    for fmt in (TIMESTAMP_FORMAT, "%Y-%m-%dT%H:%M:%S", "%Y-%m-%d"):
+        try:
+            return datetime.strptime(value, fmt)
+        except (TypeError, ValueError):
+            continue
+    return None
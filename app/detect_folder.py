@@ -1,10 +1,13 @@
 import time
 import threading
 from pathlib import Path
-from typing import Callable, Union
+from typing import Callable, Optional, Union
 from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler
 from scripts.logger import logger
+from scripts.progress import Progress
+from scripts.tracing import Tracer, bind, span
+from scripts.metrics import WATCHER_QUEUE_DEPTH, WATCHER_EVENTS, STABILITY_WAIT_SECONDS
 
 # -------------------------------------------------
 # 1️⃣ 等待文件稳定
@@ -61,23 +64,33 @@ def wait_until_file_stable(
 # -------------------------------------------------
 class FolderHandler(FileSystemEventHandler):
     def __init__(self, user_callback: Callable[[str], None],
-                 stable_seconds: float = 5.0):
+                 stable_seconds: float = 5.0, check_interval: float = 2.0,
+                 claim: Optional[Callable[[str], bool]] = None,
+                 release: Optional[Callable[[str], None]] = None):
         """
         Args:
             user_callback: 文件稳定后真正要执行的业务函数。
             stable_seconds: 文件大小/mtime 连续不变的时间阈值。
+            check_interval: 检查文件状态的间隔（秒）。
+            claim: 等待稳定之前先认领文件，返回 False 时跳过（其他 worker 正在处理或已处理）。
+            release: 认领后文件未能稳定（被删除或超时）时放弃认领。
         """
         self.user_callback = user_callback
+        self.claim = claim
+        self.release = release
         self.stable_seconds = stable_seconds
+        self.check_interval = check_interval
         self.processing_files = set()  # 当前正在处理的文件路径
         self.lock = threading.Lock()   # 保证线程安全
 
     def on_created(self, event):
         if not event.is_directory:
+            WATCHER_EVENTS.inc(event="created")
             self._process_when_stable(event.src_path)
 
     def on_modified(self, event):
         if not event.is_directory:
+            WATCHER_EVENTS.inc(event="modified")
             self._process_when_stable(event.src_path)
 
     def on_deleted(self, event):
@@ -89,10 +102,11 @@ class FolderHandler(FileSystemEventHandler):
     def _process_when_stable(self, path: str):
         with self.lock:
             if path in self.processing_files:
-                logger.debug(f"[跳过] 文件已在处理中：{path}")
+                logger.debug("[跳过] 文件已在处理中：%s", path)
                 return
             self.processing_files.add(path)
-            logger.debug(f"[加入处理队列] {path}")
+            WATCHER_QUEUE_DEPTH.set(len(self.processing_files))
+            logger.debug("[加入处理队列] %s", path)
 
         threading.Thread(
             target=self._wait_and_callback,
@@ -101,20 +115,35 @@ class FolderHandler(FileSystemEventHandler):
         ).start()
 
     def _wait_and_callback(self, path: str):
+        name = Path(path).name
+        claimed = False
         try:
-            logger.info(f"[开始等待稳定] {path}")
-            stable_path = wait_until_file_stable(
-                path, stable_seconds=self.stable_seconds)
-            logger.info(f"[文件稳定] {stable_path}")
-            self.user_callback(str(stable_path))
+            # 认领成功后才发布进度，多个 worker 同时监控时只有处理该文件的那个会推送
+            if self.claim is not None:
+                if not self.claim(path):
+                    return
+                claimed = True
+            with bind(Tracer.trace_for_file(name)):
+                logger.info(f"[开始等待稳定] {path}")
+                Progress.job_update(name, "stabilizing", file=name)
+                with STABILITY_WAIT_SECONDS.time(), span("watcher.stability_wait"):
+                    stable_path = wait_until_file_stable(
+                        path, stable_seconds=self.stable_seconds,
+                        check_interval=self.check_interval)
+                logger.info(f"[文件稳定] {stable_path}")
+                claimed = False     # 交给 user_callback，由其负责结束认领
+                self.user_callback(str(stable_path))
         except (FileNotFoundError, TimeoutError) as exc:
             logger.warning(f"[跳过文件] {exc}")
+            if claimed and self.release is not None:
+                self.release(path)
         except Exception as e:
             logger.exception(f"[处理出错] {path}: {e}")
         finally:
             with self.lock:
                 self.processing_files.discard(path)
-                logger.debug(f"[移除处理队列] {path}")
+                WATCHER_QUEUE_DEPTH.set(len(self.processing_files))
+                logger.debug("[移除处理队列] %s", path)
 
 
 # -------------------------------------------------
@@ -122,12 +151,23 @@ class FolderHandler(FileSystemEventHandler):
 # -------------------------------------------------
 def start_watch(folder_to_watch: Path,
                 user_callback: Callable[[str], None],
-                stable_seconds: float = 10.0):
+                stable_seconds: float = 10.0,
+                check_interval: float = 2.0,
+                stop_event: Optional[threading.Event] = None,
+                rescan_interval: Optional[float] = None,
+                claim: Optional[Callable[[str], bool]] = None,
+                release: Optional[Callable[[str], None]] = None):
     """
     Args:
         folder_to_watch: 监听的文件夹路径。
         user_callback: 业务处理函数，参数为稳定后的文件路径。
         stable_seconds: 连续不变多少秒视为稳定。
+        check_interval: 检查文件状态的间隔（秒）。
+        stop_event: 置位后停止监控（默认只响应 Ctrl+C）。
+        rescan_interval: 启动时及此后每隔多少秒重新提交目录中已有的文件
+            （停机期间到达的、处理失败等待重试的）；None 表示只在启动时扫描一次。
+        claim: 等待稳定之前先认领文件，返回 False 时跳过；为 None 时由 user_callback 自行判断。
+        release: 认领后文件未能稳定时放弃认领。
     """
     if not isinstance(folder_to_watch,Path):
         folder_to_watch = Path(folder_to_watch)
@@ -135,16 +175,27 @@ def start_watch(folder_to_watch: Path,
     if not folder_to_watch.exists():
         raise FileNotFoundError(folder_to_watch)
     
-    event_handler = FolderHandler(user_callback, stable_seconds)
+    event_handler = FolderHandler(user_callback, stable_seconds, check_interval, claim, release)
     observer = Observer()
-    observer.schedule(event_handler, folder_to_watch, recursive=True)
+    # 收件箱是平铺的，处理完成的文件会移到存储分片，无需递归监控
+    observer.schedule(event_handler, folder_to_watch, recursive=False)
     observer.start()
     logger.info(f"📂 正在监控：{str(folder_to_watch)}（Ctrl+C 退出）")
 
+    stop_event = stop_event or threading.Event()
+    next_scan = 0.0
     try:
         while True:
-            time.sleep(1)
+            if next_scan is not None and time.monotonic() >= next_scan:
+                # 是否真正处理由认领决定，已完成或尚在重试间隔内的文件会被跳过
+                for path in folder_to_watch.iterdir():
+                    if path.is_file():
+                        event_handler._process_when_stable(str(path))
+                next_scan = time.monotonic() + rescan_interval if rescan_interval else None
+            if stop_event.wait(1):
+                break
     except KeyboardInterrupt:
-        observer.stop()
+        pass
+    observer.stop()
     observer.join()
     logger.info("🛑 文件监控已停止。")
@@ -0,0 +1,184 @@
+"""
+OCR 前的图片预处理：EXIF 方向校正 → 按估计的文字高度缩放 → （可选）分块 → （可选）灰度化。
+
+手机照片动辄 1200 万像素以上，而文字本身往往很大，直接送进 PaddleOCR 时
+解码、检测、识别的耗时都随像素数增长；缩放到“文字刚好够清晰”的尺寸即可。
+"""
+from dataclasses import dataclass, field
+from scripts.settings import settings
+
+
+@dataclass
+class Tile:
+    """缩放后图片中的一块；owned 为该块负责的区域（重叠区按中线划分），坐标均为缩放后的像素"""
+    image: object           # numpy.ndarray, BGR
+    x0: int
+    y0: int
+    owned: tuple            # (x0, y0, x1, y1)
+
+    def owns(self, box) -> bool:
+        """框中心落在本块负责的区域内才保留，避免重叠区的同一行被识别两次"""
+        cx = sum(p[0] for p in box) / len(box) + self.x0
+        cy = sum(p[1] for p in box) / len(box) + self.y0
+        x0, y0, x1, y1 = self.owned
+        return x0 <= cx < x1 and y0 <= cy < y1
+
+
+@dataclass
+class PreparedImage:
+    size: tuple                     # EXIF 校正后的原图尺寸 (w, h)
+    scale: float                    # 缩放比例（≤ 1）
+    text_px: float = None           # 估计的原图文字高度，无法估计时为 None
+    grayscale: bool = False
+    tiles: list = field(default_factory=list)
+
+    def to_original(self, box, tile: Tile) -> list:
+        """把块内坐标换算回原图坐标"""
+        return [[(p[0] + tile.x0) / self.scale, (p[1] + tile.y0) / self.scale] for p in box]
+
+    @property
+    def info(self) -> dict:
+        return {
+            "size": list(self.size),
+            "scale": round(self.scale, 4),
+            "text_px": round(self.text_px, 1) if self.text_px else None,
+            "grayscale": self.grayscale,
+            "tiles": len(self.tiles),
+        }
+
+
+class ImagePreprocessor:
+    ANALYSIS_SIDE = 1024        # 估计文字大小时使用的缩略图长边
+    GRAY_SATURATION = 24        # 平均饱和度低于此值视为黑白文档/截图
+
+    def __init__(self,
+                 target_text_px: float = None,
+                 min_side: int = None,
+                 max_side: int = None,
+                 tile_size: int = None,
+                 grayscale: str = None):
+        """
+        :param target_text_px: 缩放后期望的文字高度（像素）
+        :param min_side: 缩放后长边下限，避免估计偏差时把小字缩没
+        :param max_side: 不分块时缩放后长边上限
+        :param tile_size: 分块边长，0 表示不分块
+        :param grayscale: auto / on / off
+        """
+        self.target_text_px = target_text_px or settings.ocr_target_text_px
+        self.min_side = min_side or settings.ocr_min_side
+        self.max_side = max_side or settings.ocr_max_side
+        self.tile_size = settings.ocr_tile_size if tile_size is None else tile_size
+        self.grayscale = grayscale or settings.ocr_grayscale
+
+    # ---------------- 入口 ----------------
+
+    def prepare(self, image_path) -> PreparedImage:
+        from PIL import Image, ImageOps
+
+        with Image.open(image_path) as img:
+            img = ImageOps.exif_transpose(img)
+            img = img.convert("RGB")
+        width, height = img.size
+        long_side = max(width, height)
+
+        thumb = img.copy()
+        thumb.thumbnail((self.ANALYSIS_SIDE, self.ANALYSIS_SIDE))
+        text_px = self._estimate_text_height(thumb)
+        if text_px is not None:
+            text_px *= long_side / max(thumb.size)
+        gray = self._use_grayscale(thumb)
+
+        scale = self._choose_scale(long_side, text_px)
+        if scale < 1.0:
+            img = img.resize((max(1, round(width * scale)), max(1, round(height * scale))), Image.LANCZOS)
+        if gray:
+            img = img.convert("L").convert("RGB")
+
+        prepared = PreparedImage(size=(width, height), scale=scale, text_px=text_px, grayscale=gray)
+        prepared.tiles = self._split(self._to_bgr(img))
+        return prepared
+
+    # ---------------- 各步骤 ----------------
+
+    def _choose_scale(self, long_side: int, text_px: float) -> float:
+        scale = 1.0
+        if text_px:
+            scale = self.target_text_px / text_px
+        # 不放大；不低于 min_side；不分块时不超过 max_side
+        scale = max(scale, self.min_side / long_side)
+        if not self.tile_size:
+            scale = min(scale, self.max_side / long_side)
+        return min(1.0, scale)
+
+    @staticmethod
+    def _estimate_text_height(thumb) -> float:
+        """
+        在缩略图上二值化并统计连通域高度的中位数，作为文字高度的粗略估计。
+        连通域太少（纯照片、空白图）时返回 None，此时只按长边限制缩放。
+        """
+        import cv2
+        import numpy as np
+
+        gray = np.asarray(thumb.convert("L"))
+        _, bw = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+        # 深底浅字时前景占多数，取反
+        if bw.mean() > 127:
+            bw = 255 - bw
+        _, _, stats, _ = cv2.connectedComponentsWithStats(bw, connectivity=8)
+        stats = stats[1:]
+        if len(stats) == 0:
+            return None
+        h = stats[:, cv2.CC_STAT_HEIGHT]
+        w = stats[:, cv2.CC_STAT_WIDTH]
+        area = stats[:, cv2.CC_STAT_AREA]
+        keep = (
+            (h >= 4) & (h <= gray.shape[0] * 0.2) & (w <= gray.shape[1] * 0.2)
+            & (area >= 8) & (w <= h * 10) & (h <= w * 10)
+        )
+        if keep.sum() < 20:
+            return None
+        return float(np.median(h[keep]))
+
+    def _use_grayscale(self, thumb) -> bool:
+        if self.grayscale in ("on", "off"):
+            return self.grayscale == "on"
+        import numpy as np
+        saturation = np.asarray(thumb.convert("HSV"))[:, :, 1]
+        return float(saturation.mean()) < self.GRAY_SATURATION
+
+    @staticmethod
+    def _to_bgr(img):
+        import numpy as np
+        return np.ascontiguousarray(np.asarray(img)[:, :, ::-1])
+
+    def _split(self, image) -> list:
+        """超过 1.5 倍块大小时分块，相邻块重叠 4 行文字高度"""
+        height, width = image.shape[:2]
+        size = self.tile_size
+        if not size or max(width, height) <= size * 1.5:
+            return [Tile(image, 0, 0, (0, 0, width, height))]
+
+        overlap = int(self.target_text_px * 4)
+        xs = self._starts(width, size, overlap)
+        ys = self._starts(height, size, overlap)
+        tiles = []
+        for iy, y0 in enumerate(ys):
+            for ix, x0 in enumerate(xs):
+                x1, y1 = min(x0 + size, width), min(y0 + size, height)
+                owned = (
+                    0 if ix == 0 else x0 + overlap // 2,
+                    0 if iy == 0 else y0 + overlap // 2,
+                    width if ix == len(xs) - 1 else xs[ix + 1] + overlap // 2,
+                    height if iy == len(ys) - 1 else ys[iy + 1] + overlap // 2,
+                )
+                tiles.append(Tile(image[y0:y1, x0:x1], x0, y0, owned))
+        return tiles
+
+    @staticmethod
+    def _starts(length: int, size: int, overlap: int) -> list:
+        step = max(1, size - overlap)
+        starts = list(range(0, max(1, length - overlap), step))
+        # 最后一块贴齐边缘
+        if starts[-1] + size < length:
+            starts.append(length - size)
+        return starts
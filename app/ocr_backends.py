@@ -0,0 +1,111 @@
+"""
+OCR 推理后端。OCRProcessor 只依赖 ocr(image) -> [(box, text, score)]，
+image 可以是路径或 BGR numpy 数组，box 为输入图坐标下的四个顶点。
+具体引擎由 OCR_BACKEND 选择：
+
+    paddle   PaddleOCR（Paddle Inference，原有实现）
+    onnx     ONNX Runtime CPU，运行同一套 ch_PP-OCRv3 det/rec 模型的 ONNX 转换版本，
+             前后处理见 app.ocr_ops
+
+模型转换（paddle2onnx，动态输入尺寸）：
+    paddle2onnx --model_dir resources/ch_PP-OCRv3_det_infer --model_filename inference.pdmodel \\
+        --params_filename inference.pdiparams --save_file resources/ch_PP-OCRv3_det_infer.onnx \\
+        --opset_version 11
+    识别模型同理，另需 PaddleOCR 自带的字典 ppocr_keys_v1.txt（OCR_REC_DICT_PATH）。
+
+两个后端都不丢弃低分结果（Paddle 默认 drop_score=0.5），阈值统一由 lines_to_text 应用。
+各后端的重量级依赖都在构造时才导入。
+"""
+from scripts.settings import settings
+from scripts.logger import logger
+
+
+class OCRBackend:
+    name = "base"
+
+    def ocr(self, image) -> list:
+        raise NotImplementedError
+
+
+class PaddleBackend(OCRBackend):
+    name = "paddle"
+
+    def __init__(self, det_path, rec_path, threads: int, lang: str = "ch", use_gpu: bool = False):
+        from paddleocr import PaddleOCR
+        self.engine = PaddleOCR(
+            cpu_threads=threads,
+            use_angle_cls=False,  # Set to True if you have a direction classification model
+            det_model_dir=str(det_path),
+            rec_model_dir=str(rec_path),
+            drop_score=0.0,
+            lang=lang,
+            use_gpu=use_gpu
+        )
+
+    def ocr(self, image) -> list:
+        results = self.engine.ocr(image, cls=False)
+        return [(box, text, score) for box, (text, score) in results[0] or []]
+
+
+class OnnxBackend(OCRBackend):
+    name = "onnx"
+
+    def __init__(self, det_path, rec_path, dict_path, threads: int):
+        import onnxruntime as ort
+        from app import ocr_ops
+
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = threads
+        options.inter_op_num_threads = 1
+        options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        providers = ["CPUExecutionProvider"]
+        self.det = ort.InferenceSession(str(det_path), sess_options=options, providers=providers)
+        self.rec = ort.InferenceSession(str(rec_path), sess_options=options, providers=providers)
+        self.det_input = self.det.get_inputs()[0].name
+        self.rec_input = self.rec.get_inputs()[0].name
+        self.charset = ocr_ops.load_charset(dict_path)
+        self.ops = ocr_ops
+
+    def ocr(self, image) -> list:
+        if isinstance(image, str) or hasattr(image, "__fspath__"):
+            import cv2
+            image = cv2.imread(str(image))
+            if image is None:
+                raise ValueError("无法读取图片")
+        ops = self.ops
+
+        tensor, _ = ops.det_preprocess(image)
+        prob = self.det.run(None, {self.det_input: tensor})[0][0, 0]
+        boxes = ops.db_postprocess(prob, image.shape[:2])
+        if not boxes:
+            return []
+
+        crops = [ops.crop_box(image, box) for box in boxes]
+        recognized = [None] * len(crops)
+        for index, batch in ops.rec_batches(crops):
+            probs = self.rec.run(None, {self.rec_input: batch})[0]
+            for i, item in zip(index, ops.ctc_decode(probs, self.charset)):
+                recognized[i] = item
+        return [(box, text, score) for box, (text, score) in zip(boxes, recognized)]
+
+
+BACKENDS = {
+    PaddleBackend.name: PaddleBackend,
+    OnnxBackend.name: OnnxBackend,
+}
+
+
+def create_backend(name: str, budget, lang: str = "ch", use_gpu: bool = False) -> OCRBackend:
+    """按后端名从 settings 取模型路径并加载；线程数取 OCR 预算或 OCR_ONNX_THREADS"""
+    if name == PaddleBackend.name:
+        backend = PaddleBackend(settings.ocr_det_path, settings.ocr_rec_path, budget.ocr, lang, use_gpu)
+        path = settings.ocr_det_path.parent
+    elif name == OnnxBackend.name:
+        backend = OnnxBackend(settings.ocr_det_onnx_path, settings.ocr_rec_onnx_path,
+                              settings.ocr_rec_dict_path, settings.ocr_onnx_threads or budget.ocr)
+        path = settings.ocr_det_onnx_path.parent
+    else:
+        raise ValueError(f"未知的 OCR 后端: {name}，可选: {', '.join(BACKENDS)}")
+    logger.info(f"[OCR] 已加载 {name}: {path}")
+    return backend
@@ -0,0 +1,190 @@
+"""
+PP-OCRv3 检测 / 识别模型的前后处理（纯 numpy + OpenCV），
+与 PaddleOCR 2.x 的默认参数保持一致，供不依赖 Paddle 运行时的后端使用：
+
+    检测：DetResizeForTest(limit_side_len=960, max) → NormalizeImage(ImageNet) → DB 后处理
+    识别：按宽高比分批、高 48 等比缩放 → CTC 贪心解码
+
+输入图片均为 BGR 的 numpy 数组（与 cv2.imread 一致）。
+"""
+import math
+
+DET_LIMIT_SIDE = 960
+DET_MEAN = (0.485, 0.456, 0.406)
+DET_STD = (0.229, 0.224, 0.225)
+DB_THRESH = 0.3
+DB_BOX_THRESH = 0.6
+DB_UNCLIP_RATIO = 1.5
+DB_MAX_CANDIDATES = 1000
+DB_MIN_SIZE = 3
+REC_HEIGHT = 48
+REC_WIDTH = 320
+REC_BATCH = 6
+
+
+# ---------------- 检测 ----------------
+
+def det_preprocess(image):
+    """返回 (1, 3, H, W) float32 张量及缩放后的尺寸"""
+    import cv2
+    import numpy as np
+
+    h, w = image.shape[:2]
+    ratio = DET_LIMIT_SIDE / max(h, w) if max(h, w) > DET_LIMIT_SIDE else 1.0
+    resize_h = max(int(round(h * ratio / 32) * 32), 32)
+    resize_w = max(int(round(w * ratio / 32) * 32), 32)
+    resized = cv2.resize(image, (resize_w, resize_h))
+    x = (resized.astype("float32") / 255.0 - np.array(DET_MEAN, dtype="float32")) / np.array(DET_STD, dtype="float32")
+    return x.transpose(2, 0, 1)[None], (resize_h, resize_w)
+
+
+def _mini_box(contour):
+    """最小外接矩形的四个顶点（左上、右上、右下、左下）及短边长度"""
+    import cv2
+
+    rect = cv2.minAreaRect(contour)
+    points = sorted(cv2.boxPoints(rect).tolist(), key=lambda p: p[0])
+    left = sorted(points[:2], key=lambda p: p[1])
+    right = sorted(points[2:], key=lambda p: p[1])
+    box = [left[0], right[0], right[1], left[1]]
+    return box, min(rect[1])
+
+
+def _box_score(prob, box) -> float:
+    """框内概率均值（与 PaddleOCR 的 box_score_fast 一致）"""
+    import cv2
+    import numpy as np
+
+    h, w = prob.shape
+    box = np.array(box)
+    xmin = int(np.clip(np.floor(box[:, 0].min()), 0, w - 1))
+    xmax = int(np.clip(np.ceil(box[:, 0].max()), 0, w - 1))
+    ymin = int(np.clip(np.floor(box[:, 1].min()), 0, h - 1))
+    ymax = int(np.clip(np.ceil(box[:, 1].max()), 0, h - 1))
+    mask = np.zeros((ymax - ymin + 1, xmax - xmin + 1), dtype="uint8")
+    shifted = box - [xmin, ymin]
+    cv2.fillPoly(mask, shifted.reshape(1, -1, 2).astype("int32"), 1)
+    return float(cv2.mean(prob[ymin:ymax + 1, xmin:xmax + 1], mask)[0])
+
+
+def _unclip(box, ratio: float):
+    """
+    按 DB 的 unclip 距离（面积 × ratio / 周长）向外扩张。
+    对矩形而言，多边形偏移后的最小外接矩形就是宽高各加 2 × 距离，因此不需要 pyclipper。
+    """
+    import cv2
+    import numpy as np
+
+    poly = np.array(box, dtype="float32")
+    area = abs(cv2.contourArea(poly))
+    length = cv2.arcLength(poly, True)
+    if length == 0:
+        return None
+    distance = area * ratio / length
+    (cx, cy), (rw, rh), angle = cv2.minAreaRect(poly)
+    return cv2.boxPoints(((cx, cy), (rw + 2 * distance, rh + 2 * distance), angle))
+
+
+def db_postprocess(prob, src_size: tuple) -> list:
+    """
+    prob: (H, W) 概率图；src_size: 原图 (h, w)。
+    返回原图坐标下的文本框列表，已按阅读顺序排序。
+    """
+    import cv2
+    import numpy as np
+
+    height, width = prob.shape
+    src_h, src_w = src_size
+    bitmap = (prob > DB_THRESH).astype("uint8") * 255
+    contours, _ = cv2.findContours(bitmap, cv2.RETR_LIST, cv2.CHAIN_APPROX_SIMPLE)
+
+    boxes = []
+    for contour in contours[:DB_MAX_CANDIDATES]:
+        box, short_side = _mini_box(contour)
+        if short_side < DB_MIN_SIZE:
+            continue
+        if _box_score(prob, box) < DB_BOX_THRESH:
+            continue
+        expanded = _unclip(box, DB_UNCLIP_RATIO)
+        if expanded is None:
+            continue
+        box, short_side = _mini_box(expanded.reshape(-1, 1, 2))
+        if short_side < DB_MIN_SIZE + 2:
+            continue
+        box = np.array(box)
+        box[:, 0] = np.clip(np.round(box[:, 0] / width * src_w), 0, src_w)
+        box[:, 1] = np.clip(np.round(box[:, 1] / height * src_h), 0, src_h)
+        boxes.append(box.tolist())
+    return sort_boxes(boxes)
+
+
+def sort_boxes(boxes: list) -> list:
+    """从上到下、从左到右；同一行（纵向相差 < 10px）内按横坐标（与 PaddleOCR sorted_boxes 一致）"""
+    boxes = sorted(boxes, key=lambda b: (b[0][1], b[0][0]))
+    for i in range(len(boxes) - 1):
+        for j in range(i, -1, -1):
+            if abs(boxes[j + 1][0][1] - boxes[j][0][1]) < 10 and boxes[j + 1][0][0] < boxes[j][0][0]:
+                boxes[j], boxes[j + 1] = boxes[j + 1], boxes[j]
+            else:
+                break
+    return boxes
+
+
+def crop_box(image, box):
+    """透视变换裁出文本行，竖排（高/宽 ≥ 1.5）时旋转为横排"""
+    import cv2
+    import numpy as np
+
+    points = np.array(box, dtype="float32")
+    crop_w = int(max(np.linalg.norm(points[0] - points[1]), np.linalg.norm(points[2] - points[3])))
+    crop_h = int(max(np.linalg.norm(points[0] - points[3]), np.linalg.norm(points[1] - points[2])))
+    target = np.array([[0, 0], [crop_w, 0], [crop_w, crop_h], [0, crop_h]], dtype="float32")
+    matrix = cv2.getPerspectiveTransform(points, target)
+    crop = cv2.warpPerspective(image, matrix, (max(crop_w, 1), max(crop_h, 1)),
+                               borderMode=cv2.BORDER_REPLICATE, flags=cv2.INTER_CUBIC)
+    if crop.shape[0] / max(crop.shape[1], 1) >= 1.5:
+        crop = np.rot90(crop)
+    return crop
+
+
+# ---------------- 识别 ----------------
+
+def rec_batches(crops: list):
+    """按宽高比排序后分批，产出 (原始下标列表, (N, 3, 48, W) 张量)"""
+    import cv2
+    import numpy as np
+
+    order = sorted(range(len(crops)), key=lambda i: crops[i].shape[1] / max(crops[i].shape[0], 1))
+    for start in range(0, len(order), REC_BATCH):
+        index = order[start:start + REC_BATCH]
+        max_ratio = max([REC_WIDTH / REC_HEIGHT] + [crops[i].shape[1] / max(crops[i].shape[0], 1) for i in index])
+        batch_w = int(REC_HEIGHT * max_ratio)
+        batch = np.zeros((len(index), 3, REC_HEIGHT, batch_w), dtype="float32")
+        for n, i in enumerate(index):
+            h, w = crops[i].shape[:2]
+            resized_w = min(batch_w, int(math.ceil(REC_HEIGHT * w / max(h, 1))))
+            resized = cv2.resize(crops[i], (max(resized_w, 1), REC_HEIGHT)).astype("float32")
+            resized = (resized / 255.0 - 0.5) / 0.5
+            batch[n, :, :, :resized.shape[1]] = resized.transpose(2, 0, 1)
+        yield index, batch
+
+
+def load_charset(dict_path) -> list:
+    """PP-OCR 字典：下标 0 为 CTC blank，末尾追加空格"""
+    with open(dict_path, "r", encoding="utf-8") as f:
+        chars = [line.rstrip("\r\n") for line in f]
+    return ["blank"] + chars + [" "]
+
+
+def ctc_decode(probs, charset: list) -> list:
+    """probs: (N, T, C) 已 softmax；返回 [(text, score)]"""
+    indices = probs.argmax(axis=2)
+    maxima = probs.max(axis=2)
+    results = []
+    for idx, prob in zip(indices, maxima):
+        keep = idx != 0
+        keep[1:] &= idx[1:] != idx[:-1]
+        chars = [charset[i] for i in idx[keep] if i < len(charset)]
+        score = float(prob[keep].mean()) if keep.any() else 0.0
+        results.append(("".join(chars), score))
+    return results
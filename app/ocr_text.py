@@ -0,0 +1,84 @@
+"""
+OCR 原始结果（框、文字、置信度）的紧凑存储格式，以及从中重新生成文本。
+
+存储时坐标取整、分数保留 4 位小数，JSON 后 zlib 压缩；
+读取后可按任意阈值、按检测顺序或阅读顺序重新拼出文本，无需再次运行 OCR。
+"""
+import json
+import zlib
+
+FORMAT_VERSION = 1
+
+
+def pack_lines(lines: list, **meta) -> bytes:
+    """lines: [(box, text, score)]，box 为四个顶点"""
+    data = {
+        "v": FORMAT_VERSION,
+        **meta,
+        "boxes": [[round(c) for point in box for c in point] for box, _, _ in lines],
+        "texts": [text for _, text, _ in lines],
+        "scores": [round(float(score), 4) for _, _, score in lines],
+    }
+    return zlib.compress(json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+
+
+def unpack_lines(blob: bytes) -> tuple:
+    """返回 (lines, meta)，lines 中 box 还原为 [[x, y], ...]"""
+    data = json.loads(zlib.decompress(blob))
+    boxes = data.pop("boxes")
+    texts = data.pop("texts")
+    scores = data.pop("scores")
+    lines = [
+        ([[flat[i], flat[i + 1]] for i in range(0, len(flat), 2)], text, score)
+        for flat, text, score in zip(boxes, texts, scores)
+    ]
+    return lines, data
+
+
+def reading_order(lines: list) -> list:
+    """
+    按阅读顺序排列：中心纵坐标相近（相差不到半个框高）的框归为同一行，
+    行内从左到右，行间从上到下。返回 [[(box, text, score), ...], ...]。
+    """
+    def geometry(line):
+        ys = [p[1] for p in line[0]]
+        xs = [p[0] for p in line[0]]
+        return (min(ys) + max(ys)) / 2, max(ys) - min(ys), min(xs)
+
+    rows = []   # [中心 y, 高度, [行内的框]]
+    for line in sorted(lines, key=lambda l: geometry(l)[0]):
+        cy, height, _ = geometry(line)
+        if rows and abs(cy - rows[-1][0]) <= max(height, rows[-1][1]) / 2:
+            row = rows[-1]
+            row[2].append(line)
+            row[0] = sum(geometry(l)[0] for l in row[2]) / len(row[2])
+            row[1] = max(row[1], height)
+        else:
+            rows.append([cy, height, [line]])
+    return [sorted(row[2], key=lambda l: geometry(l)[2]) for row in rows]
+
+
+def _join(left: str, right: str) -> str:
+    # 中文之间不加空格，英文单词/数字之间加空格
+    if left and right and left[-1].isascii() and right[0].isascii():
+        return " "
+    return ""
+
+
+def lines_to_text(lines: list, min_score: float = 0.0, order: str = "detected") -> str:
+    """
+    order=detected 与 OCRProcessor 写入的文本一致（每个框一行）；
+    order=reading 把同一行的框拼在一起。
+    """
+    kept = [line for line in lines if line[2] > min_score]
+    if order == "detected":
+        return "".join(text + "\n" for _, text, _ in kept)
+    if order != "reading":
+        raise ValueError(f"未知的排序方式: {order}")
+    out = []
+    for row in reading_order(kept):
+        text = ""
+        for _, piece, _ in row:
+            text += _join(text, piece) + piece
+        out.append(text)
+    return "".join(text + "\n" for text in out)
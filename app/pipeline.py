@@ -0,0 +1,310 @@
+from pathlib import Path
+import os
+import socket
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from scripts.logger import logger
+from scripts.settings import settings
+from scripts.progress import Progress
+from scripts.metrics import STAGE_SECONDS, PIPELINE_FILES, ENGINE_WAIT_SECONDS, size_bucket
+from scripts.tracing import Tracer, bind, span, current_trace
+from database.processor import ProcessDB
+from app.ocr_text import pack_lines
+from app.dag import PipelineDAG, StageContext
+from scripts.Tools import r
+from scripts.storage import settle_original, uploaded_at, quarantine
+from app.recurrence import materialize_event
+from app.date_norm import TIMESTAMP_FORMAT
+from datetime import datetime
+
+# 处理器实例：默认在首次使用时加载，也可通过 set_processor 注入（基准测试用桩实现）
+_processors = {}
+_processors_lock = threading.Lock()
+
+# 同一引擎同一时刻只跑一个任务：模型实例不保证线程安全，且线程预算按“每个引擎一个任务”划分
+_engine_locks = {"asr": threading.Lock(), "ocr": threading.Lock()}
+
+# 分级转写：精确模型重转在单独的后台线程中排队执行
+_refine_executor = None
+
+# 认领文件时使用的进程标识
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"
+
+
+def _create_processor(kind: str):
+    if kind == "asr":
+        from app.ASR import ASEProcessor
+        return ASEProcessor()
+    if kind == "ocr":
+        from app.OCR import OCRProcessor
+        return OCRProcessor()
+    if kind == "ner":
+        from app.NER_1_re import NERProcessor
+        return NERProcessor()
+    if kind == "tag":
+        from app.yolo import ImageTagger
+        return ImageTagger()
+    raise ValueError(f"未知的处理器类型: {kind}")
+
+
+def get_processor(kind: str):
+    """返回 asr / ocr / ner / tag 处理器，不存在时加载"""
+    processor = _processors.get(kind)
+    if processor is None:
+        with _processors_lock:
+            processor = _processors.get(kind)
+            if processor is None:
+                processor = _processors[kind] = _create_processor(kind)
+    return processor
+
+
+def set_processor(kind: str, processor):
+    """替换处理器实现，接口需与 ASEProcessor / OCRProcessor / NERProcessor 一致"""
+    with _processors_lock:
+        _processors[kind] = processor
+
+
+@contextmanager
+def _engine(kind: str):
+    """占用引擎，等待时间计入 hg_engine_wait_seconds"""
+    lock = _engine_locks[kind]
+    with ENGINE_WAIT_SECONDS.time(engine=kind):
+        lock.acquire()
+    try:
+        yield
+    finally:
+        lock.release()
+
+
+def load_processors(*kinds: str):
+    """预先加载模型，避免首个文件承担加载耗时"""
+    for kind in kinds or ("asr", "ocr", "ner") + (("tag",) if settings.tagging else ()):
+        get_processor(kind)
+
+
+def claim_new_file(file_path: str) -> bool:
+    """认领监控到的文件；其他 worker 已认领，或本进程已处理过（监控器可能对同一文件重复触发）时返回 False"""
+    name = Path(file_path).name
+    if not ProcessDB().claim_file(name, WORKER_ID):
+        logger.info(f"文件已被认领或已处理，跳过: {name}")
+        return False
+    return True
+
+
+def release_new_file(file_path: str):
+    """放弃 claim_new_file 的认领（文件未能稳定），之后的重新扫描可立即再次认领"""
+    ProcessDB().release_claim(Path(file_path).name, WORKER_ID)
+
+
+def handle_new_file(file_path: str, claimed: bool = False):
+    """
+    处理监控到的新文件，根据类型分发到ASR或OCR处理。
+    claimed 为 True 表示调用方（监控器）已通过 claim_new_file 认领
+    """
+    name = Path(file_path).name
+    db = ProcessDB()
+    if not claimed and not claim_new_file(file_path):
+        return
+    # 沿用上传时分配的 trace，直接调用时按文件名补齐
+    trace_id = current_trace() or Tracer.trace_for_file(name)
+    status = "failed"
+    try:
+        with bind(trace_id), span("pipeline.handle_new_file", file=name):
+            _handle_new_file(file_path)
+        status = "done"
+    finally:
+        # 失败的文件留在收件箱，等待重试间隔后由监控器重新提交；重试次数用尽时移出收件箱
+        if db.finish_claim(name, status):
+            quarantine(file_path)
+
+
+# ---------------- 流水线定义 ----------------
+
+MEDIA_TYPES = {
+    "audio": {'wav', 'mp3', 'ogg', 'flac', 'm4a'},
+    "image": {'jpg', 'jpeg', 'png', 'bmp', 'gif'},
+    "text": {'txt'},
+}
+
+# 各媒体类型的文本来源，写入 transcripts.source
+_TRANSCRIPT_SOURCE = {"audio": "asr", "image": "ocr", "text": "text"}
+
+DAG = PipelineDAG(engine_guard=_engine)
+
+
+def media_type(file_ext: str):
+    return next((media for media, exts in MEDIA_TYPES.items() if file_ext in exts), None)
+
+
+@DAG.stage("audio", provides=("text",), engine="asr", progress="asr_running")
+def _asr(ctx: StageContext) -> dict:
+    asr = get_processor("asr")
+    result = asr.process_audio(ctx.file_path)
+    if getattr(asr, "tiered", False):
+        # 快速模型的结果先入库，标记为临时
+        result["provisional"] = 1
+    logger.info(f"ASR处理完成: {len(result['text'])} 字")
+    return result
+
+
+@DAG.stage("image", provides=("text",), engine="ocr", progress="ocr_running")
+def _ocr(ctx: StageContext) -> dict:
+    result = get_processor("ocr").process_image(ctx.file_path)
+    logger.info(f"OCR处理完成: {len(result['text'])} 字")
+    return result
+
+
+@DAG.stage("image", provides=("tags",), optional=True, enabled=lambda: settings.tagging)
+def _tag(ctx: StageContext) -> dict:
+    # 打标签在 ImageTagger 的线程中与其他文件攒批执行，这里只等待本图结果
+    labels = get_processor("tag").tag(ctx.file_path, timeout=300)
+    return {"tags": [item["label"] for item in labels] or None}
+
+
+@DAG.stage("text", provides=("text",), progress="text_loaded")
+def _read_text(ctx: StageContext) -> dict:
+    return {'text': r(ctx.file_path), 'file_processed': ctx.file_path, 'file_original': ctx.file_path}
+
+
+@DAG.stage(("audio", "image", "text"), requires=("text",), provides=("ner_extract", "starts_at", "ends_at"),
+           progress="ner_running", progress_done="ner_done")
+def _ner(ctx: StageContext) -> dict:
+    # 文本在内存中传递，不经过文件；“明天”等相对日期以上传时间为基准
+    return get_processor("ner").process_text(ctx.outputs["text"], uploaded_at(ctx.job_id))
+
+
+def _handle_new_file(file_path: str):
+    job_id = Path(file_path).name
+    file_ext = file_path.lower().split('.')[-1]
+    try:
+        size = size_bucket(Path(file_path).stat().st_size)
+        media = media_type(file_ext)
+        if media is None:
+            logger.warning(f"不支持的文件类型: {file_path}")
+            raise ValueError(f"不支持的文件类型: {file_ext}")
+
+        logger.info(f"检测到{media}文件，开始处理: {file_path}")
+        ctx = DAG.run(StageContext(file_path=file_path, job_id=job_id, media=media, file_ext=file_ext, size=size))
+
+        # 各阶段输出合并为事件字段；文本与 OCR 原始结果单独存表，不进入事件字段
+        res_dict = dict(ctx.outputs)
+        text = res_dict.pop("text")
+        ocr_raw = res_dict.pop("ocr_raw", None)
+
+        # 原件移出收件箱，事件记录其在存储分片中的位置
+        settled = settle_original(file_path)
+        for key in ("file_original", "file_processed"):
+            if res_dict.get(key) == file_path:
+                res_dict[key] = settled
+
+        # 数据存储
+        Progress.job_update(job_id, "db_writing")
+        c_db = ProcessDB()
+        event_id = c_db.create_event(res_dict)
+        if event_id == -1:
+            raise RuntimeError("事件写入数据库失败")
+        c_db.save_transcript(event_id, text, _TRANSCRIPT_SOURCE[media])
+        materialize_event(event_id)
+        if ocr_raw:
+            lines = ocr_raw.pop("lines")
+            c_db.save_ocr_result(event_id, pack_lines(lines, **ocr_raw), len(lines))
+        Progress.job_update(job_id, "event_created", event_id=event_id)
+        PIPELINE_FILES.inc(file_type=file_ext, result="ok")
+        if res_dict.get("provisional"):
+            schedule_refine(event_id, settled, c_db.read_event(event_id).get("updated_at"))
+
+    except Exception as e:
+        logger.exception(f"文件处理失败 {file_path}: {str(e)}")
+        Progress.job_update(job_id, "failed", error=str(e))
+        PIPELINE_FILES.inc(file_type=file_ext, result="failed")
+        raise
+
+
+# ---------------- 分级转写：后台精确重转 ----------------
+
+def schedule_refine(event_id: int, file_path: str, untouched_at: str):
+    """
+    排队用精确模型重新转写临时事件。
+    untouched_at 为事件刚创建时的 updated_at，用于判断用户是否已手动修改过事件。
+    """
+    global _refine_executor
+    with _processors_lock:
+        if _refine_executor is None:
+            _refine_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="asr-refine")
+    trace_id = current_trace() or Tracer.trace_for_file(Path(file_path).name)
+    _refine_executor.submit(_refine_event, event_id, file_path, untouched_at, trace_id)
+
+
+def resume_refinements():
+    """进程重启后，把仍为临时状态的事件重新排队"""
+    for event in ProcessDB().search_events_provisional():
+        if Path(event["file_original"] or "").is_file():
+            # 无法得知创建时的 updated_at，以 created_at 近似
+            schedule_refine(event["event_id"], event["file_original"], event["created_at"])
+        else:
+            logger.warning(f"临时事件 {event['event_id']} 的原始音频不存在，无法精确转写")
+
+
+def _refine_event(event_id: int, file_path: str, untouched_at: str, trace_id: str):
+    job_id = Path(file_path).name
+    claim = f"refine:{event_id}"
+    db = ProcessDB()
+    # 多个 worker 同时恢复时只由一个执行
+    if not db.claim_file(claim, WORKER_ID):
+        return
+    status = "failed"
+    try:
+        with bind(trace_id), span("pipeline.refine", event_id=event_id):
+            _refine(db, event_id, file_path, job_id, untouched_at)
+        status = "done"
+    except Exception as e:
+        logger.exception(f"精确转写失败 event={event_id} {file_path}: {str(e)}")
+        Progress.job_update(job_id, "failed", event_id=event_id, error=f"精确转写失败: {e}")
+    finally:
+        exhausted = db.finish_claim(claim, status)
+    if status == "done":
+        return
+    if exhausted:
+        # 重试次数用尽：保留快速模型的结果作为最终转写，事件不再停留在临时状态（也才能被归档）
+        logger.warning(f"事件 {event_id} 精确转写已失败 {settings.claim_max_attempts} 次，保留临时转写结果")
+        db.update_event(event_id, {"provisional": 0})
+    else:
+        # 重试间隔过后认领才会再次成功
+        timer = threading.Timer(settings.claim_retry_delay + 1, schedule_refine,
+                                args=(event_id, file_path, untouched_at))
+        timer.daemon = True
+        timer.start()
+
+
+def _refine(db, event_id: int, file_path: str, job_id: str, untouched_at: str):
+    event = db.read_event(event_id)
+    if not event or not event.get("provisional"):
+        logger.info(f"事件 {event_id} 已删除或已是精确转写，跳过")
+        return
+
+    file_ext = file_path.lower().split('.')[-1]
+    size = size_bucket(Path(file_path).stat().st_size)
+    Progress.job_update(job_id, "asr_refining", event_id=event_id)
+    with _engine("asr"), STAGE_SECONDS.time(stage="asr_refine", file_type=file_ext, size=size):
+        result = get_processor("asr").process_audio(file_path, tier="accurate")
+
+    fields = {"file_processed": result["file_processed"], "asr_tier": result["asr_tier"], "provisional": 0}
+    current = db.read_event(event_id)
+    if not current:
+        logger.info(f"事件 {event_id} 在精确转写期间被删除")
+        return
+    if current.get("updated_at") == untouched_at:
+        with STAGE_SECONDS.time(stage="ner", file_type=file_ext, size=size):
+            base = datetime.strptime(current["created_at"], TIMESTAMP_FORMAT)
+            fields |= get_processor("ner").process_text(result["text"], base)
+    else:
+        # 用户已手动修改过事件：只替换转写文本，不覆盖其修改的字段
+        logger.info(f"事件 {event_id} 已被修改，仅更新转写结果")
+    # 先替换文本，收到事件更新推送的页面读到的即是精确转写
+    db.save_transcript(event_id, result["text"], "asr")
+    if not db.update_event(event_id, fields):
+        raise RuntimeError("更新事件失败")
+    materialize_event(event_id)
+    Progress.job_update(job_id, "event_refined", event_id=event_id)
+    logger.info(f"事件 {event_id} 已更新为精确转写: {len(result['text'])} 字")
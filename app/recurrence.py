@@ -0,0 +1,180 @@
+"""
+周期事件的日历索引：ner_extract.rrules 中的规则（数据库触发器同步到 recurrences 表）
+展开为 occurrences 表中的具体时刻，日历查询只做 starts_at 的范围扫描，不再逐个解码事件。
+
+- 起点为事件规范化后的开始时刻 starts_at（app.date_norm），缺省取 created_at 当天；
+- 每条规则记录已展开到的时刻 expanded_until，之后只追加 (expanded_until, 目标] 这一段；
+- 后台任务每 RECURRENCE_INTERVAL 秒把所有规则延伸到“现在 + RECURRENCE_HORIZON_DAYS 天”，
+  事件写入后由 materialize_event 立即展开该事件；
+- 事件的 ner_extract 变化时触发器清空其 occurrences 并重置规则，下一次展开重新生成。
+
+手动执行一次：
+    python -m app.recurrence --days 180
+"""
+import argparse
+import threading
+import time
+from datetime import datetime, timedelta
+from dateutil.rrule import rrulestr
+
+from scripts.settings import settings
+from scripts.logger import logger
+from scripts.metrics import RECURRENCE_OCCURRENCES
+from database.processor import ProcessDB
+from app.date_norm import TIMESTAMP_FORMAT, normalize, parse_timestamp
+
+# 单条规则一次最多展开的次数：起点很早的 FREQ=DAILY 分多轮补齐，不在一次事务里写入过多行
+MAX_PER_RULE = 5000
+
+
+def anchor(starts_at: str, created_at: str) -> datetime:
+    """规则的起点 DTSTART：事件规范化后的开始时刻，没有时取创建当天零点"""
+    start = parse_timestamp(starts_at) or parse_timestamp((created_at or "")[:10])
+    return start or datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def expand(rule: str, dtstart: datetime, after, until: datetime) -> tuple:
+    """
+    (after, until] 内的发生时刻；after 为 None 时从 dtstart（含）开始。
+    返回 (时刻列表, 实际展开到的时刻)，达到 MAX_PER_RULE 时后者为最后一个时刻
+    """
+    moments = []
+    for moment in rrulestr(rule, dtstart=dtstart):
+        if moment > until:
+            break
+        if after is None or moment > after:
+            moments.append(moment)
+            if len(moments) >= MAX_PER_RULE:
+                return moments, moment
+    return moments, until
+
+
+def horizon(now: datetime = None, days: int = None) -> datetime:
+    days = settings.recurrence_horizon_days if days is None else days
+    return (now or datetime.now()).replace(microsecond=0) + timedelta(days=days)
+
+
+def materialize(event_id: int = None, until: datetime = None) -> int:
+    """把周期规则（或某个事件的规则）展开到 until，默认 horizon()；返回新写入的发生次数"""
+    until = until or horizon()
+    until_text = until.strftime(TIMESTAMP_FORMAT)
+    db = ProcessDB()
+    written = 0
+    while True:
+        rows = db.search_pending_recurrences(until_text, event_id)
+        progressed = False
+        for row in rows:
+            dtstart = parse_timestamp(row["dtstart"]) or anchor(row["starts_at"], row["created_at"])
+            after = datetime.strptime(row["expanded_until"], TIMESTAMP_FORMAT) if row["expanded_until"] else None
+            try:
+                moments, reached = expand(row["rule"], dtstart, after, until)
+            except (ValueError, TypeError) as e:
+                # 手动改坏的规则：标记为已展开，不再反复尝试
+                logger.warning(f"[recurrence] 事件 {row['event_id']} 的规则无法解析 {row['rule']!r}: {e}")
+                moments, reached = [], until
+            saved = db.save_occurrences(
+                row["event_id"], row["rule"], dtstart.strftime(TIMESTAMP_FORMAT), row["expanded_until"],
+                reached.strftime(TIMESTAMP_FORMAT), [m.strftime(TIMESTAMP_FORMAT) for m in moments],
+            )
+            if saved:
+                progressed = True
+                written += len(moments)
+                RECURRENCE_OCCURRENCES.inc(len(moments))
+        # 本批全部被并发修改时停下，留给下一轮
+        if not rows or not progressed:
+            return written
+
+
+def materialize_event(event_id: int):
+    """事件写入后立即展开其规则；失败只记日志，后台任务会补上"""
+    try:
+        materialize(event_id=event_id)
+    except Exception as e:
+        logger.exception(f"[recurrence] 展开事件 {event_id} 的周期规则失败: {e}")
+
+
+def backfill_schedule() -> int:
+    """加列之前的旧事件按原文与创建时间计算 starts_at / ends_at，返回处理的事件数"""
+    db = ProcessDB()
+    total = 0
+    while True:
+        rows = db.search_events_unscheduled()
+        if not rows:
+            break
+        entries = []
+        for row in rows:
+            ner = row["ner_extract"] if isinstance(row["ner_extract"], dict) else {}
+            masked = [item["match"] for item in ner.get("recurrences") or [] if isinstance(item, dict)]
+            base = parse_timestamp(row["created_at"]) or datetime.now()
+            starts_at, ends_at = normalize(str(ner.get("events_full") or ""), base, masked)
+            entries.append((row["event_id"], starts_at or "", ends_at or ""))
+        if not db.set_schedule(entries):
+            break
+        total += len(entries)
+    if total:
+        logger.info(f"[recurrence] 已为 {total} 个旧事件计算起止时刻")
+    return total
+
+
+def backfill_rules() -> int:
+    """只有 recurrences 原始匹配的旧事件补上 rrules（触发器随之建立规则），返回处理的事件数"""
+    from app.pipeline import get_processor
+
+    db = ProcessDB()
+    rows = db.search_events_without_rrules()
+    if not rows:
+        return 0
+    ner = get_processor("ner")
+    for row in rows:
+        db.set_rrules(row["event_id"], ner.to_rrules(row["recurrences"]))
+    logger.info(f"[recurrence] 已为 {len(rows)} 个旧事件补齐周期规则")
+    return len(rows)
+
+
+# ---------------- 后台任务 ----------------
+
+def start_recurrence(stop_event: threading.Event = None):
+    """启动后台展开线程；多个 worker 同一周期内只由一个执行"""
+    thread = threading.Thread(
+        target=_recurrence_loop, args=(stop_event or threading.Event(),), daemon=True, name="recurrence"
+    )
+    thread.start()
+    logger.info(f"[recurrence] 展开 {settings.recurrence_horizon_days} 天内的周期事件，"
+                f"每 {settings.recurrence_interval:.0f} 秒延伸一次")
+    return thread
+
+
+def _recurrence_loop(stop_event: threading.Event):
+    # pipeline 导入本模块，WORKER_ID 在这里再导入以避免循环
+    from app.pipeline import WORKER_ID
+
+    interval = max(60.0, settings.recurrence_interval)
+    db = ProcessDB()
+    try:
+        backfill_schedule()
+        backfill_rules()
+    except Exception as e:
+        logger.exception(f"[recurrence] 补齐旧事件的起止时刻 / 周期规则失败: {e}")
+    while True:
+        claim = f"recurrence:{int(time.time() // interval)}"
+        if db.claim_file(claim, WORKER_ID):
+            status = "failed"
+            try:
+                written = materialize()
+                status = "done"
+                logger.info(f"[recurrence] 本轮展开完成: 新增 {written} 次")
+            except Exception as e:
+                logger.exception(f"[recurrence] 展开失败: {e}")
+            finally:
+                db.finish_claim(claim, status)
+        if stop_event.wait(interval - time.time() % interval):
+            return
+
+
+if __name__ == "__main__":
+    p = argparse.ArgumentParser(description="HGRecorder 周期事件展开")
+    p.add_argument("--days", type=int, default=settings.recurrence_horizon_days, help="展开到今后多少天")
+    args = p.parse_args()
+    backfill_schedule()
+    backfill_rules()
+    print(materialize(until=horizon(days=args.days)))
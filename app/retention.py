@@ -0,0 +1,187 @@
+"""
+保留与归档：超过 RETENTION_DAYS 天的已处理原件（及其抽取文本副本）打包为 zip 移出热目录。
+
+- 每次运行写新的包 ARCHIVE_DIR_PATH/YYYY/pack-<时间>-<序号>.zip，写完校验后不再修改，
+  备份只需增量复制新包；
+- 事件的 file_original / file_processed 保持不变，archived_files 表记录文件所在的包与成员名，
+  通过 open_file / open_by_name 读取，事件引用始终有效；
+- 临时转写（等待精确重转）的事件不归档。
+
+手动执行一次：
+    python -m app.retention --days 30
+"""
+import argparse
+import os
+import threading
+import time
+import zipfile
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from scripts.settings import settings
+from scripts.logger import logger
+from scripts.metrics import ARCHIVED_FILES
+from scripts.storage import candidates, is_managed, shard_of
+from database.processor import ProcessDB
+from app.pipeline import WORKER_ID
+
+# 已是压缩格式的文件直接存储，再压缩只耗 CPU
+_STORED_SUFFIXES = {".jpg", ".jpeg", ".png", ".gif", ".mp3", ".m4a", ".ogg", ".flac", ".zip"}
+
+PACK_MAX_FILES = 500
+
+
+def _member_name(path: Path) -> str:
+    try:
+        return path.resolve().relative_to(settings.userdata_dir.resolve()).as_posix()
+    except ValueError:
+        return f"{shard_of(path.name)}/{path.name}"
+
+
+def _write_pack(files: dict, seq: int) -> tuple:
+    """
+    files: {事件中记录的路径: Path}。先写 .part，校验 CRC 后改名，
+    返回 (相对 ARCHIVE_DIR_PATH 的包路径, [(ref, member, size)])
+    """
+    now = datetime.now()
+    folder = settings.archive_dir / now.strftime("%Y")
+    folder.mkdir(parents=True, exist_ok=True)
+    pack = folder / f"pack-{now:%Y%m%d-%H%M%S}-{os.getpid()}-{seq}.zip"
+    part = pack.with_name(pack.name + ".part")
+
+    entries = []
+    with zipfile.ZipFile(part, "w", compression=zipfile.ZIP_DEFLATED, compresslevel=6) as zf:
+        for ref, path in files.items():
+            member = _member_name(path)
+            compress = zipfile.ZIP_STORED if path.suffix.lower() in _STORED_SUFFIXES else zipfile.ZIP_DEFLATED
+            zf.write(path, member, compress_type=compress)
+            entries.append((ref, member, path.stat().st_size))
+    with zipfile.ZipFile(part) as zf:
+        bad = zf.testzip()
+    if bad is not None:
+        part.unlink()
+        raise RuntimeError(f"归档包校验失败: {bad}")
+    with part.open("rb") as f:
+        os.fsync(f.fileno())
+    os.replace(part, pack)
+    return pack.relative_to(settings.archive_dir).as_posix(), entries
+
+
+def run_retention(days: int = None, now: datetime = None) -> dict:
+    """归档一次，返回统计；days 默认取 RETENTION_DAYS，≤ 0 时不做任何事"""
+    days = settings.retention_days if days is None else days
+    summary = {"packs": 0, "files": 0, "bytes": 0, "skipped": 0}
+    if days <= 0:
+        return summary
+    cutoff = ((now or datetime.now()) - timedelta(days=days)).strftime("%Y-%m-%d %H:%M:%S")
+    db = ProcessDB()
+
+    after_id = 0
+    while True:
+        rows = db.search_archivable(cutoff, after_id, PACK_MAX_FILES)
+        if not rows:
+            break
+        after_id = rows[-1]["event_id"]
+
+        files = {}
+        for row in rows:
+            for ref in (row["file_original"], row["file_processed"]):
+                if not ref or ref in files:
+                    continue
+                path = Path(ref)
+                # 已丢失的文件，或由 API 写入的外部路径，保持原样
+                if path.is_file() and is_managed(path):
+                    files[ref] = path
+                else:
+                    summary["skipped"] += 1
+        if not files:
+            continue
+
+        pack, entries = _write_pack(files, summary["packs"])
+        if not db.save_archived([(ref, pack, member, size) for ref, member, size in entries]):
+            (settings.archive_dir / pack).unlink(missing_ok=True)
+            raise RuntimeError("登记归档记录失败")
+        # 登记成功后才删除热数据；删除失败时文件仍可直接读取，不影响引用
+        for ref, path in files.items():
+            try:
+                path.unlink()
+                ARCHIVED_FILES.inc(result="ok")
+            except OSError as e:
+                ARCHIVED_FILES.inc(result="unlink_failed")
+                logger.warning(f"[retention] 已归档但删除失败 {path}: {e}")
+        summary["packs"] += 1
+        summary["files"] += len(entries)
+        summary["bytes"] += sum(size for _, _, size in entries)
+        logger.info(f"[retention] 已写入归档包 {pack}: {len(entries)} 个文件")
+    return summary
+
+
+# ---------------- 读取 ----------------
+
+def open_file(ref: str):
+    """按事件中记录的路径打开文件（热数据或归档包内），返回二进制文件对象；都不存在时返回 None"""
+    if not ref:
+        return None
+    path = Path(ref)
+    if path.is_file():
+        return path.open("rb")
+    entry = ProcessDB().find_archived(ref)
+    if entry is None:
+        return None
+    pack = settings.archive_dir / entry["pack"]
+    if not pack.is_file():
+        logger.error(f"[retention] 归档包不存在: {pack}")
+        return None
+    # 关闭 ZipFile 后已打开的成员仍可读，读完随成员一起释放
+    with zipfile.ZipFile(pack) as zf:
+        return zf.open(entry["member"])
+
+
+def open_by_name(name: str):
+    """按上传时的文件名打开（收件箱、存储分片或归档包），找不到时返回 None"""
+    for path in candidates(name):
+        stream = open_file(str(path))
+        if stream is not None:
+            return stream
+    return None
+
+
+# ---------------- 后台任务 ----------------
+
+def start_retention(stop_event: threading.Event = None):
+    """RETENTION_DAYS > 0 时启动后台归档线程；多个 worker 同一周期内只由一个执行"""
+    if settings.retention_days <= 0:
+        return None
+    thread = threading.Thread(
+        target=_retention_loop, args=(stop_event or threading.Event(),), daemon=True, name="retention"
+    )
+    thread.start()
+    logger.info(f"[retention] 保留期 {settings.retention_days} 天，每 {settings.retention_interval:.0f} 秒检查一次")
+    return thread
+
+
+def _retention_loop(stop_event: threading.Event):
+    interval = max(60.0, settings.retention_interval)
+    db = ProcessDB()
+    while True:
+        claim = f"retention:{int(time.time() // interval)}"
+        if db.claim_file(claim, WORKER_ID):
+            status = "failed"
+            try:
+                summary = run_retention()
+                status = "done"
+                logger.info(f"[retention] 本轮归档完成: {summary}")
+            except Exception as e:
+                logger.exception(f"[retention] 归档失败: {e}")
+            finally:
+                db.finish_claim(claim, status)
+        # 对齐到下一个周期
+        if stop_event.wait(interval - time.time() % interval):
+            return
+
+
+if __name__ == "__main__":
+    p = argparse.ArgumentParser(description="HGRecorder 原件归档")
+    p.add_argument("--days", type=int, default=settings.retention_days, help="保留天数，默认 RETENTION_DAYS")
+    args = p.parse_args()
+    print(run_retention(args.days))
@@ -20,5 +20,6 @@ class Weather:
         data = response.json()
         return data
 
-w = Weather()
-print(w.get_weather(searchtype="all"))
+if __name__ == "__main__":
+    w = Weather()
+    print(w.get_weather(searchtype="all"))
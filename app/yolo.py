@@ -1,20 +1,59 @@
-import torch
-from config import get_abs_path
+"""
+图片打标签（TAGGING=1 时的可选流水线阶段）：YOLOv5 检测出的物体类别写入 events.tags。
+
+并发到达的图片由 ImageTagger 攒成批次（最多 TAG_BATCH_SIZE 张，最多等待 TAG_BATCH_WAIT 秒），
+在单独线程中一次前向完成，流水线在提交后继续做 OCR，两者并行。
+模型在第一批到达时才加载。
+"""
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from scripts.settings import settings
+from scripts.logger import logger
+from scripts.cpu_budget import apply_thread_budget
+from scripts.metrics import TAG_BATCH_SIZE
+
 
 class YOLOv5:
-    def __init__(self, model_path=get_abs_path("YOLO_MODEL_PATH"), source='local'):
+    def __init__(self, model_path=None, source='local'):
         """
-        :param model_path: 模型文件的路径
+        :param model_path: 模型文件的路径，默认使用 YOLOV5_PT_PATH
         :param source: 模型来源，yolov5 仓库或本地
         """
-        self.model = torch.hub.load(get_abs_path("YOLOV5_PATH"), 'custom', path=model_path, source=source)
- 
-    def predict(self, img_path):
+        apply_thread_budget()
+        import torch
+        model_path = str(model_path or settings.yolov5_pt_path)
+        self.model = torch.hub.load(str(settings.yolov5_other_path), 'custom', path=model_path, source=source)
+        self.model.eval()
+
+    def predict(self, img_path, size=640):
         """
-        :param img_path: 图像的路径
+        :param img_path: 图像的路径，或路径列表（一次前向处理整批）
+        :param size: 推理时长边缩放到的尺寸
         :return: Detection 类型的对象
         """
-        return self.model(img_path)
+        import torch
+        with torch.inference_mode():
+            return self.model(img_path, size=size)
+
+    def labels(self, results, min_confidence: float = 0.0) -> list:
+        """
+        :param results: Detection 类型的对象
+        :return: 每张图一个列表，元素为 {"label", "confidence", "count"}，按置信度降序
+        """
+        per_image = []
+        for det in results.xyxy:
+            found = {}
+            for *_, confidence, cls in det.tolist():
+                if confidence < min_confidence:
+                    continue
+                name = results.names[int(cls)]
+                item = found.setdefault(name, {"label": name, "confidence": 0.0, "count": 0})
+                item["confidence"] = max(item["confidence"], round(confidence, 3))
+                item["count"] += 1
+            per_image.append(sorted(found.values(), key=lambda x: -x["confidence"]))
+        return per_image
 
     def print_results(self, results):
         """
@@ -41,3 +80,64 @@ class YOLOv5:
         :return: 包含框的位置与类别等信息的 pandas.DataFrame
         """
         return results_df[['name', 'confidence', 'xmin', 'ymin', 'xmax', 'ymax']]
+
+
+class ImageTagger:
+    def __init__(self, batch_size=None, max_wait=None, min_confidence=None, img_size=None):
+        self.batch_size = max(1, batch_size or settings.tag_batch_size)
+        self.max_wait = settings.tag_batch_wait if max_wait is None else max_wait
+        self.min_confidence = settings.tag_min_confidence if min_confidence is None else min_confidence
+        self.img_size = img_size or settings.tag_img_size
+        self.model = None
+        self._threads_ready = False
+        self.queue = queue.Queue()
+        self._thread = threading.Thread(target=self._loop, daemon=True, name="tagger")
+        self._thread.start()
+
+    def submit(self, image_path) -> Future:
+        """排队打标签，返回的 Future 结果为 YOLOv5.labels 的单图列表"""
+        future = Future()
+        self.queue.put((str(image_path), future))
+        return future
+
+    def tag(self, image_path, timeout: float = None) -> list:
+        return self.submit(image_path).result(timeout)
+
+    def load(self):
+        """只在工作线程中调用"""
+        if self.model is None:
+            self.model = YOLOv5()
+            logger.info(f"[TAG] 已加载 YOLOv5: {settings.yolov5_pt_path}")
+        if not self._threads_ready:
+            # OpenMP 线程数按线程生效，在工作线程内设置，不影响同进程的 Whisper
+            import torch
+            torch.set_num_threads(apply_thread_budget().tag)
+            self._threads_ready = True
+        return self.model
+
+    def _loop(self):
+        while True:
+            batch = [self.queue.get()]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self.queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._run(batch)
+
+    def _run(self, batch: list):
+        try:
+            model = self.load()
+            TAG_BATCH_SIZE.observe(len(batch))
+            results = model.predict([path for path, _ in batch], size=self.img_size)
+            for (_, future), labels in zip(batch, model.labels(results, self.min_confidence)):
+                future.set_result(labels)
+        except Exception as e:
+            logger.exception(f"[TAG] 批量打标签失败 ({len(batch)} 张): {e}")
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
@@ -0,0 +1,141 @@
+"""
+ASR 后端基准：对一组样本音频分别用各后端转写，比较实时率（RTF = 转写耗时 / 音频时长）、
+模型加载耗时、峰值内存，以及与第一个后端结果的文本相似度。
+
+每个后端在独立子进程中运行，峰值内存互不影响。
+--tier fast 时按分级模式加载（两档模型同时常驻），内存数字与线上分级模式一致。
+
+用法（在仓库根目录执行）：
+    python -m benchmarks.bench_asr --clips samples/audio --out asr.json
+    python -m benchmarks.bench_asr --clips samples/audio --backends whisper,faster-whisper --tier fast
+"""
+import argparse
+import difflib
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import wave
+from pathlib import Path
+
+from benchmarks.common import prepare_env, percentiles, peak_rss_mb, git_commit, write_report
+
+AUDIO_SUFFIXES = {".wav", ".mp3", ".ogg", ".flac", ".m4a"}
+
+
+def parse_args():
+    p = argparse.ArgumentParser(description="HGRecorder ASR 后端基准")
+    p.add_argument("--clips", required=True, help="样本音频目录")
+    p.add_argument("--backends", default="whisper,faster-whisper", help="逗号分隔，第一个作为文本对照基准")
+    p.add_argument("--tier", choices=["accurate", "fast"], default="accurate", help="使用哪一档模型")
+    p.add_argument("--single", help=argparse.SUPPRESS)   # 子进程内部使用
+    p.add_argument("--out", help="结果 JSON 输出路径")
+    return p.parse_args()
+
+
+def audio_seconds(path: Path) -> float:
+    if path.suffix.lower() == ".wav":
+        with wave.open(str(path), "rb") as wf:
+            return wf.getnframes() / wf.getframerate()
+    # 其他格式借助 ffmpeg 解码（两个后端都依赖 ffmpeg/av）
+    try:
+        from faster_whisper import decode_audio
+    except ImportError:
+        from whisper.audio import load_audio as decode_audio
+    return len(decode_audio(str(path))) / 16000
+
+
+def run_single(backend_name: str, clips: list, tier: str) -> dict:
+    """在当前进程内加载一个后端并转写所有样本"""
+    from app.ASR import ASEProcessor
+
+    t0 = time.perf_counter()
+    processor = ASEProcessor(tiered=(tier == "fast"), backend=backend_name)
+    load_seconds = time.perf_counter() - t0
+    rss_after_load = peak_rss_mb()
+
+    rows = []
+    for clip in clips:
+        duration = audio_seconds(clip)
+        t0 = time.perf_counter()
+        result = processor.process_audio(str(clip), tier=tier)
+        seconds = time.perf_counter() - t0
+        rows.append({
+            "clip": clip.name,
+            "audio_seconds": duration,
+            "seconds": seconds,
+            "rtf": seconds / duration if duration else None,
+            "text": result["text"],
+        })
+    return {
+        "backend": backend_name,
+        "load_seconds": load_seconds,
+        "rss_after_load_mb": rss_after_load,
+        "peak_rss_mb": peak_rss_mb(),
+        "clips": rows,
+    }
+
+
+def similarity(a: str, b: str) -> float:
+    return difflib.SequenceMatcher(None, "".join(a.split()), "".join(b.split())).ratio()
+
+
+def main():
+    args = parse_args()
+    clips = sorted(p for p in Path(args.clips).iterdir() if p.suffix.lower() in AUDIO_SUFFIXES)
+    if not clips:
+        raise SystemExit(f"{args.clips} 中没有音频文件")
+
+    if args.single:
+        prepare_env(Path(tempfile.mkdtemp(prefix="hg_bench_asr_")))
+        print(json.dumps(run_single(args.single, clips, args.tier), ensure_ascii=False))
+        return
+
+    results = {}
+    for name in [b for b in args.backends.split(",") if b]:
+        proc = subprocess.run(
+            [sys.executable, "-m", "benchmarks.bench_asr", "--clips", args.clips,
+             "--tier", args.tier, "--single", name],
+            capture_output=True, text=True, env=os.environ.copy(),
+        )
+        if proc.returncode != 0:
+            results[name] = {"backend": name, "error": proc.stderr.strip().splitlines()[-1:]}
+            continue
+        results[name] = json.loads(proc.stdout.strip().splitlines()[-1])
+
+    # 以第一个成功的后端为文本基准
+    reference = next((r for r in results.values() if "clips" in r), None)
+    summary = {}
+    for name, result in results.items():
+        if "clips" not in result:
+            summary[name] = result
+            continue
+        if reference is not None:
+            ref_text = {c["clip"]: c["text"] for c in reference["clips"]}
+            for clip in result["clips"]:
+                clip["similarity_to_reference"] = similarity(clip["text"], ref_text.get(clip["clip"], ""))
+        summary[name] = {
+            "load_seconds": result["load_seconds"],
+            "rss_after_load_mb": result["rss_after_load_mb"],
+            "peak_rss_mb": result["peak_rss_mb"],
+            "rtf": percentiles([c["rtf"] for c in result["clips"] if c["rtf"] is not None]),
+            "similarity_to_reference": percentiles([c.get("similarity_to_reference", 1.0) for c in result["clips"]]),
+            "clips": result["clips"],
+        }
+
+    report = {
+        "benchmark": "asr",
+        "commit": git_commit(),
+        "config": {k: v for k, v in vars(args).items() if k not in ("out", "single")},
+        "reference_backend": reference["backend"] if reference else None,
+        "clips": len(clips),
+        "audio_seconds_total": sum(c["audio_seconds"] for c in reference["clips"]) if reference else None,
+        "backends": summary,
+    }
+    write_report(report, args.out)
+
+
+if __name__ == "__main__":
+    main()
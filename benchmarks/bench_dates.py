@@ -0,0 +1,171 @@
+"""
+日期 / 时间规范化基准：对一组中文日期时间表达测量
+    - 正确性：与语料中期望的起止时刻逐条比对（基准时刻固定为 --base）；
+    - 覆盖率：能解析出起止时刻的表达比例；
+    - 耗时：清空缓存后的首次解析（cold）与缓存命中后（warm）的单条耗时，
+      以及 NERProcessor.process_text 整句处理耗时。
+
+有不符合期望的表达时以非零状态退出。
+
+语料默认使用内置 CORPUS；--corpus 指定 UTF-8 文本文件时每行一条：
+    表达<TAB>期望开始<TAB>期望结束      （期望可省略，省略时只计覆盖率与耗时）
+
+用法（在仓库根目录执行）：
+    python -m benchmarks.bench_dates --repeat 200 --out dates.json
+    python -m benchmarks.bench_dates --corpus samples/dates.tsv --base "2025-09-30 10:00:00"
+"""
+import argparse
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+from benchmarks.common import prepare_env, percentiles, peak_rss_mb, git_commit, write_report
+
+# 基准时刻 2025-09-30 10:00（周二）下的期望结果
+CORPUS = [
+    ("2025年11月20日上午10点 项目验收", "2025-11-20 10:00:00", "2025-11-20 10:00:00"),
+    ("2025-10-08 14:00-16:00 例会", "2025-10-08 14:00:00", "2025-10-08 16:00:00"),
+    ("09/30/2025 提交材料", "2025-09-30 00:00:00", "2025-10-01 00:00:00"),
+    ("10/15 出发", "2025-10-15 00:00:00", "2025-10-16 00:00:00"),
+    ("十月一日放假", "2025-10-01 00:00:00", "2025-10-02 00:00:00"),
+    ("10月1日至7日国庆", "2025-10-01 00:00:00", "2025-10-08 00:00:00"),
+    ("12月30日至1月3日出差", "2025-12-30 00:00:00", "2026-01-04 00:00:00"),
+    ("12号交报告", "2025-09-12 00:00:00", "2025-09-13 00:00:00"),
+    ("明天下午3点半开会", "2025-10-01 15:30:00", "2025-10-01 15:30:00"),
+    ("后天上午九点一刻面试", "2025-10-02 09:15:00", "2025-10-02 09:15:00"),
+    ("大后天", "2025-10-03 00:00:00", "2025-10-04 00:00:00"),
+    ("昨天晚上8点的聚餐", "2025-09-29 20:00:00", "2025-09-29 20:00:00"),
+    ("3天前", "2025-09-27 00:00:00", "2025-09-28 00:00:00"),
+    ("两周后复查", "2025-10-14 00:00:00", "2025-10-15 00:00:00"),
+    ("三个月以后", "2025-12-30 00:00:00", "2025-12-31 00:00:00"),
+    ("下个月", "2025-10-30 00:00:00", "2025-10-31 00:00:00"),
+    ("明年", "2026-09-30 00:00:00", "2026-10-01 00:00:00"),
+    ("周五", "2025-10-03 00:00:00", "2025-10-04 00:00:00"),
+    ("本周日", "2025-10-05 00:00:00", "2025-10-06 00:00:00"),
+    ("上周五的会议纪要", "2025-09-26 00:00:00", "2025-09-27 00:00:00"),
+    ("下周三下午3点到5点在会议室", "2025-10-08 15:00:00", "2025-10-08 17:00:00"),
+    ("下下周一", "2025-10-13 00:00:00", "2025-10-14 00:00:00"),
+    ("星期六早上8点爬山", "2025-10-04 08:00:00", "2025-10-04 08:00:00"),
+    ("今天晚上8点，持续2小时", "2025-09-30 20:00:00", "2025-09-30 22:00:00"),
+    ("下午两点开会，大约30分钟", "2025-09-30 14:00:00", "2025-09-30 14:30:00"),
+    ("晚上10点到凌晨2点值班", "2025-09-30 22:00:00", "2025-10-01 02:00:00"),
+    ("中午12点吃饭", "2025-09-30 12:00:00", "2025-09-30 12:00:00"),
+    ("9时30分", "2025-09-30 09:30:00", "2025-09-30 09:30:00"),
+    ("每周一三五晚上7点训练", "2025-09-30 19:00:00", "2025-09-30 19:00:00"),
+    ("明年3月5日体检", "2026-03-05 00:00:00", "2026-03-06 00:00:00"),
+    ("本月25日还款", "2025-09-25 00:00:00", "2025-09-26 00:00:00"),
+    ("今年12月1日", "2025-12-01 00:00:00", "2025-12-02 00:00:00"),
+    ("下个月3号交房租", "2025-10-03 00:00:00", "2025-10-04 00:00:00"),
+    ("下周一至周三培训", "2025-10-06 00:00:00", "2025-10-09 00:00:00"),
+    ("周五到下周二出差", "2025-10-03 00:00:00", "2025-10-08 00:00:00"),
+    ("今晚8点吃饭", "2025-09-30 20:00:00", "2025-09-30 20:00:00"),
+    ("晚上12点上线", "2025-10-01 00:00:00", "2025-10-01 00:00:00"),
+    ("1-3号出差", "2025-09-01 00:00:00", "2025-09-04 00:00:00"),
+    ("9月30日 10:00至10月2日 12:00", "2025-09-30 10:00:00", "2025-10-02 12:00:00"),
+    ("坐10号线去公司", None, None),
+    ("3-5人小组讨论", None, None),
+    ("快一点完成", None, None),
+    ("没有日期的备忘", None, None),
+]
+
+SENTENCES = [
+    "明天下午3点在三楼会议室开会，讨论季度汇报。",
+    "每周一三五晚上7点羽毛球训练，持续2小时。",
+    "2025年11月20日上午10点 项目验收，地点：研发中心实验室。",
+    "下周三和李老师面试候选人，预计半天。",
+    "10月1日至7日国庆放假，8日正常上班。",
+]
+
+
+def parse_args():
+    p = argparse.ArgumentParser(description="HGRecorder 日期时间规范化基准")
+    p.add_argument("--corpus", help="语料文件（每行：表达[\\t期望开始\\t期望结束]）")
+    p.add_argument("--base", default="2025-09-30 10:00:00", help="相对日期的基准时刻")
+    p.add_argument("--repeat", type=int, default=200, help="耗时测量的轮数")
+    p.add_argument("--out", help="结果 JSON 输出路径")
+    return p.parse_args()
+
+
+def load_corpus(path: str) -> list:
+    corpus = []
+    for line in Path(path).read_text(encoding="utf-8").splitlines():
+        if not line.strip() or line.startswith("#"):
+            continue
+        parts = line.split("\t")
+        if len(parts) >= 3:
+            corpus.append((parts[0], parts[1].strip() or None, parts[2].strip() or None))
+        else:
+            # 没有期望值：只计覆盖率与耗时
+            corpus.append((parts[0], ..., ...))
+    return corpus
+
+
+def main():
+    args = parse_args()
+    workdir = Path(tempfile.mkdtemp(prefix="hg_bench_dates_"))
+    prepare_env(workdir)
+
+    from app import date_norm
+    from app.NER_1_re import NERProcessor
+
+    base = datetime.strptime(args.base, date_norm.TIMESTAMP_FORMAT)
+    corpus = load_corpus(args.corpus) if args.corpus else CORPUS
+    if not corpus:
+        raise SystemExit("语料为空")
+
+    # 与流水线一致：周期表达（“每周一三五”）由 NER 找出后抹去
+    ner = NERProcessor()
+    masked = {text: [item["match"] for item in ner.extract_recurrence(text)] for text, _, _ in corpus}
+
+    # ---- 正确性与覆盖率 ----
+    date_norm._resolve.cache_clear()
+    mismatches, resolved = [], 0
+    for text, start, end in corpus:
+        got = date_norm.normalize(text, base, masked[text])
+        resolved += got[0] is not None
+        if start is not ... and got != (start, end):
+            mismatches.append({"text": text, "expected": [start, end], "got": list(got)})
+
+    # ---- 耗时 ----
+    cold, warm = [], []
+    for _ in range(args.repeat):
+        date_norm._resolve.cache_clear()
+        for text, _, _ in corpus:
+            t0 = time.perf_counter()
+            date_norm.normalize(text, base, masked[text])
+            cold.append((time.perf_counter() - t0) * 1e6)
+        for text, _, _ in corpus:
+            t0 = time.perf_counter()
+            date_norm.normalize(text, base, masked[text])
+            warm.append((time.perf_counter() - t0) * 1e6)
+
+    sentence_ms = []
+    for _ in range(max(1, args.repeat // 10)):
+        for text in SENTENCES:
+            t0 = time.perf_counter()
+            ner.process_text(text, base)
+            sentence_ms.append((time.perf_counter() - t0) * 1e3)
+
+    info = date_norm._resolve.cache_info()
+    report = {
+        "benchmark": "dates",
+        "commit": git_commit(),
+        "config": {k: v for k, v in vars(args).items() if k != "out"},
+        "expressions": len(corpus),
+        "coverage": resolved / len(corpus),
+        "checked": sum(1 for _, start, _ in corpus if start is not ...),
+        "mismatches": mismatches,
+        "normalize_cold_us": percentiles(cold),
+        "normalize_warm_us": percentiles(warm),
+        "ner_process_text_ms": percentiles(sentence_ms),
+        "cache": {"hits": info.hits, "misses": info.misses, "size": info.currsize},
+        "peak_rss_mb": peak_rss_mb(),
+    }
+    write_report(report, args.out)
+    if mismatches:
+        raise SystemExit(f"{len(mismatches)} 条表达与期望不符")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,217 @@
+"""
+数据层与 API 压测：在临时数据库中灌入大量 schema_version 1/2 事件，
+再用进程内的异步 HTTP 客户端按配置的并发与读写比例访问 FastAPI 路由。
+
+输出每个路由的延迟分位数、整体 RPS，以及 ProcessDB 各操作和 SQL 语句的耗时/次数。
+
+用法（在仓库根目录执行）：
+    python -m benchmarks.bench_db_api --rows 100000 --requests 5000 --concurrency 32 --out db_api.json
+    python -m benchmarks.bench_db_api --mix detail=60,event=30,update=10
+"""
+import argparse
+import asyncio
+import json
+import random
+import re
+import tempfile
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from benchmarks.common import prepare_env, percentiles, peak_rss_mb, git_commit, write_report
+
+# 旧版（schema_version=1）把 NER 字段直接放在顶层列
+V1_COLUMNS = ["dates", "times", "weeks", "places", "persons", "durations",
+              "recurrences", "events_extract", "events_full"]
+
+SENTENCES = [
+    "明天下午3点在三楼会议室开会，讨论季度汇报。",
+    "每周一三五晚上7点羽毛球训练，持续2小时。",
+    "2025年11月20日上午10点 项目验收，地点：研发中心实验室。",
+    "下周三和李老师面试候选人，预计半天。",
+    "每月第二个周五例会，每隔3天提交一次周报。",
+]
+
+DEFAULT_MIX = "detail=35,event=30,daily=5,events=1,update=20,create=9"
+
+
+def fake_ner(rng: random.Random, text_bytes: int) -> dict:
+    text = ""
+    while len(text.encode("utf-8")) < text_bytes:
+        text += rng.choice(SENTENCES)
+    day = datetime(2025, 1, 1) + timedelta(days=rng.randrange(730))
+    return {
+        "dates": [day.strftime("%Y-%m-%d")],
+        "times": [f"{rng.randrange(8, 22)}:{rng.choice(['00', '30'])}"],
+        "weeks": ["周" + rng.choice("一二三四五六日")],
+        "places": ["会议室"] if rng.random() < 0.5 else None,
+        "persons": ["李老师", "张经理"][: rng.randrange(3)] or None,
+        "durations": ["2小时"] if rng.random() < 0.3 else None,
+        "recurrences": [{"type": "weekday_list", "match": "每周一三五", "days": "一三五"}]
+        if rng.random() < 0.2 else None,
+        "events_extract": ["开会"],
+        "events_full": text,
+    }
+
+
+def seed(db, rows: int, v1_ratio: float, text_bytes: int, undone_ratio: float, rng: random.Random):
+    """直接批量插入，绕过 ProcessDB 以免灌数据本身成为瓶颈"""
+    cur = db.cursor()
+    existing = {r["name"] if isinstance(r, dict) else r[1] for r in cur.execute("PRAGMA table_info(events)")}
+    for col in V1_COLUMNS:
+        if col not in existing:
+            cur.execute(f"ALTER TABLE events ADD COLUMN {col} TEXT")
+
+    now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    v1_sql = (f"INSERT INTO events (created_at, updated_at, importance, tags, file_original, file_processed, "
+              f"done, schema_version, {', '.join(V1_COLUMNS)}) VALUES ({', '.join('?' * (8 + len(V1_COLUMNS)))})")
+    v2_sql = ("INSERT INTO events (created_at, updated_at, importance, tags, file_original, file_processed, "
+              "done, schema_version, ner_extract) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)")
+    batch_v1, batch_v2 = [], []
+    for i in range(rows):
+        ner = fake_ner(rng, text_bytes)
+        done = 0 if rng.random() < undone_ratio else 1
+        base = [now, now, 0.0, "", f"userdata/uploads/{i}.jpg", f"userdata/extract/OCR_result_{i}.txt", done]
+        if rng.random() < v1_ratio:
+            values = [json.dumps(ner[c], ensure_ascii=False) if isinstance(ner[c], (list, dict)) else ner[c]
+                      for c in V1_COLUMNS]
+            batch_v1.append(base + [1] + values)
+        else:
+            batch_v2.append(base + [2, json.dumps(ner, ensure_ascii=False)])
+        if len(batch_v1) + len(batch_v2) >= 5000:
+            cur.executemany(v1_sql, batch_v1)
+            cur.executemany(v2_sql, batch_v2)
+            batch_v1, batch_v2 = [], []
+    cur.executemany(v1_sql, batch_v1)
+    cur.executemany(v2_sql, batch_v2)
+    db.commit()
+    cur.close()
+
+
+def parse_mix(text: str) -> list:
+    pairs = [item.split("=") for item in text.split(",") if item]
+    return [(name, float(weight)) for name, weight in pairs]
+
+
+def parse_args():
+    p = argparse.ArgumentParser(description="HGRecorder 数据库 / API 压测")
+    p.add_argument("--rows", type=int, default=100_000, help="预置事件数")
+    p.add_argument("--v1-ratio", type=float, default=0.2, help="schema_version=1 的比例")
+    p.add_argument("--undone-ratio", type=float, default=0.3, help="未完成事件比例（影响 /daily/）")
+    p.add_argument("--text-bytes", type=int, default=2048, help="每条 events_full 的大致字节数")
+    p.add_argument("--requests", type=int, default=3000, help="总请求数")
+    p.add_argument("--concurrency", type=int, default=16, help="并发协程数")
+    p.add_argument("--mix", default=DEFAULT_MIX, help="路由权重，如 detail=35,event=30,update=20")
+    p.add_argument("--seed", type=int, default=42)
+    p.add_argument("--out", help="结果 JSON 输出路径")
+    return p.parse_args()
+
+
+async def drive(app, args, max_id: int, rng: random.Random, cookie: dict) -> tuple:
+    import httpx
+
+    names, weights = zip(*parse_mix(args.mix))
+    latencies = defaultdict(list)
+    statuses = defaultdict(lambda: defaultdict(int))
+    counter = iter(range(args.requests))
+    created = []
+
+    def pick_id():
+        return rng.randint(1, max_id + len(created))
+
+    async def one(client, name):
+        if name == "detail":
+            return await client.get(f"/detail/{pick_id()}")
+        if name == "event":
+            return await client.get(f"/events/{pick_id()}")
+        if name == "daily":
+            return await client.get("/daily/")
+        if name == "events":
+            return await client.get("/events/")
+        if name == "update":
+            return await client.put(f"/events/{pick_id()}", json={"done": 1})
+        if name == "create":
+            resp = await client.post("/events/", json={
+                "ner_extract": fake_ner(rng, args.text_bytes),
+                "file_original": "bench", "file_processed": "bench",
+            })
+            if resp.status_code == 200:
+                created.append(resp.json()["event_id"])
+            return resp
+        raise ValueError(f"未知路由类型: {name}")
+
+    async def worker(client):
+        for _ in counter:
+            name = rng.choices(names, weights)[0]
+            start = time.perf_counter()
+            resp = await one(client, name)
+            latencies[name].append(time.perf_counter() - start)
+            statuses[name][resp.status_code] += 1
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", cookies=cookie, timeout=None) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(client) for _ in range(args.concurrency)))
+        wall = time.perf_counter() - start
+    return latencies, statuses, wall
+
+
+def main():
+    args = parse_args()
+    rng = random.Random(args.seed)
+    workdir = Path(tempfile.mkdtemp(prefix="hg_bench_db_"))
+    prepare_env(workdir)
+
+    from api.mainapi import create_app
+    from database.processor import ProcessDB
+    from scripts.metrics import DB_SECONDS
+    from scripts.settings import settings
+
+    pdb = ProcessDB()
+    t0 = time.perf_counter()
+    seed(pdb.db, args.rows, args.v1_ratio, args.text_bytes, args.undone_ratio, rng)
+    seed_seconds = time.perf_counter() - t0
+    db_size = settings.events_db_path.stat().st_size
+
+    # 统计各类 SQL 语句的执行次数（字面量归一化后计数）
+    statements = defaultdict(int)
+
+    def count_statement(sql: str):
+        normalized = re.sub(r"\s+", " ", re.sub(r"'[^']*'|\b\d+\b", "?", sql)).strip()
+        statements[normalized[:120]] += 1
+
+    pdb.db.set_trace_callback(count_statement)
+
+    app = create_app()
+    cookie = {settings.cookie_name: "true"}
+    latencies, statuses, wall = asyncio.run(drive(app, args, args.rows, rng, cookie))
+    pdb.db.set_trace_callback(None)
+
+    total = sum(len(v) for v in latencies.values())
+    db_ops = DB_SECONDS.totals("op")
+    for stats in db_ops.values():
+        stats["mean"] = stats["sum"] / stats["count"] if stats["count"] else 0
+    report = {
+        "benchmark": "db_api",
+        "commit": git_commit(),
+        "config": {k: v for k, v in vars(args).items() if k != "out"},
+        "seed_seconds": seed_seconds,
+        "db_bytes": db_size,
+        "requests": total,
+        "wall_seconds": wall,
+        "rps": total / wall if wall else 0,
+        "routes": {
+            name: {"latency_seconds": percentiles(values), "status": dict(statuses[name])}
+            for name, values in latencies.items()
+        },
+        "db_ops": db_ops,
+        "sql_statements": dict(sorted(statements.items(), key=lambda kv: -kv[1])[:30]),
+        "peak_rss_mb": peak_rss_mb(),
+        "workdir": str(workdir),
+    }
+    write_report(report, args.out)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,259 @@
+"""
+端到端摄取基准：生成合成文件 → 真实的文件夹监控 → handle_new_file → NER → 数据库。
+
+ASR / OCR 默认使用可配置延迟的桩实现，--real-models 时加载真实的 Whisper / PaddleOCR。
+结果以 JSON 输出（吞吐、端到端延迟分位数、峰值 RSS、各阶段耗时），可跨提交对比。
+
+用法（在仓库根目录执行）：
+    python -m benchmarks.bench_ingest --text 50 --image 20 --audio 10 --out ingest.json
+    python -m benchmarks.bench_ingest --audio 5 --audio-seconds 30,120 --real-models
+"""
+import argparse
+import math
+import random
+import struct
+import tempfile
+import threading
+import time
+import wave
+from pathlib import Path
+
+from benchmarks.common import prepare_env, percentiles, peak_rss_mb, git_commit, write_report
+
+NOTE_TEMPLATES = [
+    "明天下午3点在三楼会议室开会，讨论季度汇报，张经理主持。",
+    "2025年11月20日上午10点 项目验收，地点：研发中心实验室。",
+    "每周一三五晚上7点羽毛球训练，持续2小时。",
+    "下周三和李老师面试候选人，预计半天。",
+    "每月第二个周五例会，每隔3天提交一次周报。",
+    "10/28 14:30-16:00 培训讲座，大礼堂。",
+]
+
+
+# ---------------- 合成数据 ----------------
+
+def make_text(path: Path, size: int):
+    text = ""
+    while len(text.encode("utf-8")) < size:
+        text += random.choice(NOTE_TEMPLATES) + "\n"
+    _write_chunked(path, text.encode("utf-8"))
+
+
+def make_image(path: Path, width: int, height: int):
+    try:
+        from PIL import Image, ImageDraw
+    except ImportError:
+        # 没有 Pillow 时写入同等量级的随机字节，只适用于桩 OCR
+        _write_chunked(path, random.randbytes(max(1024, width * height // 8)))
+        return
+    img = Image.new("RGB", (width, height), "white")
+    draw = ImageDraw.Draw(img)
+    step = max(20, height // 12)
+    for i, y in enumerate(range(step, height - step, step)):
+        draw.text((step, y), NOTE_TEMPLATES[i % len(NOTE_TEMPLATES)], fill="black")
+    tmp = _staging(path)
+    img.save(tmp, format="JPEG", quality=90)
+    _write_chunked(path, tmp.read_bytes())
+    tmp.unlink()
+
+
+def make_audio(path: Path, seconds: float, rate: int = 16000):
+    frames = bytearray()
+    for i in range(int(seconds * rate)):
+        frames += struct.pack("<h", int(8000 * math.sin(2 * math.pi * 440 * i / rate)))
+    tmp = _staging(path)
+    with wave.open(str(tmp), "wb") as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(rate)
+        wf.writeframes(bytes(frames))
+    _write_chunked(path, tmp.read_bytes())
+    tmp.unlink()
+
+
+def _staging(path: Path) -> Path:
+    """中间文件放在监控目录之外，避免被当作新上传"""
+    return Path(tempfile.gettempdir()) / f"{path.name}.part"
+
+
+def _write_chunked(path: Path, data: bytes, chunk: int = 1024 * 1024):
+    """按块写入，模拟 upload_file 的写法（监控器会看到 created + modified）"""
+    with path.open("wb") as f:
+        for i in range(0, len(data), chunk):
+            f.write(data[i:i + chunk])
+
+
+# ---------------- 桩引擎 ----------------
+
+class StubEngine:
+    """延迟 = base + per_mb × 文件大小(MB)，输出与真实处理器相同的结果字典"""
+
+    def __init__(self, kind: str, base: float, per_mb: float):
+        self.kind = kind
+        self.base = base
+        self.per_mb = per_mb
+
+    def _run(self, path):
+        from scripts.Tools import save_extract
+
+        size_mb = Path(path).stat().st_size / (1024 * 1024)
+        time.sleep(self.base + self.per_mb * size_mb)
+        text = random.choice(NOTE_TEMPLATES)
+        return {"text": text, "file_processed": save_extract(self.kind, text), "file_original": path}
+
+    process_audio = _run
+    process_image = _run
+
+
+# ---------------- 主流程 ----------------
+
+def parse_args():
+    p = argparse.ArgumentParser(description="HGRecorder 端到端摄取基准")
+    p.add_argument("--text", type=int, default=30, help="文本笔记数量")
+    p.add_argument("--image", type=int, default=10, help="图片数量")
+    p.add_argument("--audio", type=int, default=5, help="音频数量")
+    p.add_argument("--text-bytes", default="200,2000", help="文本大小列表（字节，逗号分隔，轮流使用）")
+    p.add_argument("--image-sizes", default="1280x960,4000x3000", help="图片尺寸列表")
+    p.add_argument("--audio-seconds", default="5,30", help="音频时长列表（秒）")
+    p.add_argument("--asr-latency", default="0.5,0.2", help="桩 ASR 延迟：base,per_mb（秒）")
+    p.add_argument("--ocr-latency", default="0.3,0.1", help="桩 OCR 延迟：base,per_mb（秒）")
+    p.add_argument("--real-models", action="store_true", help="使用真实 Whisper / PaddleOCR")
+    p.add_argument("--rate", type=float, default=0, help="每秒投放文件数，0 表示一次性全部投放")
+    p.add_argument("--stable-seconds", type=float, default=0.5, help="文件稳定判定时间")
+    p.add_argument("--check-interval", type=float, default=0.1, help="稳定检测间隔")
+    p.add_argument("--timeout", type=float, default=600, help="等待全部完成的最长时间")
+    p.add_argument("--seed", type=int, default=42)
+    p.add_argument("--out", help="结果 JSON 输出路径")
+    return p.parse_args()
+
+
+def build_workload(args, upload_dir: Path) -> list:
+    """返回 (文件类型, 生成函数, 目标路径) 列表，文件名使用与上传相同的 unique_name"""
+    from scripts.unique_string_generate import unique_name
+
+    text_sizes = [int(x) for x in args.text_bytes.split(",")]
+    image_sizes = [tuple(int(v) for v in x.split("x")) for x in args.image_sizes.split(",")]
+    audio_secs = [float(x) for x in args.audio_seconds.split(",")]
+
+    jobs = []
+    for i in range(args.text):
+        size = text_sizes[i % len(text_sizes)]
+        jobs.append(("text", lambda p, s=size: make_text(p, s), upload_dir / f"{unique_name()}.txt"))
+    for i in range(args.image):
+        w, h = image_sizes[i % len(image_sizes)]
+        jobs.append(("image", lambda p, w=w, h=h: make_image(p, w, h), upload_dir / f"{unique_name()}.jpg"))
+    for i in range(args.audio):
+        sec = audio_secs[i % len(audio_secs)]
+        jobs.append(("audio", lambda p, s=sec: make_audio(p, s), upload_dir / f"{unique_name()}.wav"))
+    random.shuffle(jobs)
+    return jobs
+
+
+def main():
+    args = parse_args()
+    random.seed(args.seed)
+    workdir = Path(tempfile.mkdtemp(prefix="hg_bench_ingest_"))
+    env = prepare_env(workdir)
+
+    # 环境准备好之后才能导入项目模块
+    from app import pipeline
+    from app.detect_folder import start_watch
+    from database.processor import ProcessDB
+    from scripts.metrics import STAGE_SECONDS, STABILITY_WAIT_SECONDS, DB_SECONDS
+
+    if args.real_models:
+        pipeline.load_processors()
+    else:
+        asr_base, asr_mb = (float(x) for x in args.asr_latency.split(","))
+        ocr_base, ocr_mb = (float(x) for x in args.ocr_latency.split(","))
+        pipeline.set_processor("asr", StubEngine("ASR", asr_base, asr_mb))
+        pipeline.set_processor("ocr", StubEngine("OCR", ocr_base, ocr_mb))
+
+    upload_dir = Path(env["UPLOAD_DIR_PATH"])
+    written = {}      # 文件名 -> (类型, 写入完成时刻)
+    finished = {}     # 文件名 -> (完成时刻, 是否成功)
+    duplicates = []
+    lock = threading.Lock()
+    all_done = threading.Event()
+
+    def callback(path: str):
+        name = Path(path).name
+        if name not in expected:
+            return
+        ok = True
+        try:
+            pipeline.handle_new_file(path)
+        except Exception:
+            ok = False
+        with lock:
+            if name in finished:
+                duplicates.append(name)
+                return
+            finished[name] = (time.perf_counter(), ok)
+            if len(finished) >= total:
+                all_done.set()
+
+    workload = build_workload(args, upload_dir)
+    total = len(workload)
+    expected = {path.name for _, _, path in workload}
+    stop = threading.Event()
+    watcher = threading.Thread(
+        target=start_watch,
+        kwargs=dict(folder_to_watch=upload_dir, user_callback=callback,
+                    stable_seconds=args.stable_seconds, check_interval=args.check_interval,
+                    stop_event=stop),
+        daemon=True,
+    )
+    watcher.start()
+    time.sleep(1.0)  # 等待 observer 就绪
+
+    t_start = time.perf_counter()
+    for i, (kind, make, path) in enumerate(workload):
+        if args.rate > 0:
+            delay = t_start + i / args.rate - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+        make(path)
+        with lock:
+            written[path.name] = (kind, time.perf_counter())
+
+    completed = all_done.wait(args.timeout)
+    t_end = time.perf_counter()
+    stop.set()
+    watcher.join(timeout=5)
+
+    latencies = {"all": []}
+    failed = 0
+    for name, (done_at, ok) in finished.items():
+        kind, wrote_at = written.get(name, ("unknown", t_start))
+        if not ok:
+            failed += 1
+            continue
+        latencies["all"].append(done_at - wrote_at)
+        latencies.setdefault(kind, []).append(done_at - wrote_at)
+
+    wall = t_end - t_start
+    report = {
+        "benchmark": "ingest",
+        "commit": git_commit(),
+        "config": {k: v for k, v in vars(args).items() if k != "out"},
+        "files": total,
+        "completed": len(finished),
+        "failed": failed,
+        "timed_out": not completed,
+        "duplicates": len(duplicates),
+        "events_in_db": len(ProcessDB().search_events_all()),
+        "wall_seconds": wall,
+        "throughput_files_per_s": len(finished) / wall if wall else 0,
+        "latency_seconds": {k: percentiles(v) for k, v in latencies.items()},
+        "stage_seconds": STAGE_SECONDS.totals("stage"),
+        "stability_wait_seconds": STABILITY_WAIT_SECONDS.snapshot(),
+        "db_seconds": DB_SECONDS.totals("op"),
+        "peak_rss_mb": peak_rss_mb(),
+        "workdir": str(workdir),
+    }
+    write_report(report, args.out)
+
+
+if __name__ == "__main__":
+    main()
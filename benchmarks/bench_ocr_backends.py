@@ -0,0 +1,217 @@
+"""
+OCR 后端基准与一致性检查：同一批图片分别用各后端（paddle / onnx）识别，
+比较单图延迟、模型加载耗时、峰值内存，并以第一个后端为基准检查输出一致性：
+
+    text_similarity   整图文本相似度
+    box_match_rate    基准中的框在对方结果里找到 IoU ≥ --iou 的框的比例
+    line_exact_rate   匹配上的框中文本完全一致的比例
+
+每个后端在独立子进程中运行，峰值内存互不影响。
+任一后端的整图文本相似度中位数低于 --min-similarity 时以非零状态退出，可作为转换模型后的回归检查。
+
+图片来源与 bench_ocr_prep 相同（--images 目录或合成图片）。
+
+用法（在仓库根目录执行）：
+    python -m benchmarks.bench_ocr_backends --images samples/photos --out ocr_backends.json
+    python -m benchmarks.bench_ocr_backends --synthetic 6 --backends paddle,onnx --min-similarity 0.98
+"""
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.common import prepare_env, percentiles, peak_rss_mb, git_commit, write_report
+from benchmarks.bench_ocr_prep import synthesize, load_images, cer, similarity
+
+
+def parse_args():
+    p = argparse.ArgumentParser(description="HGRecorder OCR 后端基准")
+    p.add_argument("--images", help="图片目录（同名 .txt 为标注文本）")
+    p.add_argument("--synthetic", type=int, default=6, help="未指定 --images 时生成的图片数")
+    p.add_argument("--sizes", default="1920x1080,1280x960", help="合成图片尺寸列表")
+    p.add_argument("--font-px", default="32,48", help="合成图片字号列表（像素）")
+    p.add_argument("--backends", default="paddle,onnx", help="逗号分隔，第一个作为一致性基准")
+    p.add_argument("--preprocess", action="store_true", help="启用 OCR 预处理（默认关闭，只比较推理本身）")
+    p.add_argument("--repeat", type=int, default=3, help="每张图重复识别次数，取中位数")
+    p.add_argument("--iou", type=float, default=0.5, help="框匹配的 IoU 阈值")
+    p.add_argument("--min-similarity", type=float, default=0.95, help="一致性检查的文本相似度下限")
+    p.add_argument("--seed", type=int, default=42)
+    p.add_argument("--single", help=argparse.SUPPRESS)   # 子进程内部使用
+    p.add_argument("--out", help="结果 JSON 输出路径")
+    return p.parse_args()
+
+
+def run_single(backend_name: str, images: list, preprocess: bool, repeat: int) -> dict:
+    """在当前进程内加载一个后端并识别所有图片"""
+    from app.OCR import OCRProcessor
+
+    t0 = time.perf_counter()
+    processor = OCRProcessor(preprocess=preprocess, backend=backend_name)
+    load_seconds = time.perf_counter() - t0
+    rss_after_load = peak_rss_mb()
+    # 预热：首次推理的初始化不计入
+    processor.detect(str(images[0]))
+
+    rows = []
+    for path in images:
+        timings = []
+        for _ in range(max(1, repeat)):
+            t0 = time.perf_counter()
+            lines = processor.detect(str(path))
+            timings.append(time.perf_counter() - t0)
+        rows.append({
+            "image": path.name,
+            "seconds": sorted(timings)[len(timings) // 2],
+            "lines": [([[float(x), float(y)] for x, y in box], text, float(score)) for box, text, score in lines],
+            "text": "\n".join(text for _, text, score in lines if score > processor.sensitivity),
+        })
+    return {
+        "backend": backend_name,
+        "load_seconds": load_seconds,
+        "rss_after_load_mb": rss_after_load,
+        "peak_rss_mb": peak_rss_mb(),
+        "images": rows,
+    }
+
+
+# ---------------- 一致性 ----------------
+
+def _bbox(box) -> tuple:
+    xs, ys = [p[0] for p in box], [p[1] for p in box]
+    return min(xs), min(ys), max(xs), max(ys)
+
+
+def iou(a, b) -> float:
+    ax0, ay0, ax1, ay1 = _bbox(a)
+    bx0, by0, bx1, by1 = _bbox(b)
+    w = max(0.0, min(ax1, bx1) - max(ax0, bx0))
+    h = max(0.0, min(ay1, by1) - max(ay0, by0))
+    inter = w * h
+    union = (ax1 - ax0) * (ay1 - ay0) + (bx1 - bx0) * (by1 - by0) - inter
+    return inter / union if union > 0 else 0.0
+
+
+def compare_lines(reference: list, candidate: list, threshold: float) -> dict:
+    """基准中的每个框贪心匹配对方 IoU 最大且未被占用的框"""
+    used = set()
+    matched = exact = 0
+    ious = []
+    for ref_box, ref_text, _ in reference:
+        best, best_iou = None, threshold
+        for i, (box, _, _) in enumerate(candidate):
+            if i in used:
+                continue
+            value = iou(ref_box, box)
+            if value >= best_iou:
+                best, best_iou = i, value
+        if best is None:
+            continue
+        used.add(best)
+        matched += 1
+        ious.append(best_iou)
+        exact += candidate[best][1] == ref_text
+    return {
+        "reference_lines": len(reference),
+        "candidate_lines": len(candidate),
+        "box_match_rate": matched / len(reference) if reference else float(not candidate),
+        "line_exact_rate": exact / matched if matched else None,
+        "mean_iou": sum(ious) / len(ious) if ious else None,
+    }
+
+
+# ---------------- 主流程 ----------------
+
+def main():
+    args = parse_args()
+
+    if args.single:
+        prepare_env(Path(tempfile.mkdtemp(prefix="hg_bench_ocr_backend_")))
+        images = [path for path, _ in load_images(Path(args.images))]
+        print(json.dumps(run_single(args.single, images, args.preprocess, args.repeat), ensure_ascii=False))
+        return
+
+    workdir = Path(tempfile.mkdtemp(prefix="hg_bench_ocr_backends_"))
+    if args.images:
+        image_dir = Path(args.images)
+        items = load_images(image_dir)
+    else:
+        sizes = [tuple(int(v) for v in s.split("x")) for s in args.sizes.split(",")]
+        fonts = [int(x) for x in args.font_px.split(",")]
+        items = synthesize(workdir, args.synthetic, sizes, fonts, random.Random(args.seed))
+        for path, truth in items:
+            path.with_suffix(".txt").write_text(truth, encoding="utf-8")
+        image_dir = workdir
+    if not items:
+        raise SystemExit(f"{image_dir} 中没有图片")
+    truths = {path.name: truth for path, truth in items}
+
+    results = {}
+    for name in [b for b in args.backends.split(",") if b]:
+        cmd = [sys.executable, "-m", "benchmarks.bench_ocr_backends", "--images", str(image_dir),
+               "--repeat", str(args.repeat), "--single", name]
+        if args.preprocess:
+            cmd.append("--preprocess")
+        proc = subprocess.run(cmd, capture_output=True, text=True, env=os.environ.copy())
+        if proc.returncode != 0:
+            results[name] = {"backend": name, "error": proc.stderr.strip().splitlines()[-1:]}
+            continue
+        results[name] = json.loads(proc.stdout.strip().splitlines()[-1])
+
+    # 以第一个成功的后端为一致性基准
+    reference = next((r for r in results.values() if "images" in r), None)
+    ref_rows = {row["image"]: row for row in reference["images"]} if reference else {}
+    summary = {}
+    parity_failed = []
+    for name, result in results.items():
+        if "images" not in result:
+            summary[name] = result
+            parity_failed.append(name)
+            continue
+        for row in result["images"]:
+            ref = ref_rows.get(row["image"])
+            if ref is not None:
+                row["text_similarity"] = similarity(row["text"], ref["text"])
+                row.update(compare_lines(ref["lines"], row["lines"], args.iou))
+            if truths.get(row["image"]) is not None:
+                row["cer"] = cer(row["text"], truths[row["image"]])
+            del row["lines"]
+
+        def column(key):
+            return [r[key] for r in result["images"] if r.get(key) is not None]
+
+        text_similarity = percentiles(column("text_similarity"))
+        if text_similarity.get("p50") is not None and text_similarity["p50"] < args.min_similarity:
+            parity_failed.append(name)
+        summary[name] = {
+            "load_seconds": result["load_seconds"],
+            "rss_after_load_mb": result["rss_after_load_mb"],
+            "peak_rss_mb": result["peak_rss_mb"],
+            "seconds": percentiles(column("seconds")),
+            "text_similarity": text_similarity,
+            "box_match_rate": percentiles(column("box_match_rate")),
+            "line_exact_rate": percentiles(column("line_exact_rate")),
+            "cer": percentiles(column("cer")),
+            "images": result["images"],
+        }
+
+    report = {
+        "benchmark": "ocr_backends",
+        "commit": git_commit(),
+        "config": {k: v for k, v in vars(args).items() if k not in ("out", "single")},
+        "reference_backend": reference["backend"] if reference else None,
+        "images": len(items),
+        "parity_failed": parity_failed,
+        "backends": summary,
+    }
+    write_report(report, args.out)
+    if parity_failed:
+        raise SystemExit(f"一致性检查未通过: {', '.join(parity_failed)}")
+
+
+if __name__ == "__main__":
+    main()
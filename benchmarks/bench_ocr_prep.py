@@ -0,0 +1,184 @@
+"""
+OCR 预处理基准：同一批图片分别以原图（旧流程）和预处理后送入 PaddleOCR，
+对比每张图的耗时，以及识别文本与原图结果 / 标注文本的差异。
+
+图片来自 --images 目录（同名 .txt 视为标注文本，可选）；
+不指定时用 Pillow 生成不同尺寸、不同字号的合成图片，标注文本即绘制的文字。
+--prep-only 只测预处理本身（不需要 PaddleOCR）。
+
+用法（在仓库根目录执行）：
+    python -m benchmarks.bench_ocr_prep --images samples/photos --out ocr_prep.json
+    python -m benchmarks.bench_ocr_prep --synthetic 6 --tile-size 960
+    python -m benchmarks.bench_ocr_prep --prep-only
+"""
+import argparse
+import difflib
+import random
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.common import prepare_env, percentiles, peak_rss_mb, git_commit, write_report
+
+IMAGE_SUFFIXES = {".jpg", ".jpeg", ".png", ".bmp"}
+WORDS = ("meeting", "project", "review", "budget", "room", "report", "deadline", "team",
+         "Monday", "Friday", "10:30", "2025-11-20", "third", "floor", "client", "training")
+
+
+def parse_args():
+    p = argparse.ArgumentParser(description="HGRecorder OCR 预处理基准")
+    p.add_argument("--images", help="图片目录（同名 .txt 为标注文本）")
+    p.add_argument("--synthetic", type=int, default=6, help="未指定 --images 时生成的图片数")
+    p.add_argument("--sizes", default="4032x3024,1920x1080", help="合成图片尺寸列表")
+    p.add_argument("--font-px", default="48,96,160", help="合成图片字号列表（像素）")
+    p.add_argument("--tile-size", type=int, help="覆盖 OCR_TILE_SIZE")
+    p.add_argument("--grayscale", choices=["auto", "on", "off"], help="覆盖 OCR_GRAYSCALE")
+    p.add_argument("--prep-only", action="store_true", help="只测预处理，不运行 OCR")
+    p.add_argument("--seed", type=int, default=42)
+    p.add_argument("--out", help="结果 JSON 输出路径")
+    return p.parse_args()
+
+
+# ---------------- 数据 ----------------
+
+def synthesize(out_dir: Path, count: int, sizes: list, font_sizes: list, rng: random.Random) -> list:
+    from PIL import Image, ImageDraw, ImageFont
+
+    items = []
+    for i in range(count):
+        width, height = sizes[i % len(sizes)]
+        font_px = font_sizes[(i // len(sizes)) % len(font_sizes)]
+        try:
+            font = ImageFont.load_default(size=font_px)
+        except TypeError:
+            # Pillow < 10.1 没有可缩放的默认字体
+            font = ImageFont.load_default()
+        img = Image.new("RGB", (width, height), (245, 243, 238))
+        draw = ImageDraw.Draw(img)
+        lines = []
+        y = font_px
+        while y + font_px * 2 < height:
+            line = " ".join(rng.choice(WORDS) for _ in range(rng.randint(2, 5)))
+            draw.text((font_px, y), line, fill=(20, 20, 20), font=font)
+            lines.append(line)
+            y += int(font_px * 1.8)
+        path = out_dir / f"synthetic_{i}_{width}x{height}_{font_px}px.jpg"
+        img.save(path, quality=90)
+        items.append((path, "\n".join(lines)))
+    return items
+
+
+def load_images(folder: Path) -> list:
+    items = []
+    for path in sorted(folder.iterdir()):
+        if path.suffix.lower() in IMAGE_SUFFIXES:
+            truth = path.with_suffix(".txt")
+            items.append((path, truth.read_text(encoding="utf-8") if truth.exists() else None))
+    return items
+
+
+# ---------------- 指标 ----------------
+
+def normalize(text: str) -> str:
+    return "".join(text.split()).lower()
+
+
+def cer(hypothesis: str, reference: str) -> float:
+    """字符错误率（忽略空白），编辑距离 / 参考长度"""
+    hyp, ref = normalize(hypothesis), normalize(reference)
+    if not ref:
+        return float(bool(hyp))
+    previous = list(range(len(ref) + 1))
+    for i, h in enumerate(hyp, 1):
+        current = [i]
+        for j, r in enumerate(ref, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (h != r)))
+        previous = current
+    return previous[-1] / len(ref)
+
+
+def similarity(a: str, b: str) -> float:
+    return difflib.SequenceMatcher(None, normalize(a), normalize(b)).ratio()
+
+
+# ---------------- 主流程 ----------------
+
+def main():
+    args = parse_args()
+    rng = random.Random(args.seed)
+    workdir = Path(tempfile.mkdtemp(prefix="hg_bench_ocr_"))
+    prepare_env(workdir)
+
+    from app.image_prep import ImagePreprocessor
+
+    if args.images:
+        items = load_images(Path(args.images))
+    else:
+        sizes = [tuple(int(v) for v in s.split("x")) for s in args.sizes.split(",")]
+        fonts = [int(x) for x in args.font_px.split(",")]
+        items = synthesize(workdir, args.synthetic, sizes, fonts, rng)
+
+    preprocessor = ImagePreprocessor(tile_size=args.tile_size, grayscale=args.grayscale)
+    processor = None
+    if not args.prep_only:
+        from app.OCR import OCRProcessor
+        processor = OCRProcessor(preprocess=False)
+        # 预热：模型首次推理的初始化不计入
+        processor.detect(str(items[0][0]))
+
+    rows = []
+    for path, truth in items:
+        row = {"image": path.name, "bytes": path.stat().st_size}
+        t0 = time.perf_counter()
+        prepared = preprocessor.prepare(path)
+        row["prep_seconds"] = time.perf_counter() - t0
+        row.update(prepared.info)
+
+        if processor is not None:
+            processor.preprocessor = None
+            t0 = time.perf_counter()
+            baseline = "\n".join(text for _, text, score in processor.detect(str(path)) if score > processor.sensitivity)
+            row["baseline_seconds"] = time.perf_counter() - t0
+
+            processor.preprocessor = preprocessor
+            t0 = time.perf_counter()
+            prepped = "\n".join(text for _, text, score in processor.detect(str(path)) if score > processor.sensitivity)
+            row["prep_total_seconds"] = time.perf_counter() - t0
+
+            row["speedup"] = row["baseline_seconds"] / row["prep_total_seconds"] if row["prep_total_seconds"] else None
+            row["similarity_to_baseline"] = similarity(baseline, prepped)
+            if truth is not None:
+                row["baseline_cer"] = cer(baseline, truth)
+                row["prep_cer"] = cer(prepped, truth)
+        rows.append(row)
+
+    def column(name):
+        return [r[name] for r in rows if r.get(name) is not None]
+
+    report = {
+        "benchmark": "ocr_prep",
+        "commit": git_commit(),
+        "config": {k: v for k, v in vars(args).items() if k != "out"},
+        "preprocessor": {
+            "target_text_px": preprocessor.target_text_px,
+            "min_side": preprocessor.min_side,
+            "max_side": preprocessor.max_side,
+            "tile_size": preprocessor.tile_size,
+            "grayscale": preprocessor.grayscale,
+        },
+        "images": len(rows),
+        "prep_seconds": percentiles(column("prep_seconds")),
+        "baseline_seconds": percentiles(column("baseline_seconds")),
+        "prep_total_seconds": percentiles(column("prep_total_seconds")),
+        "similarity_to_baseline": percentiles(column("similarity_to_baseline")),
+        "baseline_cer": percentiles(column("baseline_cer")),
+        "prep_cer": percentiles(column("prep_cer")),
+        "per_image": rows,
+        "peak_rss_mb": peak_rss_mb(),
+        "workdir": str(workdir),
+    }
+    write_report(report, args.out)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+"""
+启动基准：冷启动 API 进程直到第一个请求成功返回的耗时（time-to-first-request），
+以及 `python -X importtime` 给出的导入耗时排行，用于发现新引入的重量级 / 有副作用的导入。
+
+每次运行都是全新的子进程（不复用 __pycache__ 以外的任何状态），数据目录指向临时目录。
+--budget 指定 p50 上限（秒），超出时退出码为 1，可直接放进 CI。
+
+用法（在仓库根目录执行）：
+    python -m benchmarks.bench_startup --runs 5 --out startup.json
+    python -m benchmarks.bench_startup --modules api.mainapi,run --top 15 --budget 1.0
+"""
+import argparse
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+from benchmarks.common import prepare_env, percentiles, git_commit, write_report
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def parse_args():
+    p = argparse.ArgumentParser(description="HGRecorder 启动耗时基准")
+    p.add_argument("--runs", type=int, default=5, help="冷启动次数")
+    p.add_argument("--modules", default="api.mainapi,run", help="用 -X importtime 分析的模块，逗号分隔")
+    p.add_argument("--top", type=int, default=20, help="导入耗时排行保留条数")
+    p.add_argument("--path", default="/login", help="首个请求的路径（无需登录）")
+    p.add_argument("--timeout", type=float, default=60, help="单次启动等待上限（秒）")
+    p.add_argument("--budget", type=float, default=1.0, help="time-to-first-request p50 上限（秒），0 表示不检查")
+    p.add_argument("--out", help="结果 JSON 输出路径")
+    return p.parse_args()
+
+
+# ---------------- -X importtime ----------------
+
+def import_profile(module: str, top: int) -> dict:
+    """
+    解析 importtime 输出（单位 us）：
+    import time: self [us] | cumulative | imported package
+    """
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, capture_output=True, text=True,
+    )
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append({
+            "module": name.strip(),
+            "depth": (len(name) - len(name.lstrip())) // 2,
+            "self_ms": int(self_us) / 1000,
+            "cumulative_ms": int(cumulative_us) / 1000,
+        })
+    target = next((r for r in reversed(rows) if r["module"] == module), None)
+    # 只看顶层包（如 torch、fastapi），子模块的耗时已计入其中
+    packages = {}
+    for r in rows:
+        name = r["module"].split(".")[0]
+        packages[name] = packages.get(name, 0) + r["self_ms"]
+    return {
+        "ok": proc.returncode == 0,
+        "error": proc.stderr.strip().splitlines()[-1] if proc.returncode else None,
+        "total_ms": target["cumulative_ms"] if target else None,
+        "modules_imported": len(rows),
+        "top_cumulative": sorted(rows, key=lambda r: -r["cumulative_ms"])[:top],
+        "top_packages_ms": dict(sorted(packages.items(), key=lambda kv: -kv[1])[:top]),
+    }
+
+
+# ---------------- time-to-first-request ----------------
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _get(url: str, timeout: float) -> int:
+    """返回状态码；4xx/5xx 同样说明服务已就绪"""
+    try:
+        with urllib.request.urlopen(url, timeout=timeout) as resp:
+            return resp.status
+    except urllib.error.HTTPError as e:
+        return e.code
+
+
+def first_request(path: str, timeout: float) -> dict:
+    """启动 uvicorn 子进程，轮询直到首个请求成功，返回各时间点（秒，相对于进程启动）"""
+    port = _free_port()
+    url = f"http://127.0.0.1:{port}{path}"
+    start = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "api.mainapi:create_api_app", "--factory",
+         "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True,
+    )
+    try:
+        while time.perf_counter() - start < timeout:
+            if proc.poll() is not None:
+                return {"ok": False, "error": proc.stderr.read().strip().splitlines()[-1:]}
+            try:
+                status = _get(url, timeout=1)
+                ready = time.perf_counter() - start
+                break
+            except (urllib.error.URLError, ConnectionError, socket.timeout):
+                time.sleep(0.01)
+        else:
+            return {"ok": False, "error": "timeout"}
+
+        # 第二个请求的耗时，用来区分“启动慢”和“首个请求本身慢”
+        t0 = time.perf_counter()
+        _get(url, timeout=5)
+        return {"ok": True, "status": status, "seconds": ready, "warm_request_seconds": time.perf_counter() - t0}
+    finally:
+        proc.terminate()
+        try:
+            proc.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+
+def main():
+    args = parse_args()
+    workdir = Path(tempfile.mkdtemp(prefix="hg_bench_startup_"))
+    prepare_env(workdir)
+    # 子进程继承临时目录配置；不预加载模型，只测 API 本身
+    os.environ["PRELOAD_MODELS"] = "0"
+
+    imports = {m: import_profile(m, args.top) for m in args.modules.split(",") if m}
+
+    runs = [first_request(args.path, args.timeout) for _ in range(args.runs)]
+    ok = [r for r in runs if r["ok"]]
+    ttfr = percentiles([r["seconds"] for r in ok])
+
+    report = {
+        "benchmark": "startup",
+        "commit": git_commit(),
+        "python": sys.version.split()[0],
+        "config": {k: v for k, v in vars(args).items() if k != "out"},
+        "time_to_first_request_seconds": ttfr,
+        "warm_request_seconds": percentiles([r["warm_request_seconds"] for r in ok]),
+        "failed_runs": [r["error"] for r in runs if not r["ok"]],
+        "imports": imports,
+        "workdir": str(workdir),
+    }
+    over_budget = bool(args.budget) and (not ok or ttfr["p50"] > args.budget)
+    report["over_budget"] = over_budget
+    write_report(report, args.out)
+    sys.exit(1 if over_budget else 0)
+
+
+if __name__ == "__main__":
+    main()
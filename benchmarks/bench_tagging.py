@@ -0,0 +1,126 @@
+"""
+打标签阶段基准：同一批图片测量
+    - OCR 单图耗时（流水线中打标签与之并行的那一步）；
+    - YOLO 打标签在不同批大小下的单图摊销耗时；
+    - 按流水线的方式（提交打标签 → OCR → 等待标签）逐张处理时，OCR 之后额外等待的时间。
+
+目标是打标签的单图成本低于 OCR（tag_to_ocr_ratio < --max-ratio），否则以非零状态退出。
+OCR 与 YOLO 在同一进程内加载，线程数按 CPU 线程预算分配，与线上一致。
+
+图片来源与 bench_ocr_prep 相同（--images 目录或合成图片；合成图片只有文字，检测不到物体，仅用于计时）。
+
+用法（在仓库根目录执行）：
+    python -m benchmarks.bench_tagging --images samples/photos --out tagging.json
+    python -m benchmarks.bench_tagging --batch-sizes 1,4,8 --img-size 416
+"""
+import argparse
+import random
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.common import prepare_env, percentiles, peak_rss_mb, git_commit, write_report
+from benchmarks.bench_ocr_prep import synthesize, load_images
+
+
+def parse_args():
+    p = argparse.ArgumentParser(description="HGRecorder 打标签基准")
+    p.add_argument("--images", help="图片目录")
+    p.add_argument("--synthetic", type=int, default=8, help="未指定 --images 时生成的图片数")
+    p.add_argument("--sizes", default="1920x1080,1280x960", help="合成图片尺寸列表")
+    p.add_argument("--batch-sizes", default="1,4,8", help="逗号分隔的打标签批大小")
+    p.add_argument("--img-size", type=int, help="覆盖 TAG_IMG_SIZE")
+    p.add_argument("--max-ratio", type=float, default=1.0, help="打标签与 OCR 单图耗时之比的上限")
+    p.add_argument("--seed", type=int, default=42)
+    p.add_argument("--out", help="结果 JSON 输出路径")
+    return p.parse_args()
+
+
+def main():
+    args = parse_args()
+    workdir = Path(tempfile.mkdtemp(prefix="hg_bench_tagging_"))
+    prepare_env(workdir)
+
+    if args.images:
+        images = [path for path, _ in load_images(Path(args.images))]
+    else:
+        sizes = [tuple(int(v) for v in s.split("x")) for s in args.sizes.split(",")]
+        images = [path for path, _ in synthesize(workdir, args.synthetic, sizes, [48], random.Random(args.seed))]
+    if not images:
+        raise SystemExit("没有图片")
+
+    from app.OCR import OCRProcessor
+    from app.yolo import ImageTagger
+    from scripts.cpu_budget import apply_thread_budget
+
+    budget = apply_thread_budget()
+    t0 = time.perf_counter()
+    ocr = OCRProcessor()
+    ocr_load = time.perf_counter() - t0
+    ocr.detect(str(images[0]))  # 预热
+
+    t0 = time.perf_counter()
+    first = ImageTagger(batch_size=1, img_size=args.img_size)
+    first.tag(images[0])  # 加载模型并预热
+    tag_load = time.perf_counter() - t0
+
+    # ---- OCR 单图 ----
+    ocr_seconds = []
+    for path in images:
+        t0 = time.perf_counter()
+        ocr.detect(str(path))
+        ocr_seconds.append(time.perf_counter() - t0)
+    ocr_per_image = sum(ocr_seconds) / len(ocr_seconds)
+
+    # ---- 打标签：不同批大小下的摊销耗时 ----
+    batches = {}
+    for size in [int(x) for x in args.batch_sizes.split(",") if x]:
+        tagger = first if size == 1 else ImageTagger(batch_size=size, max_wait=1.0, img_size=args.img_size)
+        tagger.model = first.model
+        t0 = time.perf_counter()
+        futures = [tagger.submit(path) for path in images]
+        labels = [f.result() for f in futures]
+        seconds = time.perf_counter() - t0
+        batches[size] = {
+            "seconds_per_image": seconds / len(images),
+            "tag_to_ocr_ratio": seconds / len(images) / ocr_per_image if ocr_per_image else None,
+            "images_with_tags": sum(1 for item in labels if item),
+        }
+
+    # ---- 流水线方式：打标签与 OCR 并行，记录 OCR 之后的额外等待 ----
+    tagger = ImageTagger(img_size=args.img_size)
+    tagger.model = first.model
+    overlapped, waits = [], []
+    for path in images:
+        t0 = time.perf_counter()
+        future = tagger.submit(path)
+        ocr.detect(str(path))
+        t1 = time.perf_counter()
+        future.result()
+        t2 = time.perf_counter()
+        overlapped.append(t2 - t0)
+        waits.append(t2 - t1)
+
+    best = min((b["tag_to_ocr_ratio"] for b in batches.values() if b["tag_to_ocr_ratio"] is not None), default=None)
+    report = {
+        "benchmark": "tagging",
+        "commit": git_commit(),
+        "config": {k: v for k, v in vars(args).items() if k != "out"},
+        "thread_budget": {"ocr": budget.ocr, "tag": budget.tag, "total": budget.total},
+        "images": len(images),
+        "load_seconds": {"ocr": ocr_load, "tag": tag_load},
+        "ocr_seconds": percentiles(ocr_seconds),
+        "tag_batches": batches,
+        "pipeline_seconds": percentiles(overlapped),
+        "tag_wait_after_ocr_seconds": percentiles(waits),
+        "best_tag_to_ocr_ratio": best,
+        "peak_rss_mb": peak_rss_mb(),
+        "workdir": str(workdir),
+    }
+    write_report(report, args.out)
+    if best is None or best >= args.max_ratio:
+        raise SystemExit(f"打标签单图耗时未低于 OCR 的 {args.max_ratio} 倍: {best}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""基准脚本公用工具：隔离目录、分位数、峰值内存、结果输出"""
+import json
+import math
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+
+def prepare_env(workdir: Path, **overrides) -> dict:
+    """
+    把数据目录、数据库、日志都指向临时目录。
+    必须在导入任何项目模块之前调用（settings 加载 .env 时不会覆盖已存在的环境变量）。
+    """
+    workdir = Path(workdir)
+    env = {
+        "UPLOAD_DIR_PATH": workdir / "uploads",
+        "STORAGE_DIR_PATH": workdir / "storage",
+        "EXTRACTED_DIR_PATH": workdir / "extract",
+        "LOG_DIR_PATH": workdir / "logs",
+        "EVENTS_DBNEW_PATH": workdir / "events.db",
+        "TRACE_DB_PATH": workdir / "traces.db",
+        "PROGRESS_DB_PATH": workdir / "progress.db",
+    }
+    env.update(overrides)
+    for key, value in env.items():
+        if key.endswith("DIR_PATH"):
+            Path(value).mkdir(parents=True, exist_ok=True)
+        os.environ[key] = str(value)
+    return {k: str(v) for k, v in env.items()}
+
+
+def percentiles(values: list) -> dict:
+    """最近秩法计算 p50/p95/p99，单位与输入一致"""
+    if not values:
+        return {"count": 0}
+    data = sorted(values)
+
+    def pick(p):
+        return data[max(0, math.ceil(p / 100 * len(data)) - 1)]
+
+    return {
+        "count": len(data),
+        "min": data[0],
+        "p50": pick(50),
+        "p95": pick(95),
+        "p99": pick(99),
+        "max": data[-1],
+        "mean": sum(data) / len(data),
+    }
+
+
+def peak_rss_mb() -> float:
+    """进程峰值常驻内存（MB）"""
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux 单位为 KB，macOS 为字节
+        return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+    except ImportError:
+        pass
+    try:
+        import psutil
+        info = psutil.Process().memory_info()
+        return getattr(info, "peak_wset", info.rss) / (1024 * 1024)
+    except ImportError:
+        return float("nan")
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], text=True, stderr=subprocess.DEVNULL
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def write_report(report: dict, out: str = None):
+    """结果写到 stdout，指定 out 时同时写入文件，便于跨提交对比"""
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    print(text)
+    if out:
+        Path(out).write_text(text, encoding="utf-8")
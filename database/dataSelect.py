@@ -1,3 +1,4 @@
+import re
 from typing import List, Any, Dict
 from scripts.logger import logger
 
@@ -9,19 +10,23 @@ class DataSelect:
         # 🔹 内部NER字段
         self.in_ner_extract = [
             "dates", "times", "weeks", 
-            "places", "persons", "durations", "recurrences","events_extract", "events_full"
+            "places", "persons", "durations", "recurrences", "rrules", "events_extract", "events_full"
         ]
 
         # 🔹 外部通用字段
         self.in_outter = [
             "event_id", "created_at", "updated_at",
             "tags", "importance", "file_original",
-            "file_processed", "done","schema_version"
+            "file_processed", "done","schema_version",
+            "provisional", "asr_tier", "starts_at", "ends_at"
         ]
 
+        # 🔹 PATCH 可直接修改的外部字段（其余外部字段由系统维护）
+        self.patchable = ["tags", "importance", "done", "starts_at", "ends_at"]
+
         # 🔹 导出字段集合
         self.export_fields = {
-            "daily": ["event_id", "dates", "times", "events_full"],
+            "daily": ["event_id", "dates", "times", "events_full", "provisional"],
             "detail": self.in_ner_extract + self.in_outter,
         }
 
@@ -89,14 +94,58 @@ class DataSelect:
             return False
         
         for key in data.keys():
-            if key in self.in_ner_extract:
+            if key == "rrules" and isinstance(data[key], str):
+                # 详情页每行一条规则
+                to_db["ner_extract"][key] = [line.strip() for line in data[key].splitlines() if line.strip()] or None
+            elif key in self.in_ner_extract:
                 to_db["ner_extract"][key] = data[key]
+            elif key == "tags" and isinstance(data[key], str):
+                # 详情页以逗号分隔编辑标签，存回 JSON 数组以便建立标签索引
+                to_db[key] = [t.strip() for t in re.split(r"[,，]", data[key]) if t.strip()] or None
             elif key in self.in_outter:
                 to_db[key] = data[key]
             else:
                 logger.warning(f"[DataSelect] 忽略未知字段: {key}")
         return to_db
 
+    def formator_to_patch(self, data: Dict) -> tuple:
+        """
+        PATCH 请求体 -> (外部字段 {列: 值}, ner_extract 写入 {键: 值}, ner_extract 删除 [键])。
+        值为 None 表示删除该字段（ner_extract 中移除键，外部字段置 NULL）；
+        tags / rrules 接受与详情页相同的字符串写法。未知、只读字段或取值不合法时抛出 ValueError，
+        校验与 /events/bulk 一致：done 为 0 或 1，importance 为数值，tags / rrules 为字符串列表
+        """
+        columns, ner_set, ner_unset = {}, {}, []
+        for key, value in data.items():
+            if key == "rrules" and isinstance(value, str):
+                value = [line.strip() for line in value.splitlines() if line.strip()] or None
+            elif key == "tags" and isinstance(value, str):
+                value = [t.strip() for t in re.split(r"[,，]", value) if t.strip()] or None
+
+            if key == "done":
+                if value not in (0, 1):
+                    raise ValueError("done 应为 0 或 1")
+                value = int(value)
+            elif key == "importance" and value is not None:
+                if not isinstance(value, (int, float)) or isinstance(value, bool):
+                    raise ValueError("importance 应为数值")
+            elif key in ("tags", "rrules") and value is not None:
+                if not isinstance(value, list) or not all(isinstance(v, str) for v in value):
+                    raise ValueError(f"{key} 应为字符串列表")
+
+            if key in self.in_ner_extract:
+                if value is None:
+                    ner_unset.append(key)
+                else:
+                    ner_set[key] = value
+            elif key in self.patchable:
+                columns[key] = value
+            elif key in self.in_outter:
+                raise ValueError(f"字段 {key} 不可修改")
+            else:
+                raise ValueError(f"未知字段: {key}")
+        return columns, ner_set, ner_unset
+
 # # ✅ 单例
 Selector = DataSelect()
 # if __name__ == "__main__":
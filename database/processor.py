@@ -2,9 +2,15 @@
 from .structure import DBStructure
 from .adapter import DataAdapter
 import sqlite3, json
+import zlib
+import threading
+import time
 from datetime import datetime
 from scripts.logger import logger
-from scripts.path_control import PM
+from scripts.settings import settings
+from scripts.progress import Progress
+from scripts.metrics import DB_SECONDS, DB_FAILURES
+from scripts.tracing import Tracer, span, current_trace
 
 class ProcessDB:
     _instance = None
@@ -18,10 +24,14 @@ class ProcessDB:
         if getattr(self, "_initialized", False):
             return
 
-        db_path = PM.get_env("EVENTS_DBNEW_PATH")
-        self.db = sqlite3.connect(db_path, check_same_thread=False)
+        db_path = settings.events_db_path
+        # API 与摄取 worker 可能是不同进程：WAL 允许读写并发，写锁冲突时等待而不是立即报错
+        self.db = sqlite3.connect(db_path, check_same_thread=False, timeout=30)
+        self.db.execute("PRAGMA journal_mode=WAL")
         self.db.row_factory = self._dict_factory
         self.cursor = self.db.cursor()
+        # 连接与游标在监控线程和 API 之间共享，执行+取结果需要串行
+        self.lock = threading.RLock()
 
         # 初始化结构
         self.structure = DBStructure("""
@@ -35,15 +45,200 @@ class ProcessDB:
                 updated_at TEXT,
                 done INTEGER,
                 ner_extract TEXT,
-                schema_version INTEGER
+                schema_version INTEGER,
+                provisional INTEGER,
+                asr_tier TEXT,
+                starts_at TEXT,
+                ends_at TEXT
             )
         """)
         self.cursor.execute(self.structure.create_table_sql)
         self.structure.ensure_schema(self.cursor)
+        # 规范化后的起止时刻（app.date_norm），按时间范围查询与排序走索引；
+        # 空字符串表示文本中没有日期，NULL 表示尚未计算（加列之前的旧事件）
+        self.cursor.execute("CREATE INDEX IF NOT EXISTS idx_events_starts_at ON events(starts_at)")
+        self.cursor.execute("CREATE INDEX IF NOT EXISTS idx_events_ends_at ON events(ends_at)")
+        # OCR 原始结果（压缩后的框/文字/分数），随事件删除
+        self.cursor.execute("""
+            CREATE TABLE IF NOT EXISTS ocr_results (
+                event_id INTEGER PRIMARY KEY,
+                line_count INTEGER,
+                data BLOB,
+                created_at TEXT
+            )
+        """)
+        # 抽取文本（ASR 转写 / OCR 文本 / 上传的文本），zlib 压缩，随事件删除
+        self.cursor.execute("""
+            CREATE TABLE IF NOT EXISTS transcripts (
+                event_id INTEGER PRIMARY KEY,
+                source TEXT,
+                chars INTEGER,
+                data BLOB,
+                created_at TEXT,
+                updated_at TEXT
+            )
+        """)
+        # 归档：超过保留期的原件移入压缩包后，按原路径查到所在的包
+        self.cursor.execute("""
+            CREATE TABLE IF NOT EXISTS archived_files (
+                ref TEXT PRIMARY KEY,
+                pack TEXT,
+                member TEXT,
+                size INTEGER,
+                archived_at TEXT
+            )
+        """)
+        # 标签索引：events.tags（JSON 数组）由触发器展开到 event_tags，按标签筛选走主键索引
+        self._ensure_tag_index()
+        # 周期规则：ner_extract.rrules 由触发器展开到 recurrences，app.recurrence 把规则展开为 occurrences
+        self._ensure_recurrence_index()
+        # 变更序列：事件的新增 / 修改 / 删除由触发器记入 event_changes，客户端按游标增量同步
+        self._ensure_change_feed()
+        # 文件认领：多个摄取进程监控同一目录时，每个文件只由一个进程处理
+        self.cursor.execute("""
+            CREATE TABLE IF NOT EXISTS file_claims (
+                file TEXT PRIMARY KEY,
+                worker TEXT,
+                status TEXT,
+                claimed_at REAL,
+                finished_at REAL,
+                attempts INTEGER NOT NULL DEFAULT 0
+            )
+        """)
+        self.cursor.execute("PRAGMA table_info(file_claims)")
+        if "attempts" not in {row["name"] for row in self.cursor.fetchall()}:
+            # 旧库：已有的认领记为已尝试一次
+            self.cursor.execute("ALTER TABLE file_claims ADD COLUMN attempts INTEGER NOT NULL DEFAULT 1")
         self.db.commit()
 
         self._initialized = True
 
+    # 只展开 JSON 数组中的字符串元素；tags 不是合法数组时视为无标签。
+    # 触发器中 event 为 NEW；回填时 event 为 events，source 为 "events," 以遍历整表
+    _TAG_ROWS = """
+        SELECT {event}.event_id, value FROM {source} json_each(
+            CASE WHEN json_valid({event}.tags) AND json_type({event}.tags) = 'array' THEN {event}.tags ELSE '[]' END
+        ) WHERE type = 'text'
+    """
+
+    def _ensure_tag_index(self):
+        self.cursor.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name='event_tags'")
+        exists = self.cursor.fetchone() is not None
+        self.db.executescript(f"""
+            CREATE TABLE IF NOT EXISTS event_tags (
+                tag TEXT NOT NULL,
+                event_id INTEGER NOT NULL,
+                PRIMARY KEY (tag, event_id)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS idx_event_tags_event ON event_tags(event_id);
+
+            CREATE TRIGGER IF NOT EXISTS trg_events_tags_insert AFTER INSERT ON events BEGIN
+                INSERT OR IGNORE INTO event_tags (event_id, tag) {self._TAG_ROWS.format(event="NEW", source="")};
+            END;
+            CREATE TRIGGER IF NOT EXISTS trg_events_tags_update AFTER UPDATE OF tags ON events BEGIN
+                DELETE FROM event_tags WHERE event_id = OLD.event_id;
+                INSERT OR IGNORE INTO event_tags (event_id, tag) {self._TAG_ROWS.format(event="NEW", source="")};
+            END;
+            CREATE TRIGGER IF NOT EXISTS trg_events_tags_delete AFTER DELETE ON events BEGIN
+                DELETE FROM event_tags WHERE event_id = OLD.event_id;
+            END;
+        """)
+        if not exists:
+            # 首次建表时补齐已有事件的标签
+            self.cursor.execute(
+                f"INSERT OR IGNORE INTO event_tags (event_id, tag) {self._TAG_ROWS.format(event='events', source='events,')}"
+            )
+
+    # ner_extract 不是合法 JSON、或 rrules 不是数组时视为没有周期规则（占位符同 _TAG_ROWS）
+    _RRULE_ROWS = """
+        SELECT {event}.event_id, value FROM {source} json_each(COALESCE(CASE WHEN json_valid({event}.ner_extract) THEN
+            CASE WHEN json_type({event}.ner_extract, '$.rrules') = 'array'
+                 THEN json_extract({event}.ner_extract, '$.rrules') END
+        END, '[]')) WHERE type = 'text'
+    """
+
+    def _ensure_recurrence_index(self):
+        self.cursor.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name='recurrences'")
+        exists = self.cursor.fetchone() is not None
+        self.db.executescript(f"""
+            CREATE TABLE IF NOT EXISTS recurrences (
+                event_id INTEGER NOT NULL,
+                rule TEXT NOT NULL,
+                dtstart TEXT,
+                expanded_until TEXT,
+                PRIMARY KEY (event_id, rule)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS idx_recurrences_expanded ON recurrences(expanded_until);
+
+            CREATE TABLE IF NOT EXISTS occurrences (
+                starts_at TEXT NOT NULL,
+                event_id INTEGER NOT NULL,
+                rule TEXT NOT NULL,
+                PRIMARY KEY (starts_at, event_id, rule)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS idx_occurrences_event ON occurrences(event_id);
+
+            CREATE TRIGGER IF NOT EXISTS trg_events_rrules_insert AFTER INSERT ON events BEGIN
+                INSERT OR IGNORE INTO recurrences (event_id, rule) {self._RRULE_ROWS.format(event="NEW", source="")};
+            END;
+            CREATE TRIGGER IF NOT EXISTS trg_events_rrules_update AFTER UPDATE OF ner_extract ON events
+            WHEN OLD.ner_extract IS NOT NEW.ner_extract BEGIN
+                DELETE FROM occurrences WHERE event_id = OLD.event_id;
+                DELETE FROM recurrences WHERE event_id = OLD.event_id;
+                INSERT OR IGNORE INTO recurrences (event_id, rule) {self._RRULE_ROWS.format(event="NEW", source="")};
+            END;
+            -- 开始时刻即规则的 DTSTART：单独修改 starts_at 时同样重新展开
+            CREATE TRIGGER IF NOT EXISTS trg_events_starts_update AFTER UPDATE OF starts_at ON events
+            WHEN OLD.starts_at IS NOT NEW.starts_at BEGIN
+                DELETE FROM occurrences WHERE event_id = OLD.event_id;
+                UPDATE recurrences SET dtstart = NULL, expanded_until = NULL WHERE event_id = OLD.event_id;
+            END;
+            CREATE TRIGGER IF NOT EXISTS trg_events_rrules_delete AFTER DELETE ON events BEGIN
+                DELETE FROM occurrences WHERE event_id = OLD.event_id;
+                DELETE FROM recurrences WHERE event_id = OLD.event_id;
+            END;
+        """)
+        if not exists:
+            # 首次建表时补齐已有事件的规则
+            self.cursor.execute(
+                f"INSERT OR IGNORE INTO recurrences (event_id, rule) {self._RRULE_ROWS.format(event='events', source='events,')}"
+            )
+
+    # 每个事件只保留最近一次变更：先删旧记录再插入，seq 由 AUTOINCREMENT 保证单调递增、不复用
+    _CHANGE_ROW = """
+        DELETE FROM event_changes WHERE event_id = {event}.event_id;
+        INSERT INTO event_changes (event_id, deleted, changed_at)
+        VALUES ({event}.event_id, {deleted}, strftime('%Y-%m-%d %H:%M:%S', 'now', 'localtime'));
+    """
+
+    def _ensure_change_feed(self):
+        self.cursor.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name='event_changes'")
+        exists = self.cursor.fetchone() is not None
+        self.db.executescript(f"""
+            CREATE TABLE IF NOT EXISTS event_changes (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                event_id INTEGER NOT NULL UNIQUE,
+                deleted INTEGER NOT NULL DEFAULT 0,
+                changed_at TEXT
+            );
+
+            CREATE TRIGGER IF NOT EXISTS trg_events_changes_insert AFTER INSERT ON events BEGIN
+                {self._CHANGE_ROW.format(event="NEW", deleted=0)}
+            END;
+            CREATE TRIGGER IF NOT EXISTS trg_events_changes_update AFTER UPDATE ON events BEGIN
+                {self._CHANGE_ROW.format(event="NEW", deleted=0)}
+            END;
+            CREATE TRIGGER IF NOT EXISTS trg_events_changes_delete AFTER DELETE ON events BEGIN
+                {self._CHANGE_ROW.format(event="OLD", deleted=1)}
+            END;
+        """)
+        if not exists:
+            # 首次建表时按 event_id 顺序登记已有事件，since=0 即可取得全部
+            self.cursor.execute(
+                "INSERT INTO event_changes (event_id, deleted, changed_at) "
+                "SELECT event_id, 0, COALESCE(updated_at, created_at) FROM events ORDER BY event_id"
+            )
+
     @staticmethod
     def _dict_factory(cursor, row):
         d = {col[0]: row[idx] for idx, col in enumerate(cursor.description)}
@@ -60,8 +255,9 @@ class ProcessDB:
             False — 不存在或查询失败
         """
         try:
-            self.cursor.execute("SELECT 1 FROM events WHERE event_id = ? LIMIT 1", (event_id,))
-            result = self.cursor.fetchone()
+            with self.lock:
+                self.cursor.execute("SELECT 1 FROM events WHERE event_id = ? LIMIT 1", (event_id,))
+                result = self.cursor.fetchone()
             return result is not None
 
         except sqlite3.Error as e:
@@ -74,52 +270,618 @@ class ProcessDB:
             keys = ",".join(row.keys())
             placeholders = ",".join("?" * len(row))
             sql = f"INSERT INTO events ({keys}) VALUES ({placeholders})"
-            self.cursor.execute(sql, list(row.values()))
-            self.db.commit()
-            logger.info(f"Event created with ID: {self.cursor.lastrowid}")
-            return self.cursor.lastrowid
+            with self.lock, DB_SECONDS.time(op="create"), span("db.create_event"):
+                self.cursor.execute(sql, list(row.values()))
+                self.db.commit()
+                event_id = self.cursor.lastrowid
+            if current_trace():
+                Tracer.link_event(current_trace(), event_id)
+            logger.info(f"Event created with ID: {event_id}")
+            Progress.publish("event", {"action": "created", "event_id": event_id})
+            return event_id
         except Exception as e:
+            DB_FAILURES.inc(op="create")
             logger.error(f"Error creating event: {e}")
             return -1
 
     def update_event(self, event_id: int, data: dict) -> bool:
-        if not self.exciting(event_id):
-            return False
+        """整体修改给出的字段；updated_at 与 patch_event 同样严格递增，事件不存在时返回 False"""
+        row = DataAdapter.to_db(data, {})
+        now = row.pop("updated_at")
+        notice = {"action": "updated", "event_id": event_id, "fields": list(data.keys())}
         try:
-            row = DataAdapter.to_db(data, {})
-            set_clause = ", ".join([f"{k}=?" for k in row.keys()])
-            sql = f"UPDATE events SET {set_clause} WHERE event_id=?"
-            self.cursor.execute(sql, list(row.values()) + [event_id])
-            self.db.commit()
-            logger.info(f"Event updated with ID: {event_id}, data: {data}")
-            return True
+            if "done" in data:
+                notice["done"] = int(data["done"])
+            assignments = [f"{k}=?" for k in row.keys()] + [self._BUMP_UPDATED_AT]
+            sql = f"UPDATE events SET {', '.join(assignments)} WHERE event_id=?"
+            with self.lock, DB_SECONDS.time(op="update"):
+                self.cursor.execute(sql, list(row.values()) + [now, now, event_id])
+                if self.cursor.rowcount == 0:
+                    self.db.rollback()
+                    return False
+                self.db.commit()
         except Exception as e:
+            self.db.rollback()
+            DB_FAILURES.inc(op="update")
             logger.error(f"Error updating event with ID {event_id}: {e}")
             return False
+        logger.info(f"Event updated with ID: {event_id}, fields: {list(data.keys())}")
+        logger.debug("Event %s update data: %s", event_id, data)
+        Progress.publish("event", notice)
+        return True
+
+    # updated_at 严格递增：同一秒内的连续修改顺延一秒，参数为两次当前时间
+    _BUMP_UPDATED_AT = "updated_at = COALESCE(CASE WHEN updated_at >= ? THEN datetime(updated_at, '+1 second') END, ?)"
+
+    def patch_event(self, event_id: int, columns: dict, ner_set: dict = None, ner_unset: list = None,
+                    expected_updated_at: str = None) -> tuple:
+        """
+        字段级修改，一条 UPDATE ... RETURNING 完成：ner_extract 在 SQLite 内用 json_set / json_remove
+        只改动涉及的键，不再读出整个对象重写；外部字段直接赋值。
+        expected_updated_at 不为 None 时作为乐观锁版本，与当前 updated_at 不一致则不修改。
+        updated_at 保证严格递增（同一秒内的连续修改顺延一秒），版本比较不会因秒级精度失效。
+
+        返回 (状态, 数据)：
+            ("ok", 修改后的事件) / ("conflict", 当前 updated_at) / ("missing", None)
+            ("unsupported", None) — 旧版本（schema_version != 2）事件没有 ner_extract
+            ("error", None)
+        """
+        ner_set, ner_unset = ner_set or {}, ner_unset or []
+        assignments, params = [], []
+        for key, value in columns.items():
+            assignments.append(f"{key}=?")
+            params.append(json.dumps(value, ensure_ascii=False) if isinstance(value, (list, dict)) else value)
+        if ner_set or ner_unset:
+            expr = "CASE WHEN json_valid(ner_extract) THEN ner_extract ELSE '{}' END"
+            if ner_set:
+                expr = f"json_set({expr}, {', '.join(['?, json(?)'] * len(ner_set))})"
+                for key, value in ner_set.items():
+                    params += [f"$.{key}", json.dumps(value, ensure_ascii=False)]
+            if ner_unset:
+                expr = f"json_remove({expr}, {', '.join(['?'] * len(ner_unset))})"
+                params += [f"$.{key}" for key in ner_unset]
+            assignments.append(f"ner_extract = {expr}")
+        now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        assignments.append(self._BUMP_UPDATED_AT)
+        params += [now, now]
+
+        conditions, cond_params = ["event_id=?"], [event_id]
+        if expected_updated_at is not None:
+            conditions.append("updated_at IS ?")
+            cond_params.append(expected_updated_at)
+        if ner_set or ner_unset:
+            conditions.append("schema_version = 2")
+        sql = f"UPDATE events SET {', '.join(assignments)} WHERE {' AND '.join(conditions)} RETURNING *"
+        try:
+            with self.lock, DB_SECONDS.time(op="patch"):
+                self.cursor.execute(sql, params + cond_params)
+                rows = self.cursor.fetchall()
+                if rows:
+                    self.db.commit()
+                else:
+                    # 未命中：区分不存在 / 版本冲突 / 旧版本事件，只在失败时多一次查询
+                    self.db.rollback()
+                    self.cursor.execute("SELECT updated_at, schema_version FROM events WHERE event_id=?", (event_id,))
+                    current = self.cursor.fetchone()
+        except sqlite3.Error as e:
+            self.db.rollback()
+            DB_FAILURES.inc(op="patch")
+            logger.error(f"[patch_event] 修改事件 {event_id} 失败: {e}")
+            return "error", None
+
+        if not rows:
+            if current is None:
+                return "missing", None
+            if expected_updated_at is not None and current["updated_at"] != expected_updated_at:
+                return "conflict", current["updated_at"]
+            return "unsupported", None
+
+        fields = list(columns) + list(ner_set) + list(ner_unset)
+        logger.info(f"Event patched with ID: {event_id}, fields: {fields}")
+        notice = {"action": "updated", "event_id": event_id, "fields": fields}
+        if "done" in columns:
+            # 取写入后的值，提交之后不再转换请求里的原始值
+            notice["done"] = rows[0]["done"]
+        Progress.publish("event", notice)
+        return "ok", DataAdapter.from_db(rows[0])
 
-    
     def delete_event(self, event_id: int) -> bool:
         if not self.exciting(event_id):
             return False
-        self.cursor.execute("DELETE FROM events WHERE event_id=?", (event_id,))
-        self.db.commit()
+        with self.lock, DB_SECONDS.time(op="delete"):
+            self.cursor.execute("DELETE FROM events WHERE event_id=?", (event_id,))
+            self.cursor.execute("DELETE FROM ocr_results WHERE event_id=?", (event_id,))
+            self.cursor.execute("DELETE FROM transcripts WHERE event_id=?", (event_id,))
+            self.db.commit()
         logger.info(f"Event deleted with ID: {event_id}")
+        Progress.publish("event", {"action": "deleted", "event_id": event_id})
         return True
 
+    # 批量操作：SET 子句与“确有变化”的条件，未变化的事件不改写、不计入结果
+    _BULK_ACTIONS = {
+        "done": ("done=1", "done IS NOT 1"),
+        "importance": ("importance=?", "importance IS NOT ?"),
+        # 追加标签，保留原有顺序并去重；tags 不是合法数组时视为空
+        "tag": (
+            "tags = (SELECT json_group_array(value) FROM ("
+            "SELECT value FROM json_each(CASE WHEN json_valid(tags) AND json_type(tags) = 'array' THEN tags ELSE '[]' END) "
+            "UNION ALL SELECT DISTINCT value FROM json_each(?) WHERE value NOT IN "
+            "(SELECT tag FROM event_tags WHERE event_tags.event_id = events.event_id)))",
+            "EXISTS (SELECT 1 FROM json_each(?) AS t WHERE t.value NOT IN "
+            "(SELECT tag FROM event_tags WHERE event_tags.event_id = events.event_id))",
+        ),
+    }
+
+    def bulk_events(self, action: str, value=None, event_ids: list = None, filters: dict = None) -> list:
+        """
+        对一组事件执行同一操作，一条集合语句 + 一次提交完成，返回实际改动的 event_id 列表，失败返回 None。
+
+        action: done / delete / tag（value 为要追加的标签列表）/ importance（value 为新的重要度）
+        event_ids: 指定事件，经 json_each 传入，不受 SQL 参数个数限制
+        filters:   done (0/1)、before / after（starts_at 范围，前开后闭）、tag；与 event_ids 同时给出时取交集
+        """
+        filters = filters or {}
+        conditions, params = [], []
+        if event_ids is not None:
+            conditions.append("event_id IN (SELECT value FROM json_each(?))")
+            params.append(json.dumps(list(event_ids)))
+        if "done" in filters:
+            conditions.append("COALESCE(done, 0) = ?")
+            params.append(int(filters["done"]))
+        if filters.get("before"):
+            conditions.append("starts_at < ? AND starts_at != ''")
+            params.append(filters["before"])
+        if filters.get("after"):
+            conditions.append("starts_at >= ?")
+            params.append(filters["after"])
+        if filters.get("tag"):
+            conditions.append("event_id IN (SELECT event_id FROM event_tags WHERE tag = ?)")
+            params.append(filters["tag"])
+        if not conditions:
+            raise ValueError("批量操作必须指定事件或筛选条件")
+
+        if action == "delete":
+            sql = f"DELETE FROM events WHERE {' AND '.join(conditions)} RETURNING event_id"
+        elif action in self._BULK_ACTIONS:
+            assignment, changed = self._BULK_ACTIONS[action]
+            now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            if action == "tag":
+                value = json.dumps(list(value), ensure_ascii=False)
+            # 参数顺序与 SQL 中出现顺序一致：SET 子句、updated_at、WHERE 条件、变化条件
+            params = ([value] if "?" in assignment else []) + [now, now] + params + ([value] if "?" in changed else [])
+            conditions.append(changed)
+            sql = (f"UPDATE events SET {assignment}, {self._BUMP_UPDATED_AT} "
+                   f"WHERE {' AND '.join(conditions)} RETURNING event_id")
+        else:
+            raise ValueError(f"不支持的批量操作: {action}")
+
+        try:
+            with self.lock, DB_SECONDS.time(op=f"bulk_{action}"):
+                self.cursor.execute(sql, params)
+                ids = sorted(row["event_id"] for row in self.cursor.fetchall())
+                if action == "delete" and ids:
+                    # 与 delete_event 相同，附属数据在同一事务内删除（标签 / 周期规则由触发器清理）
+                    for table in ("ocr_results", "transcripts"):
+                        self.cursor.execute(
+                            f"DELETE FROM {table} WHERE event_id IN (SELECT value FROM json_each(?))", (json.dumps(ids),)
+                        )
+                self.db.commit()
+        except sqlite3.Error as e:
+            self.db.rollback()
+            DB_FAILURES.inc(op=f"bulk_{action}")
+            logger.error(f"[bulk_events] 批量 {action} 失败: {e}")
+            return None
+
+        logger.info(f"Events bulk {action}: {len(ids)} affected")
+        if ids:
+            # 一条汇总通知，而不是每个事件一条（消息队列每条都要落盘）
+            notice = {"action": "bulk", "op": action, "event_ids": ids}
+            if action == "done":
+                notice["done"] = 1
+            Progress.publish("event", notice)
+        return ids
+
+    def search_changes(self, since: int, limit: int = 500) -> list:
+        """
+        seq 大于 since 的变更（经 event_changes 主键范围扫描），按 seq 升序，一条语句同时取出事件当前内容。
+        返回 [{seq, event_id, deleted, changed_at, event}]，已删除的事件 event 为 None
+        """
+        with self.lock, DB_SECONDS.time(op="search_changes"):
+            self.cursor.execute(
+                "SELECT c.seq AS change_seq, c.event_id AS change_event_id, c.deleted AS change_deleted, "
+                "c.changed_at AS change_changed_at, e.* FROM event_changes c "
+                "LEFT JOIN events e ON e.event_id = c.event_id WHERE c.seq > ? ORDER BY c.seq LIMIT ?",
+                (since, limit),
+            )
+            rows = self.cursor.fetchall()
+        changes = []
+        for row in rows:
+            change = {
+                "seq": row.pop("change_seq"),
+                "event_id": row.pop("change_event_id"),
+                "deleted": bool(row.pop("change_deleted")),
+                "changed_at": row.pop("change_changed_at"),
+            }
+            change["event"] = DataAdapter.from_db(row) if row["event_id"] is not None else None
+            changes.append(change)
+        return changes
+
+    def change_seq(self) -> int:
+        """当前最新的变更序号，没有变更时为 0"""
+        with self.lock, DB_SECONDS.time(op="change_seq"):
+            self.cursor.execute("SELECT COALESCE(MAX(seq), 0) AS seq FROM event_changes")
+            return self.cursor.fetchone()["seq"]
+
     def read_event(self, event_id: int) -> dict:
         if not self.exciting(event_id):
             return False
-        self.cursor.execute("SELECT * FROM events WHERE event_id=?", (event_id,))
-        row = self.cursor.fetchone()
+        with self.lock, DB_SECONDS.time(op="read"):
+            self.cursor.execute("SELECT * FROM events WHERE event_id=?", (event_id,))
+            row = self.cursor.fetchone()
         return DataAdapter.from_db(row)
 
     def search_events_all(self) -> list:
-        self.cursor.execute("SELECT * FROM events")
-        rows = self.cursor.fetchall()
+        with self.lock, DB_SECONDS.time(op="search_all"):
+            self.cursor.execute("SELECT * FROM events")
+            rows = self.cursor.fetchall()
         return [DataAdapter.from_db(r) for r in rows]
     
+    def search_events_provisional(self) -> list:
+        """仍为临时转写、等待精确转写的事件"""
+        with self.lock, DB_SECONDS.time(op="search_provisional"):
+            self.cursor.execute("SELECT event_id, created_at, file_original FROM events WHERE provisional=1")
+            rows = self.cursor.fetchall()
+        return rows
+
+    def search_events_by_tag(self, tag: str) -> list:
+        """带有某个标签的事件（经 event_tags 主键索引）"""
+        with self.lock, DB_SECONDS.time(op="search_tag"):
+            self.cursor.execute(
+                "SELECT events.* FROM event_tags JOIN events USING (event_id) WHERE event_tags.tag=? "
+                "ORDER BY events.event_id",
+                (tag,),
+            )
+            rows = self.cursor.fetchall()
+        return [DataAdapter.from_db(r) for r in rows]
+
+    def tag_counts(self) -> list:
+        """[{tag, count}]，按数量降序"""
+        with self.lock, DB_SECONDS.time(op="tag_counts"):
+            self.cursor.execute("SELECT tag, COUNT(*) AS count FROM event_tags GROUP BY tag ORDER BY count DESC, tag")
+            rows = self.cursor.fetchall()
+        return rows
+
     def search_events_undo(self) -> list:
-        self.cursor.execute("SELECT * FROM events WHERE done=0")
-        rows = self.cursor.fetchall()
+        with self.lock, DB_SECONDS.time(op="search_undo"):
+            self.cursor.execute("SELECT * FROM events WHERE done=0")
+            rows = self.cursor.fetchall()
         return [DataAdapter.from_db(r) for r in rows]
 
+    # ---------------- OCR 原始结果 ----------------
+
+    def save_ocr_result(self, event_id: int, blob: bytes, line_count: int) -> bool:
+        """blob 由 app.ocr_text.pack_lines 生成"""
+        try:
+            now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            with self.lock, DB_SECONDS.time(op="ocr_save"):
+                self.cursor.execute(
+                    "INSERT OR REPLACE INTO ocr_results (event_id, line_count, data, created_at) VALUES (?, ?, ?, ?)",
+                    (event_id, line_count, blob, now),
+                )
+                self.db.commit()
+            logger.info(f"OCR raw result saved for event {event_id}: {line_count} lines, {len(blob)} bytes")
+            return True
+        except Exception as e:
+            DB_FAILURES.inc(op="ocr_save")
+            logger.error(f"Error saving OCR result for event {event_id}: {e}")
+            return False
+
+    def read_ocr_result(self, event_id: int) -> bytes:
+        """返回压缩数据（用 app.ocr_text.unpack_lines 解开），没有 OCR 结果时返回 None"""
+        with self.lock, DB_SECONDS.time(op="ocr_read"):
+            self.cursor.execute("SELECT data FROM ocr_results WHERE event_id=?", (event_id,))
+            row = self.cursor.fetchone()
+        return row["data"] if row else None
+
+    # ---------------- 抽取文本 ----------------
+
+    def save_transcript(self, event_id: int, text: str, source: str) -> bool:
+        """保存或替换事件的抽取文本，source 为 asr / ocr / text"""
+        try:
+            now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            blob = zlib.compress(text.encode("utf-8"), 6)
+            with self.lock, DB_SECONDS.time(op="transcript_save"):
+                self.cursor.execute(
+                    """
+                    INSERT INTO transcripts (event_id, source, chars, data, created_at, updated_at)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                    ON CONFLICT(event_id) DO UPDATE SET
+                        source=excluded.source, chars=excluded.chars,
+                        data=excluded.data, updated_at=excluded.updated_at
+                    """,
+                    (event_id, source, len(text), blob, now, now),
+                )
+                self.db.commit()
+            logger.info(f"Transcript saved for event {event_id}: {len(text)} chars, {len(blob)} bytes")
+            return True
+        except Exception as e:
+            DB_FAILURES.inc(op="transcript_save")
+            logger.error(f"Error saving transcript for event {event_id}: {e}")
+            return False
+
+    def read_transcript(self, event_id: int) -> dict:
+        """返回 {event_id, source, chars, text, created_at, updated_at}，没有记录时返回 None"""
+        with self.lock, DB_SECONDS.time(op="transcript_read"):
+            self.cursor.execute("SELECT * FROM transcripts WHERE event_id=?", (event_id,))
+            row = self.cursor.fetchone()
+        if not row:
+            return None
+        row["text"] = zlib.decompress(row.pop("data")).decode("utf-8")
+        return row
+
+    # ---------------- 周期 / 日历 ----------------
+
+    def search_pending_recurrences(self, until: str, event_id: int = None, limit: int = 500) -> list:
+        """尚未展开到 until 的周期规则，附带事件的 starts_at / created_at 用于确定起点"""
+        sql = """
+            SELECT r.event_id, r.rule, r.dtstart, r.expanded_until, e.starts_at, e.created_at
+            FROM recurrences r JOIN events e USING (event_id)
+            WHERE (r.expanded_until IS NULL OR r.expanded_until < ?)
+        """
+        params = [until]
+        if event_id is not None:
+            sql += " AND r.event_id = ?"
+            params.append(event_id)
+        with self.lock, DB_SECONDS.time(op="recurrence_pending"):
+            self.cursor.execute(sql + " ORDER BY r.event_id LIMIT ?", params + [limit])
+            rows = self.cursor.fetchall()
+        return [DataAdapter.from_db(r) for r in rows]
+
+    def search_events_without_rrules(self) -> list:
+        """ner_extract 中还没有 rrules 键的事件（规范化之前创建），返回 [{event_id, recurrences}]"""
+        with self.lock, DB_SECONDS.time(op="search_without_rrules"):
+            self.cursor.execute(
+                """
+                SELECT event_id, json_extract(ner_extract, '$.recurrences') AS recurrences FROM events
+                WHERE CASE WHEN json_valid(ner_extract) THEN json_type(ner_extract, '$.rrules') IS NULL ELSE 0 END
+                """
+            )
+            rows = self.cursor.fetchall()
+        return [DataAdapter.from_db(r) for r in rows]
+
+    def set_rrules(self, event_id: int, rules: list) -> bool:
+        """只改写 ner_extract.rrules，不更新 updated_at（迁移用，不算用户修改）"""
+        try:
+            with self.lock, DB_SECONDS.time(op="set_rrules"):
+                self.cursor.execute(
+                    "UPDATE events SET ner_extract = json_set(ner_extract, '$.rrules', json(?)) WHERE event_id=?",
+                    (json.dumps(rules, ensure_ascii=False), event_id),
+                )
+                self.db.commit()
+            return True
+        except sqlite3.Error as e:
+            DB_FAILURES.inc(op="set_rrules")
+            logger.error(f"[set_rrules] 更新事件 {event_id} 的周期规则失败: {e}")
+            return False
+
+    def save_occurrences(self, event_id: int, rule: str, dtstart: str,
+                         expanded_from: str, expanded_until: str, starts: list) -> bool:
+        """
+        写入一段展开结果并推进 expanded_until，一个事务内完成。
+        expanded_from 为读取时的 expanded_until：期间规则被改写或删除（触发器已重置）时放弃写入，返回 False
+        """
+        try:
+            with self.lock, DB_SECONDS.time(op="occurrence_save"):
+                self.cursor.execute(
+                    "UPDATE recurrences SET dtstart=?, expanded_until=? "
+                    "WHERE event_id=? AND rule=? AND expanded_until IS ?",
+                    (dtstart, expanded_until, event_id, rule, expanded_from),
+                )
+                if self.cursor.rowcount != 1:
+                    self.db.rollback()
+                    return False
+                self.cursor.executemany(
+                    "INSERT OR IGNORE INTO occurrences (starts_at, event_id, rule) VALUES (?, ?, ?)",
+                    [(start, event_id, rule) for start in starts],
+                )
+                self.db.commit()
+            return True
+        except sqlite3.Error as e:
+            self.db.rollback()
+            DB_FAILURES.inc(op="occurrence_save")
+            logger.error(f"[save_occurrences] 写入事件 {event_id} 的周期展开失败: {e}")
+            return False
+
+    def search_events_between(self, start: str, end: str) -> list:
+        """
+        starts_at 落在 [start, end) 内的非周期事件，经 idx_events_starts_at 范围扫描；
+        有周期规则的事件由 occurrences 给出每次发生，这里不再重复
+        """
+        with self.lock, DB_SECONDS.time(op="search_between"):
+            self.cursor.execute(
+                "SELECT event_id, starts_at, ends_at FROM events "
+                "WHERE starts_at >= ? AND starts_at < ? "
+                "AND NOT EXISTS (SELECT 1 FROM recurrences r WHERE r.event_id = events.event_id) "
+                "ORDER BY starts_at, event_id",
+                (start, end),
+            )
+            rows = self.cursor.fetchall()
+        return rows
+
+    def search_events_unscheduled(self, limit: int = 500) -> list:
+        """尚未计算起止时刻的旧事件，返回 [{event_id, created_at, ner_extract}]"""
+        with self.lock, DB_SECONDS.time(op="search_unscheduled"):
+            self.cursor.execute(
+                "SELECT event_id, created_at, ner_extract FROM events WHERE starts_at IS NULL LIMIT ?", (limit,)
+            )
+            rows = self.cursor.fetchall()
+        return [DataAdapter.from_db(r) for r in rows]
+
+    def set_schedule(self, entries: list) -> bool:
+        """entries: [(event_id, starts_at, ends_at)]；回填用，不更新 updated_at"""
+        try:
+            with self.lock, DB_SECONDS.time(op="set_schedule"):
+                self.cursor.executemany(
+                    "UPDATE events SET starts_at=?, ends_at=? WHERE event_id=?",
+                    [(starts_at, ends_at, event_id) for event_id, starts_at, ends_at in entries],
+                )
+                self.db.commit()
+            return True
+        except sqlite3.Error as e:
+            self.db.rollback()
+            DB_FAILURES.inc(op="set_schedule")
+            logger.error(f"[set_schedule] 回填起止时刻失败: {e}")
+            return False
+
+    def search_occurrences(self, start: str, end: str) -> list:
+        """[start, end) 内的 occurrences，经 starts_at 主键范围扫描"""
+        with self.lock, DB_SECONDS.time(op="search_occurrences"):
+            self.cursor.execute(
+                "SELECT starts_at, event_id, rule FROM occurrences "
+                "WHERE starts_at >= ? AND starts_at < ? ORDER BY starts_at, event_id",
+                (start, end),
+            )
+            rows = self.cursor.fetchall()
+        return rows
+
+    def read_events(self, event_ids: list) -> dict:
+        """{event_id: 事件}，一次查询读取多个事件"""
+        ids = sorted(set(event_ids))
+        if not ids:
+            return {}
+        with self.lock, DB_SECONDS.time(op="read_many"):
+            self.cursor.execute(
+                f"SELECT * FROM events WHERE event_id IN ({','.join('?' * len(ids))})", ids
+            )
+            rows = self.cursor.fetchall()
+        return {row["event_id"]: DataAdapter.from_db(row) for row in rows}
+
+    def occurrence_horizon(self) -> str:
+        """所有周期规则都已展开到的时刻；有规则尚未展开时返回 None，没有规则时返回空字符串"""
+        with self.lock, DB_SECONDS.time(op="occurrence_horizon"):
+            self.cursor.execute(
+                "SELECT COUNT(*) AS total, COUNT(expanded_until) AS expanded, MIN(expanded_until) AS horizon "
+                "FROM recurrences"
+            )
+            row = self.cursor.fetchone()
+        if not row["total"]:
+            return ""
+        return row["horizon"] if row["total"] == row["expanded"] else None
+
+    # ---------------- 归档 ----------------
+
+    def search_archivable(self, before: str, after_id: int = 0, limit: int = 500) -> list:
+        """created_at 早于 before、已是最终转写且原件尚未归档的事件，按 event_id 分页"""
+        with self.lock, DB_SECONDS.time(op="search_archivable"):
+            self.cursor.execute(
+                """
+                SELECT event_id, file_original, file_processed FROM events
+                WHERE event_id > ? AND created_at < ? AND COALESCE(provisional, 0) = 0
+                  AND file_original IS NOT NULL
+                  AND file_original NOT IN (SELECT ref FROM archived_files)
+                ORDER BY event_id LIMIT ?
+                """,
+                (after_id, before, limit),
+            )
+            rows = self.cursor.fetchall()
+        return rows
+
+    def save_archived(self, entries: list) -> bool:
+        """entries: [(ref, pack, member, size)]，一个事务内登记"""
+        try:
+            now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            with self.lock, DB_SECONDS.time(op="archive_save"):
+                self.cursor.executemany(
+                    "INSERT OR REPLACE INTO archived_files (ref, pack, member, size, archived_at) VALUES (?, ?, ?, ?, ?)",
+                    [(ref, pack, member, size, now) for ref, pack, member, size in entries],
+                )
+                self.db.commit()
+            return True
+        except sqlite3.Error as e:
+            self.db.rollback()
+            DB_FAILURES.inc(op="archive_save")
+            logger.error(f"[save_archived] 登记归档失败: {e}")
+            return False
+
+    def find_archived(self, ref: str) -> dict:
+        """返回 {ref, pack, member, size, archived_at}，未归档时返回 None"""
+        with self.lock, DB_SECONDS.time(op="archive_read"):
+            self.cursor.execute("SELECT * FROM archived_files WHERE ref=?", (ref,))
+            row = self.cursor.fetchone()
+        return row
+
+    # ---------------- 文件认领 ----------------
+
+    def claim_file(self, file: str, worker: str, stale_after: float = None) -> bool:
+        """
+        认领一个待处理文件，成功返回 True。
+        已完成的文件不会再被认领；处理中的认领超过 stale_after 秒视为进程已退出，可被接管；
+        失败的认领在 CLAIM_RETRY_DELAY 秒后可再次认领。每次认领（含接管）计一次尝试，
+        达到 CLAIM_MAX_ATTEMPTS 次后不再认领。
+        """
+        now = time.time()
+        stale_after = settings.claim_timeout if stale_after is None else stale_after
+        try:
+            with self.lock, DB_SECONDS.time(op="claim"):
+                self.cursor.execute(
+                    """
+                    INSERT INTO file_claims (file, worker, status, claimed_at, attempts) VALUES (?, ?, 'running', ?, 1)
+                    ON CONFLICT(file) DO UPDATE SET worker=excluded.worker, claimed_at=excluded.claimed_at,
+                        status='running', finished_at=NULL, attempts=file_claims.attempts + 1
+                    WHERE file_claims.attempts < ? AND (
+                        (file_claims.status='running' AND file_claims.claimed_at < ?)
+                        OR (file_claims.status='failed' AND file_claims.finished_at < ?)
+                    )
+                    """,
+                    (file, worker, now, settings.claim_max_attempts, now - stale_after,
+                     now - settings.claim_retry_delay),
+                )
+                claimed = self.cursor.rowcount == 1
+                self.db.commit()
+            return claimed
+        except sqlite3.Error as e:
+            DB_FAILURES.inc(op="claim")
+            logger.error(f"[claim_file] 认领文件失败 {file}: {e}")
+            return False
+
+    def release_claim(self, file: str, worker: str):
+        """放弃尚未开始处理的认领（如文件未能稳定），不计入尝试次数，之后可立即再次认领"""
+        try:
+            with self.lock, DB_SECONDS.time(op="claim"):
+                self.cursor.execute(
+                    "UPDATE file_claims SET status='failed', finished_at=0, attempts=attempts - 1 "
+                    "WHERE file=? AND worker=? AND status='running'",
+                    (file, worker),
+                )
+                self.db.commit()
+        except sqlite3.Error as e:
+            DB_FAILURES.inc(op="claim")
+            logger.error(f"[release_claim] 释放认领失败 {file}: {e}")
+
+    # 周期任务与精确转写的认领（名称带“:”，如 recurrence:<周期>、retention:<周期>、refine:<event_id>）
+    # 只在所属周期 / 重试期内有用，结束超过该时长后删除；上传文件的认领一直保留，防止同名文件重复处理
+    _CLAIM_KEEP_SECONDS = 7 * 24 * 3600
+
+    def finish_claim(self, file: str, status: str) -> bool:
+        """
+        status 为 done / failed，顺带清理过期的周期任务认领。
+        返回是否已无重试机会（失败且尝试次数达到 CLAIM_MAX_ATTEMPTS），调用方据此放弃该文件
+        """
+        now = time.time()
+        try:
+            with self.lock, DB_SECONDS.time(op="claim"):
+                self.cursor.execute(
+                    "UPDATE file_claims SET status=?, finished_at=? WHERE file=? RETURNING attempts",
+                    (status, now, file),
+                )
+                row = self.cursor.fetchone()
+                self.cursor.execute(
+                    "DELETE FROM file_claims WHERE status != 'running' AND instr(file, ':') > 0 AND finished_at < ?",
+                    (now - self._CLAIM_KEEP_SECONDS,),
+                )
+                self.db.commit()
+            return status == "failed" and row is not None and row["attempts"] >= settings.claim_max_attempts
+        except sqlite3.Error as e:
+            DB_FAILURES.inc(op="claim")
+            logger.error(f"[finish_claim] 更新认领状态失败 {file}: {e}")
+            return False
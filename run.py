@@ -1,100 +1,104 @@
-from pathlib import Path
+"""
+启动入口：
+    python run.py                          # all：API + 文件监控，单进程（默认）
+    python run.py --mode api --workers 4   # 仅 API，可多 worker，不加载模型
+    python run.py --mode worker            # 仅摄取：监控上传目录并运行 ASR/OCR/NER，可启动多个
+
+api / worker 分开运行时，进度经 PROGRESS_DB_PATH 的消息表转发给 API 进程，
+文件通过数据库中的认领记录保证只被一个 worker 处理。
+"""
+import argparse
+import os
 import threading
+from functools import partial
 import uvicorn
-from api.mainapi import create_api_app
 from app.detect_folder import start_watch
-from app.ASR import ASEProcessor
-from app.OCR import OCRProcessor
-from app.NER_1_re import NERProcessor
-from scripts.path_control import PM
+from app.pipeline import claim_new_file, release_new_file, handle_new_file, load_processors, resume_refinements
+from app.retention import start_retention
+from app.recurrence import start_recurrence
+from scripts.settings import settings
+from scripts.progress import Progress
 from scripts.logger import logger
-from scripts.Tools import r
-from database.processor import ProcessDB
-
-# 初始化处理器实例
-asr_processor = ASEProcessor()
-ocr_processor = OCRProcessor()
-ner_processor = NERProcessor()
-
-
-def handle_new_file(file_path: str):
-    """处理监控到的新文件，根据类型分发到ASR或OCR处理"""
-    try:
-        file_ext = file_path.lower().split('.')[-1]
-        
-        # 定义支持的音频和图像文件格式
-        audio_extensions = {'wav', 'mp3', 'ogg', 'flac', 'm4a'}
-        image_extensions = {'jpg', 'jpeg', 'png', 'bmp', 'gif'}
-        text_extensions = {'txt'}
-        
-        # if file_ext in text_extensions:
-        #     logger.info(f"检测到文本文件，跳过处理: {file_path}")
-        #     return
-        
-        if file_ext in audio_extensions:
-            logger.info(f"检测到音频文件，开始ASR处理: {file_path}")
-            result = asr_processor.process_audio(file_path)
-            logger.info(f"ASR处理完成，结果保存至: {result['file_processed']}")
-            
-        elif file_ext in image_extensions:
-            logger.info(f"检测到图像文件，开始OCR处理: {file_path}")
-            result = ocr_processor.process_image(file_path)
-            logger.info(f"OCR处理完成，结果保存至: {result['file_processed']}")
-
-        elif file_ext in text_extensions:
-            logger.info(f"检测到文本文件，开始NER处理: {file_path}")
-            result = {'file_processed':file_path, 'file_original':file_path }
 
-        else:
-            logger.warning(f"不支持的文件类型: {file_path}")
-            raise
-
-        # 文本处理, 合并dict
-        res_dict = ner_processor.process_text(result['file_processed']) | result
-        
-        # 数据存储
-        c_db = ProcessDB()
-        c_db.create_event(res_dict)
-
-    except Exception as e:
-        logger.exception(f"文件处理失败 {file_path}: {str(e)}")
-        raise 
 
 def start_monitoring():
     """启动文件夹监控线程"""
-    watch_dir = PM.get_env("UPLOAD_DIR_PATH")
+    watch_dir = settings.upload_dir
+    # 模型在监控线程中加载，API 不必等待；关闭预加载时在首个文件到达时加载
+    if settings.preload_models:
+        try:
+            load_processors()
+        except Exception as e:
+            logger.exception(f"模型预加载失败，将在首个文件到达时重试: {str(e)}")
+    try:
+        resume_refinements()
+    except Exception as e:
+        logger.exception(f"恢复精确转写任务失败: {str(e)}")
+    try:
+        start_retention()
+    except Exception as e:
+        logger.exception(f"归档任务启动失败: {str(e)}")
+    try:
+        start_recurrence()
+    except Exception as e:
+        logger.exception(f"周期事件展开任务启动失败: {str(e)}")
     try:
         start_watch(
             folder_to_watch=watch_dir,
-            user_callback=handle_new_file,
-            stable_seconds=10.0  # 等待文件稳定的时间
+            user_callback=partial(handle_new_file, claimed=True),
+            claim=claim_new_file,  # 先认领再等待稳定，只有认领成功的 worker 推送进度
+            release=release_new_file,
+            stable_seconds=10.0,  # 等待文件稳定的时间
+            rescan_interval=settings.claim_retry_delay,  # 失败的文件按重试间隔重新提交
         )
     except Exception as e:
         logger.exception(f"文件夹监控启动失败: {str(e)}")
 
+
+def parse_args():
+    p = argparse.ArgumentParser(description="HGRecorder")
+    p.add_argument("--mode", choices=["all", "api", "worker"], default="all")
+    p.add_argument("--host", default="0.0.0.0")  # 允许所有网络接口访问
+    p.add_argument("--port", type=int, default=8000)
+    p.add_argument("--workers", type=int, default=1, help="API 进程数（all / api 模式）")
+    return p.parse_args()
+
+
 def main():
-    # 启动文件夹监控（后台线程）
-    monitor_thread = threading.Thread(target=start_monitoring, daemon=True)
-    monitor_thread.start()
-    logger.info("文件监控线程已启动")
+    args = parse_args()
+
+    # 不止一个进程时，进度改走共享消息表；环境变量让 uvicorn 派生的 worker 也能读到
+    if args.mode != "all" or args.workers > 1:
+        os.environ["PROGRESS_FEED"] = "1"
+        Progress.attach_feed()
+
+    if args.mode == "worker":
+        logger.info(f"摄取 worker 启动 (pid={os.getpid()})")
+        start_monitoring()
+        return
+
+    if args.mode == "all":
+        # 启动文件夹监控（后台线程）
+        monitor_thread = threading.Thread(target=start_monitoring, daemon=True)
+        monitor_thread.start()
+        logger.info("文件监控线程已启动")
 
     # 启动API服务
-    app = create_api_app()
-    logger.info("准备启动API服务...")
-    
+    logger.info(f"准备启动API服务... (mode={args.mode}, workers={args.workers})")
     uvicorn.run(
-        app,
-        host="0.0.0.0",  # 允许所有网络接口访问
-        port=8000,       # 端口号，可根据需要修改
+        "api.mainapi:create_api_app",
+        factory=True,
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
         log_level="info"
     )
 
 
-
 if __name__ == "__main__":
     try:
         main()
     except KeyboardInterrupt:
         logger.info("用户中断，程序退出")
     except Exception as e:
-        logger.exception(f"程序运行出错: {str(e)}")
\ No newline at end of file
+        logger.exception(f"程序运行出错: {str(e)}")
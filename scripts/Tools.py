@@ -1,19 +1,32 @@
 from .logger import logger
-from .path_control import PM
+from .settings import settings
+from .unique_string_generate import unique_name
+from .storage import sharded_path
 
 def w(file, text):
     try:
-        with open(file, 'w', encoding=PM.get_env("ENCODING")) as f:
+        with open(file, 'w', encoding=settings.encoding) as f:
             f.write(text)
     except Exception as e:
         logger.error(f"Error writing to {file}: {e}\n lose content {text}")
 
 def r(file):
     try:
-        with open(file, 'r', encoding=PM.get_env("ENCODING")) as f:
+        with open(file, 'r', encoding=settings.encoding) as f:
             res = f.read()
             return res
     except Exception as e:
         logger.error(f"Error read to {file}: {e}")
 
-    return ""
\ No newline at end of file
+    return ""
+
+def save_extract(prefix, text):
+    """
+    抽取文本的副本按日期分片写入 EXTRACTED_DIR_PATH（WRITE_EXTRACT_FILES=1 时），返回文件路径；
+    关闭时返回 None。文本本身随事件存入数据库，流水线不再依赖这些文件。
+    """
+    if not settings.write_extract_files:
+        return None
+    to_file = str(sharded_path(settings.extracted_dir, f"{prefix}_result_{unique_name() + '.txt'}"))
+    w(to_file, text)
+    return to_file
@@ -0,0 +1,64 @@
+import os
+import threading
+from dataclasses import dataclass, asdict
+from scripts.settings import settings
+from scripts.metrics import CPU_THREADS
+from scripts.logger import logger
+
+# OpenMP / BLAS 类库在首次导入时读取这些变量，之后修改无效
+_THREAD_ENV_VARS = (
+    "OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS",
+    "NUMEXPR_NUM_THREADS", "VECLIB_MAXIMUM_THREADS",
+)
+
+
+@dataclass(frozen=True)
+class ThreadBudget:
+    """单个摄取进程内各引擎的线程数"""
+    total: int      # 本进程可用的核数
+    asr: int        # torch intra-op（Whisper）
+    ocr: int        # Paddle 数学库线程（PaddleOCR cpu_threads）
+    tag: int        # YOLO 打标签线程（与 OCR 并行，默认占 OCR 份额的一半）
+    interop: int    # torch inter-op
+    blas: int       # 其余 OpenMP/BLAS 使用者（numpy、opencv 等）
+
+
+def plan() -> ThreadBudget:
+    """
+    按配置划分线程：CPU_THREADS（0 为全部核）先按 INGEST_WORKERS 均分到各进程，
+    进程内 ASR 与 OCR 可能同时运行，未单独指定时各占一半。
+    """
+    machine = settings.cpu_threads or os.cpu_count() or 1
+    total = max(1, machine // max(1, settings.ingest_workers))
+    half = max(1, total // 2)
+    return ThreadBudget(
+        total=total,
+        asr=settings.asr_threads or half,
+        ocr=settings.ocr_threads or half,
+        tag=settings.tag_threads or max(1, half // 2),
+        interop=1,
+        blas=1,
+    )
+
+
+_applied = None
+_applied_lock = threading.Lock()
+
+
+def apply_thread_budget() -> ThreadBudget:
+    """
+    在导入 torch / paddle / numpy 之前调用（重复调用无副作用）。
+    已在环境中显式设置的线程变量保持不变。
+    """
+    global _applied
+    with _applied_lock:
+        if _applied is not None:
+            return _applied
+        budget = plan()
+        for name in _THREAD_ENV_VARS:
+            os.environ.setdefault(name, str(budget.blas))
+        for pool, value in asdict(budget).items():
+            CPU_THREADS.set(value, pool=pool)
+        logger.info(f"[CPU] 线程预算: {asdict(budget)}")
+        _applied = budget
+        return budget
@@ -1,12 +1,9 @@
 from datetime import datetime
 import random
 from pathlib import Path
-from dotenv import load_dotenv
 from typing import Union
 import os
 
-load_dotenv()
-
 def check_dir(dir_path: Union[str, Path]) -> str:
     """
     Ensure a directory exists, creating it if necessary.
@@ -1,33 +1,189 @@
+import atexit
+import copy
+import json
 import logging
-from .path_control import PM 
+import logging.handlers
+import os
+import queue
+import threading
+from datetime import datetime, timedelta
+from .settings import settings
 from scripts.get_date_formate import today
 
+
+class DailySizeRotatingHandler(logging.FileHandler):
+    """
+    按日期和进程号命名的日志文件（YYYY-MM-DD.<pid>.log），跨过零点自动换新文件；
+    单个文件超过 max_bytes 时改名为 YYYY-MM-DD.<pid>.N.log 并重新开始。
+    多个进程（--workers、api / worker 分开部署）共用日志目录时各写各的文件，轮转互不干扰。
+    只在后台写线程中使用，不需要额外加锁。
+    """
+
+    def __init__(self, log_dir: str, max_bytes: int = 0, encoding: str = None):
+        self.log_dir = log_dir
+        self.max_bytes = max_bytes
+        self.pid = os.getpid()
+        self.day = today()
+        self.next_midnight = self._next_midnight()
+        super().__init__(self._path(self.day), encoding=encoding, delay=True)
+
+    def _path(self, day: str, index: int = 0) -> str:
+        name = f"{day}.{self.pid}.log" if index == 0 else f"{day}.{self.pid}.{index}.log"
+        return os.path.join(self.log_dir, name)
+
+    @staticmethod
+    def _next_midnight() -> float:
+        tomorrow = datetime.now().date() + timedelta(days=1)
+        return datetime.combine(tomorrow, datetime.min.time()).timestamp()
+
+    def _rollover(self, new_day: bool):
+        if self.stream:
+            self.stream.close()
+            self.stream = None
+        if new_day:
+            self.day = today()
+            self.next_midnight = self._next_midnight()
+        else:
+            index = 1
+            while os.path.exists(self._path(self.day, index)):
+                index += 1
+            os.replace(self._path(self.day), self._path(self.day, index))
+        self.baseFilename = os.path.abspath(self._path(self.day))
+
+    def emit(self, record):
+        try:
+            if record.created >= self.next_midnight:
+                self._rollover(new_day=True)
+            elif self.max_bytes and self.stream and self.stream.tell() >= self.max_bytes:
+                self._rollover(new_day=False)
+        except OSError:
+            self.handleError(record)
+        super().emit(record)
+
+
+class JsonFormatter(logging.Formatter):
+    """一行一个 JSON 对象，便于采集工具解析"""
+
+    def format(self, record):
+        data = {
+            "ts": self.formatTime(record, "%Y-%m-%d %H:%M:%S"),
+            "level": record.levelname,
+            "logger": record.name,
+            "thread": record.threadName,
+            "where": f"{record.module}:{record.lineno}",
+            "msg": record.getMessage(),
+        }
+        if record.exc_text:
+            data["exc"] = record.exc_text
+        return json.dumps(data, ensure_ascii=False)
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    同一位置（文件+行号）的日志在 window 秒内最多放行 burst 条，
+    被抑制的条数附在下一条放行的日志后面。WARNING 以上不限流。
+    """
+
+    def __init__(self, burst: int = 20, window: float = 10.0):
+        super().__init__()
+        self.burst = burst
+        self.window = window
+        self.lock = threading.Lock()
+        self.state = {}  # (pathname, lineno) -> [窗口开始, 已放行, 已抑制]
+
+    def filter(self, record):
+        if self.burst <= 0 or record.levelno >= logging.WARNING:
+            return True
+        key = (record.pathname, record.lineno)
+        now = record.created
+        with self.lock:
+            state = self.state.get(key)
+            if state is None or now - state[0] >= self.window:
+                suppressed = state[2] if state else 0
+                self.state[key] = [now, 1, 0]
+            elif state[1] < self.burst:
+                state[1] += 1
+                suppressed = 0
+            else:
+                state[2] += 1
+                return False
+        if suppressed:
+            record.msg = f"{record.getMessage()} （此前 {self.window:g}s 内已抑制 {suppressed} 条同类日志）"
+            record.args = None
+        return True
+
+
+_EXC_FORMATTER = logging.Formatter()
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """队列满时丢弃而不是阻塞业务线程"""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        """
+        默认实现会把异常堆栈拼进 msg 并清掉 exc_info / exc_text；
+        这里只合并消息参数，堆栈单独放在 exc_text，由写线程的 Formatter（文本或 JSON）决定如何输出
+        """
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = record.exc_text or _EXC_FORMATTER.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
 def get_logger(name: str = "HGRecorder") -> logging.Logger:
     logger = logging.getLogger(name)
-    logger.setLevel(logging.INFO)
+    logger.setLevel(settings.log_level.upper())
 
     # 避免重复添加 Handler
     if logger.hasHandlers():
         return logger
 
-    # 日志文件名为当前日期
-    log_file = str(PM.get_env("LOG_DIR_PATH"))+f"/{today()}.log"
-
-    # 创建文件处理器
-    file_handler = logging.FileHandler(log_file, encoding = PM.get_env("ENCODING"))
-    file_handler.setLevel(logging.INFO)
+    # 日志文件名为当前日期，由后台线程负责写入和轮转
+    file_handler = DailySizeRotatingHandler(
+        str(settings.log_dir),
+        max_bytes=settings.log_max_bytes,
+        encoding=settings.encoding,
+    )
+    file_handler.setLevel(logging.DEBUG)
 
     # 设置日志格式
-    formatter = logging.Formatter(
-        '[%(asctime)s] [%(levelname)s] %(message)s',
-        datefmt='%Y-%m-%d %H:%M:%S'
-    )
+    if settings.log_json:
+        formatter = JsonFormatter()
+    else:
+        formatter = logging.Formatter(
+            '[%(asctime)s] [%(levelname)s] %(message)s',
+            datefmt='%Y-%m-%d %H:%M:%S'
+        )
     file_handler.setFormatter(formatter)
 
-    # 添加处理器
-    logger.addHandler(file_handler)
+    # 业务线程只把记录放进内存队列
+    log_queue = queue.Queue(maxsize=settings.log_queue_size)
+    queue_handler = DroppingQueueHandler(log_queue)
+    queue_handler.addFilter(RateLimitFilter(
+        burst=settings.log_rate_burst,
+        window=settings.log_rate_window,
+    ))
+    logger.addHandler(queue_handler)
+
+    listener = logging.handlers.QueueListener(log_queue, file_handler, respect_handler_level=True)
+    listener.start()
+    # 退出时把队列里剩余的日志写完
+    atexit.register(listener.stop)
 
     return logger
 
 
-logger = get_logger()
\ No newline at end of file
+logger = get_logger()
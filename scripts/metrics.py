@@ -0,0 +1,192 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+
+
+class _Metric:
+    """指标基类：按标签值保存样本，记录时只做一次加锁的字典更新"""
+    kind = ""
+
+    def __init__(self, name: str, doc: str, labelnames=(), registry=None):
+        self.name = name
+        self.doc = doc
+        self.labelnames = tuple(labelnames)
+        self.lock = threading.Lock()
+        self.samples = {}
+        (registry or REGISTRY).register(self)
+
+    def _key(self, labels: dict) -> tuple:
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"[metrics] {self.name} 需要标签 {self.labelnames}，实际为 {tuple(labels)}")
+        return tuple(str(labels[k]) for k in self.labelnames)
+
+    def _fmt_labels(self, key: tuple, extra: dict = None) -> str:
+        pairs = list(zip(self.labelnames, key)) + list((extra or {}).items())
+        if not pairs:
+            return ""
+        body = ",".join(f'{k}="{_escape(v)}"' for k, v in pairs)
+        return "{" + body + "}"
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.doc}", f"# TYPE {self.name} {self.kind}"]
+        with self.lock:
+            items = list(self.samples.items())
+        for key, value in items:
+            lines.append(f"{self.name}{self._fmt_labels(key)} {_num(value)}")
+        return lines
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self.lock:
+            self.samples[key] = self.samples.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self.lock:
+            self.samples[key] = value
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self.lock:
+            self.samples[key] = self.samples.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+    DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+    def __init__(self, name, doc, labelnames=(), buckets=DEFAULT_BUCKETS, registry=None):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, doc, labelnames, registry)
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        idx = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            sample = self.samples.get(key)
+            if sample is None:
+                # [各桶计数(含 +Inf), 总和, 总数]
+                sample = self.samples[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            sample[0][idx] += 1
+            sample[1] += value
+            sample[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def snapshot(self, **labels) -> dict:
+        """返回某组标签的 count / sum，供基准脚本读取"""
+        with self.lock:
+            sample = self.samples.get(self._key(labels))
+            if not sample:
+                return {"count": 0, "sum": 0.0}
+            return {"count": sample[2], "sum": sample[1]}
+
+    def totals(self, label: str) -> dict:
+        """按某个标签汇总 count / sum，其余标签合并"""
+        idx = self.labelnames.index(label)
+        res = {}
+        with self.lock:
+            for key, sample in self.samples.items():
+                agg = res.setdefault(key[idx], {"count": 0, "sum": 0.0})
+                agg["count"] += sample[2]
+                agg["sum"] += sample[1]
+        return res
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.doc}", f"# TYPE {self.name} {self.kind}"]
+        with self.lock:
+            items = [(k, (list(v[0]), v[1], v[2])) for k, v in self.samples.items()]
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, c in zip(self.buckets + (float("inf"),), counts):
+                cumulative += c
+                le = "+Inf" if bound == float("inf") else _num(bound)
+                lines.append(f"{self.name}_bucket{self._fmt_labels(key, {'le': le})} {cumulative}")
+            lines.append(f"{self.name}_sum{self._fmt_labels(key)} {_num(total)}")
+            lines.append(f"{self.name}_count{self._fmt_labels(key)} {count}")
+        return lines
+
+
+class Registry:
+    """指标注册表，只在被抓取时才生成文本"""
+
+    def __init__(self):
+        self.metrics = {}
+        self.lock = threading.Lock()
+
+    def register(self, metric: _Metric):
+        with self.lock:
+            if metric.name in self.metrics:
+                raise ValueError(f"[metrics] 指标重复注册: {metric.name}")
+            self.metrics[metric.name] = metric
+
+    def render(self) -> str:
+        with self.lock:
+            metrics = list(self.metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _num(value) -> str:
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+def size_bucket(size_bytes: int) -> str:
+    """把文件大小归入少量区间，避免标签基数过大"""
+    if size_bytes < 100 * 1024:
+        return "<100KB"
+    if size_bytes < 1024 * 1024:
+        return "100KB-1MB"
+    if size_bytes < 10 * 1024 * 1024:
+        return "1MB-10MB"
+    return ">10MB"
+
+
+REGISTRY = Registry()
+
+# ---------------- 流水线指标 ----------------
+WATCHER_QUEUE_DEPTH = Gauge("hg_watcher_queue_depth", "正在等待稳定或处理中的文件数")
+WATCHER_EVENTS = Counter("hg_watcher_events_total", "监控到的文件系统事件数", ["event"])
+STABILITY_WAIT_SECONDS = Histogram("hg_stability_wait_seconds", "等待文件稳定的耗时")
+STAGE_SECONDS = Histogram(
+    "hg_stage_seconds", "各处理阶段耗时（asr/ocr/text/ner）", ["stage", "file_type", "size"]
+)
+PIPELINE_FILES = Counter("hg_pipeline_files_total", "处理完成的文件数", ["file_type", "result"])
+CPU_THREADS = Gauge("hg_cpu_threads", "CPU 线程预算（asr/ocr/interop/blas/total）", ["pool"])
+ENGINE_WAIT_SECONDS = Histogram("hg_engine_wait_seconds", "等待同类引擎空闲的耗时", ["engine"])
+TAG_BATCH_SIZE = Histogram("hg_tag_batch_size", "每批打标签的图片数", buckets=(1, 2, 4, 8, 16, 32))
+ARCHIVED_FILES = Counter("hg_archived_files_total", "保留任务归档的文件数", ["result"])
+RECURRENCE_OCCURRENCES = Counter("hg_recurrence_occurrences_total", "周期规则展开写入的发生次数")
+
+# ---------------- 数据库指标 ----------------
+DB_SECONDS = Histogram("hg_db_seconds", "数据库操作耗时", ["op"])
+DB_FAILURES = Counter("hg_db_failures_total", "数据库操作失败次数", ["op"])
+
+# ---------------- API 指标 ----------------
+HTTP_SECONDS = Histogram("hg_http_request_seconds", "API 路由耗时", ["method", "route", "status"])
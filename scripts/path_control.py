@@ -1,19 +1,24 @@
-from dotenv import load_dotenv
 import os
+from scripts.settings import settings, _SPEC
+
 
 class PathManager:
+    """
+    兼容旧接口：值来自启动时加载的 settings，
+    不再每次访问环境变量，也不再在调用时创建目录。新代码请直接使用 settings。
+    """
     def __init__(self):
-        pass
+        self._values = {}
+        for name, env_names, _, _ in _SPEC:
+            for env_name in env_names:
+                self._values[env_name] = str(getattr(settings, name))
 
     def get_env(self, env_var: str, default: str = "") -> str:
-        env_value = os.getenv(env_var, default)
-        if "DIR" in env_var and env_value:
-            # 确保 env_value 不是 None 或空字符串
-            os.makedirs(env_value, exist_ok=True)
-        return env_value
+        if env_var in self._values:
+            return self._values[env_var]
+        return os.environ.get(env_var, default)
 
     def get_path(self, enc_var: str, file_name: str) -> str:
         return os.path.join(self.get_env(enc_var), file_name)
 
-load_dotenv()
-PM = PathManager()
\ No newline at end of file
+PM = PathManager()
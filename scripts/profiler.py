@@ -0,0 +1,168 @@
+import cProfile
+import io
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter, OrderedDict
+from scripts.unique_string_generate import unique_name
+
+
+class SamplingProfiler:
+    """
+    整个进程的采样式 CPU 分析器。
+
+    启动后由一个后台线程定时读取 sys._current_frames()，把各线程的调用栈
+    累计成 flamegraph.pl / speedscope 可直接读取的 folded 格式；未启动时没有任何开销。
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.thread = None
+        self.stop_event = threading.Event()
+        self.stacks = Counter()
+        self.samples = 0
+        self.started_at = None
+        self.interval = 0.01
+
+    @property
+    def running(self) -> bool:
+        return self.thread is not None
+
+    def start(self, interval: float = 0.01) -> bool:
+        with self.lock:
+            if self.thread is not None:
+                return False
+            self.interval = interval
+            self.stacks = Counter()
+            self.samples = 0
+            self.started_at = time.time()
+            self.stop_event.clear()
+            self.thread = threading.Thread(target=self._run, name="cpu-sampler", daemon=True)
+            self.thread.start()
+            return True
+
+    def stop(self) -> str:
+        """停止采样并返回 folded 文本（每行：栈;栈;栈 次数）"""
+        with self.lock:
+            thread, self.thread = self.thread, None
+        if thread is None:
+            return ""
+        self.stop_event.set()
+        thread.join()
+        return "\n".join(f"{stack} {count}" for stack, count in self.stacks.most_common()) + "\n"
+
+    def _run(self):
+        own = threading.get_ident()
+        names = {}
+        while not self.stop_event.wait(self.interval):
+            if len(names) != threading.active_count():
+                names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({code.co_filename}:{frame.f_lineno})")
+                    frame = frame.f_back
+                stack.append(names.get(ident, str(ident)))
+                self.stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+    def status(self) -> dict:
+        return {
+            "running": self.running,
+            "interval": self.interval,
+            "samples": self.samples,
+            "started_at": self.started_at,
+        }
+
+
+class MemoryProfiler:
+    """tracemalloc 快照管理：按需开启，保存有限个快照用于两两对比"""
+
+    def __init__(self, max_snapshots: int = 10):
+        self.lock = threading.Lock()
+        self.snapshots = OrderedDict()
+        self.max_snapshots = max_snapshots
+
+    def start(self, frames: int = 10) -> bool:
+        if tracemalloc.is_tracing():
+            return False
+        tracemalloc.start(frames)
+        return True
+
+    def stop(self):
+        tracemalloc.stop()
+        with self.lock:
+            self.snapshots.clear()
+
+    def snapshot(self) -> dict:
+        if not tracemalloc.is_tracing():
+            raise RuntimeError("tracemalloc 未启动")
+        snap = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        ))
+        snapshot_id = unique_name()
+        current, peak = tracemalloc.get_traced_memory()
+        with self.lock:
+            self.snapshots[snapshot_id] = snap
+            while len(self.snapshots) > self.max_snapshots:
+                self.snapshots.popitem(last=False)
+        return {"snapshot_id": snapshot_id, "traced_current": current, "traced_peak": peak}
+
+    def list(self) -> list:
+        with self.lock:
+            return list(self.snapshots.keys())
+
+    def diff(self, base_id: str, target_id: str = None, top: int = 20, key_type: str = "lineno") -> list:
+        """对比两个快照（target 缺省时取最新的），按增长量排序"""
+        with self.lock:
+            base = self.snapshots.get(base_id)
+            target = self.snapshots.get(target_id) if target_id else next(reversed(self.snapshots.values()), None)
+        if base is None or target is None:
+            raise KeyError("快照不存在")
+        stats = target.compare_to(base, key_type)
+        return [
+            {
+                "where": str(stat.traceback),
+                "size_diff": stat.size_diff,
+                "size": stat.size,
+                "count_diff": stat.count_diff,
+                "count": stat.count,
+            }
+            for stat in stats[:top]
+        ]
+
+
+class RequestProfiler:
+    """单个请求的 cProfile 结果，按 ID 保存最近若干份"""
+
+    def __init__(self, max_results: int = 20):
+        self.lock = threading.Lock()
+        self.busy = threading.Lock()   # cProfile 同一线程同一时间只能有一个
+        self.results = OrderedDict()
+        self.max_results = max_results
+
+    def save(self, profile: cProfile.Profile, label: str, sort: str = "cumulative", limit: int = 60) -> str:
+        buf = io.StringIO()
+        stats = pstats.Stats(profile, stream=buf)
+        stats.sort_stats(sort).print_stats(limit)
+        profile_id = unique_name()
+        with self.lock:
+            self.results[profile_id] = f"{label}\n{buf.getvalue()}"
+            while len(self.results) > self.max_results:
+                self.results.popitem(last=False)
+        return profile_id
+
+    def get(self, profile_id: str) -> str:
+        with self.lock:
+            return self.results.get(profile_id)
+
+
+CPU = SamplingProfiler()
+Memory = MemoryProfiler()
+RequestProfiles = RequestProfiler()
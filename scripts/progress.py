@@ -0,0 +1,221 @@
+import asyncio
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from scripts.logger import logger
+from scripts.settings import settings
+
+
+class ProgressFeed:
+    """
+    跨进程的进度消息表（独立 SQLite 文件）。
+
+    API 与摄取 worker 分开运行时，各进程只往表里追加消息，
+    API 进程的后台线程按 seq 轮询并转发给本进程的 SSE 订阅者。
+    """
+
+    def __init__(self, db_path, keep_seconds: float = 3600):
+        self.keep_seconds = keep_seconds
+        self.db = sqlite3.connect(db_path, check_same_thread=False, timeout=30)
+        self.lock = threading.Lock()
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS feed (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                kind TEXT,
+                data TEXT,
+                created_at REAL
+            )
+        """)
+        self.db.commit()
+        self.appended = 0
+
+    def append(self, kind: str, data: dict):
+        try:
+            with self.lock:
+                self.db.execute("INSERT INTO feed (kind, data, created_at) VALUES (?, ?, ?)",
+                                (kind, json.dumps(data, ensure_ascii=False), time.time()))
+                self.appended += 1
+                # 顺带清理过期消息
+                if self.appended % 200 == 0:
+                    self.db.execute("DELETE FROM feed WHERE created_at < ?", (time.time() - self.keep_seconds,))
+                self.db.commit()
+        except sqlite3.Error as e:
+            logger.error(f"[ProgressFeed] 写入失败: {e}")
+
+    def read_since(self, seq: int, limit: int = 500) -> list:
+        with self.lock:
+            rows = self.db.execute(
+                "SELECT seq, kind, data FROM feed WHERE seq > ? ORDER BY seq LIMIT ?", (seq, limit)
+            ).fetchall()
+        return [(row_seq, kind, json.loads(data)) for row_seq, kind, data in rows]
+
+    def recent_seq(self, seconds: float) -> int:
+        """seconds 秒之前的最后一条 seq，用于 API 启动时回放最近的任务状态"""
+        with self.lock:
+            row = self.db.execute(
+                "SELECT MAX(seq) FROM feed WHERE created_at < ?", (time.time() - seconds,)
+            ).fetchone()
+        return row[0] or 0
+
+
+class ProgressHub:
+    """
+    任务进度与事件变更的发布中心。
+
+    流水线线程调用 job_update / publish，API 的 SSE 连接通过 subscribe 拿到
+    asyncio.Queue，跨线程投递使用 loop.call_soon_threadsafe。
+    attach_feed 之后消息改为写入 ProgressFeed，由 start_relay 的线程统一转发，
+    这样 API 多 worker、独立摄取进程都能看到同一份进度。
+    """
+    _instance = None
+
+    # 任务阶段（按先后顺序）
+    STAGES = (
+        "queued", "stabilizing", "asr_running", "ocr_running", "text_loaded",
+        "ner_running", "ner_done", "db_writing", "event_created",
+        "asr_refining", "event_refined", "failed",
+    )
+    FINAL_STAGES = {"event_created", "event_refined", "failed"}
+
+    def __new__(cls, *a, **kw):
+        if not cls._instance:
+            cls._instance = super().__new__(cls)
+        return cls._instance
+
+    def __init__(self, max_jobs: int = 500, queue_size: int = 1000):
+        if getattr(self, "_initialized", False):
+            return
+        self.lock = threading.Lock()
+        self.jobs = OrderedDict()       # job_id -> 状态字典
+        self.subscribers = {}           # asyncio.Queue -> loop
+        self.max_jobs = max_jobs
+        self.queue_size = queue_size
+        self.seq = 0
+        self.feed = None
+        self.relay = None
+        self._initialized = True
+
+    # ---------------- 任务状态 ----------------
+
+    def job_update(self, job_id: str, stage: str, **info) -> dict:
+        """记录任务阶段变化并推送给订阅者"""
+        if stage not in self.STAGES:
+            raise ValueError(f"未知的任务阶段: {stage}")
+        now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        with self.lock:
+            job = self.jobs.pop(job_id, None) or {"job_id": job_id, "created_at": now, "history": []}
+            job.update(info)
+            job["stage"] = stage
+            job["updated_at"] = now
+            job["done"] = stage in self.FINAL_STAGES
+            job["history"].append({"stage": stage, "at": now})
+            self.jobs[job_id] = job
+            # 只保留最近的任务
+            while len(self.jobs) > self.max_jobs:
+                self.jobs.popitem(last=False)
+            snapshot = dict(job, history=list(job["history"]))
+        self.publish("job", snapshot)
+        return snapshot
+
+    def get_job(self, job_id: str) -> dict:
+        with self.lock:
+            job = self.jobs.get(job_id)
+            return dict(job, history=list(job["history"])) if job else None
+
+    def list_jobs(self, only_active: bool = False) -> list:
+        with self.lock:
+            jobs = [dict(j, history=list(j["history"])) for j in self.jobs.values()]
+        if only_active:
+            jobs = [j for j in jobs if not j["done"]]
+        return jobs
+
+    # ---------------- 发布 / 订阅 ----------------
+
+    def publish(self, kind: str, data: dict):
+        """向所有订阅者推送一条消息，kind 为 job / event"""
+        if self.feed is not None:
+            self.feed.append(kind, data)
+            return
+        self._deliver(kind, data)
+
+    def _deliver(self, kind: str, data: dict):
+        with self.lock:
+            self.seq += 1
+            message = {"id": self.seq, "kind": kind, "data": data}
+            subscribers = list(self.subscribers.items())
+
+        for queue, loop in subscribers:
+            try:
+                loop.call_soon_threadsafe(self._put, queue, message)
+            except RuntimeError:
+                # 事件循环已关闭，移除订阅
+                self.unsubscribe(queue)
+
+    @staticmethod
+    def _put(queue: asyncio.Queue, message: dict):
+        try:
+            queue.put_nowait(message)
+        except asyncio.QueueFull:
+            logger.warning("[ProgressHub] 订阅队列已满，丢弃消息")
+
+    def subscribe(self) -> asyncio.Queue:
+        """需在事件循环内调用"""
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        with self.lock:
+            self.subscribers[queue] = asyncio.get_running_loop()
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        with self.lock:
+            self.subscribers.pop(queue, None)
+
+    # ---------------- 跨进程 ----------------
+
+    def attach_feed(self, db_path=None):
+        """之后的消息写入共享的消息表（多进程部署时调用，重复调用无副作用）"""
+        with self.lock:
+            if self.feed is None:
+                self.feed = ProgressFeed(db_path or settings.progress_db_path)
+        return self.feed
+
+    def start_relay(self, interval: float = 0.5, replay_seconds: float = 3600):
+        """启动后台线程，把消息表中的新消息转发给本进程的订阅者（API 进程调用）"""
+        feed = self.attach_feed()
+        with self.lock:
+            if self.relay is not None:
+                return
+            self.relay = threading.Thread(
+                target=self._relay_loop, args=(feed, interval, replay_seconds),
+                name="progress-relay", daemon=True,
+            )
+        self.relay.start()
+
+    def _relay_loop(self, feed: ProgressFeed, interval: float, replay_seconds: float):
+        # 先回放最近的消息，重建任务列表（此时还没有订阅者）
+        last = feed.recent_seq(replay_seconds)
+        while True:
+            try:
+                messages = feed.read_since(last)
+            except sqlite3.Error as e:
+                logger.error(f"[ProgressHub] 读取消息表失败: {e}")
+                messages = []
+            for last, kind, data in messages:
+                if kind == "job":
+                    self._store_job(data)
+                self._deliver(kind, data)
+            if not messages:
+                time.sleep(interval)
+
+    def _store_job(self, snapshot: dict):
+        with self.lock:
+            self.jobs.pop(snapshot["job_id"], None)
+            self.jobs[snapshot["job_id"]] = snapshot
+            while len(self.jobs) > self.max_jobs:
+                self.jobs.popitem(last=False)
+
+
+Progress = ProgressHub()
@@ -0,0 +1,225 @@
+import os
+from dataclasses import dataclass, fields
+from pathlib import Path
+from dotenv import load_dotenv
+
+# 项目根目录，相对路径都以此为基准（不再依赖启动时的工作目录）
+ROOT = Path(__file__).resolve().parent.parent
+
+_TRUE = {"1", "true", "yes", "on"}
+_FALSE = {"0", "false", "no", "off", ""}
+
+
+@dataclass(frozen=True)
+class Settings:
+    """
+    运行配置：启动时从 .env 与环境变量读取并校验一次，之后只读。
+    路径字段均为绝对 Path，*_dir 字段对应的目录在加载时创建。
+    """
+    # ---- 模型 ----
+    ocr_det_path: Path
+    ocr_rec_path: Path
+    ocr_det_onnx_path: Path
+    ocr_rec_onnx_path: Path
+    ocr_rec_dict_path: Path
+    asr_model_path: Path
+    asr_fast_model_path: Path
+    asr_ct2_model: Path
+    asr_fast_ct2_model: Path
+    yolov5_other_path: Path
+    yolov5_pt_path: Path
+    templates_path: Path
+
+    # ---- 数据文件 ----
+    events_db_path: Path
+    trace_db_path: Path
+    progress_db_path: Path
+    bbc_json_path: Path
+
+    # ---- 目录 ----
+    userdata_dir: Path
+    upload_dir: Path
+    storage_dir: Path
+    extracted_dir: Path
+    log_dir: Path
+    bbc_dir: Path
+    archive_dir: Path
+
+    # ---- 通用 ----
+    encoding: str
+    cookie_name: str
+    password: str
+    write_extract_files: bool
+
+    # ---- ASR ----
+    asr_backend: str
+    asr_compute_type: str
+    asr_tiered: bool
+
+    # ---- 启动 / 多进程 ----
+    preload_models: bool
+    progress_feed: bool
+    claim_timeout: float
+    claim_max_attempts: int
+    claim_retry_delay: float
+
+    # ---- 保留与归档 ----
+    retention_days: int
+    retention_interval: float
+
+    # ---- 周期事件 ----
+    recurrence_horizon_days: int
+    recurrence_interval: float
+
+    # ---- OCR ----
+    ocr_backend: str
+    ocr_onnx_threads: int
+    ocr_preprocess: bool
+    ocr_target_text_px: float
+    ocr_min_side: int
+    ocr_max_side: int
+    ocr_tile_size: int
+    ocr_grayscale: str
+
+    # ---- 图片打标签（YOLO） ----
+    tagging: bool
+    tag_batch_size: int
+    tag_batch_wait: float
+    tag_min_confidence: float
+    tag_img_size: int
+
+    # ---- CPU 线程预算 ----
+    cpu_threads: int
+    ingest_workers: int
+    asr_threads: int
+    ocr_threads: int
+    tag_threads: int
+
+    # ---- 日志 ----
+    log_level: str
+    log_json: bool
+    log_max_bytes: int
+    log_queue_size: int
+    log_rate_burst: int
+    log_rate_window: float
+
+    def dirs(self) -> list:
+        return [getattr(self, f.name) for f in fields(self) if f.name.endswith("_dir")]
+
+    @classmethod
+    def load(cls, env_file: Path = None) -> "Settings":
+        """读取 .env（不覆盖已有环境变量）并按 _SPEC 转换、校验"""
+        load_dotenv(env_file or ROOT / ".env")
+        values = {}
+        for name, env_names, kind, default in _SPEC:
+            raw = next((os.environ[e] for e in env_names if e in os.environ), default)
+            try:
+                values[name] = _convert(raw, kind)
+            except ValueError as e:
+                raise ValueError(f"[Settings] 配置项 {env_names[0]}={raw!r} 无效: {e}") from None
+        settings = cls(**values)
+        for d in settings.dirs():
+            d.mkdir(parents=True, exist_ok=True)
+        return settings
+
+
+def _convert(raw: str, kind):
+    if kind == "path":
+        path = Path(raw).expanduser()
+        return (path if path.is_absolute() else ROOT / path).resolve()
+    if kind is bool:
+        value = str(raw).strip().lower()
+        if value in _TRUE:
+            return True
+        if value in _FALSE:
+            return False
+        raise ValueError("应为 0/1/true/false")
+    if kind is int:
+        return int(raw)
+    if kind is float:
+        return float(raw)
+    if not raw and kind == "required":
+        raise ValueError("不能为空")
+    return str(raw)
+
+
+# (字段名, 环境变量名（首个为正式名称，其余为兼容旧拼写）, 类型, 默认值)
+_SPEC = [
+    ("ocr_det_path", ("OCR_DET_PATH",), "path", "resources/ch_PP-OCRv3_det_infer"),
+    ("ocr_rec_path", ("OCR_REC_PATH",), "path", "resources/ch_PP-OCRv3_rec_infer"),
+    ("ocr_det_onnx_path", ("OCR_DET_ONNX_PATH",), "path", "resources/ch_PP-OCRv3_det_infer.onnx"),
+    ("ocr_rec_onnx_path", ("OCR_REC_ONNX_PATH",), "path", "resources/ch_PP-OCRv3_rec_infer.onnx"),
+    ("ocr_rec_dict_path", ("OCR_REC_DICT_PATH",), "path", "resources/ppocr_keys_v1.txt"),
+    ("asr_model_path", ("ASR_MODEL_PATH",), "path", "resources/asrModel/small.pt"),
+    ("asr_fast_model_path", ("ASR_FAST_MODEL_PATH",), "path", "resources/asrModel/tiny.pt"),
+    ("asr_ct2_model", ("ASR_CT2_MODEL",), "path", "resources/asrModel/faster-whisper-small"),
+    ("asr_fast_ct2_model", ("ASR_FAST_CT2_MODEL",), "path", "resources/asrModel/faster-whisper-tiny"),
+    ("yolov5_other_path", ("YOLOV5_OTHER_PATH",), "path", "resources/yolo5/yolov5"),
+    ("yolov5_pt_path", ("YOLOV5_PT_PATH",), "path", "resources/yolo5/yolov5s.pt"),
+    ("templates_path", ("TEMPLATES_PATH",), "path", "resources/templates"),
+
+    ("events_db_path", ("EVENTS_DBNEW_PATH",), "path", "userdata/events_data_1021.db"),
+    ("trace_db_path", ("TRACE_DB_PATH",), "path", "userdata/traces.db"),
+    ("progress_db_path", ("PROGRESS_DB_PATH",), "path", "userdata/progress.db"),
+    ("bbc_json_path", ("BBC_JSON_PATH",), "path", "userdata/BBC/history.json"),
+
+    ("userdata_dir", ("USERDATA_DIR_PATH", "UAERDATA_DIR_PATH"), "path", "userdata"),
+    ("upload_dir", ("UPLOAD_DIR_PATH",), "path", "userdata/uploads"),
+    ("storage_dir", ("STORAGE_DIR_PATH",), "path", "userdata/storage"),
+    ("extracted_dir", ("EXTRACTED_DIR_PATH",), "path", "userdata/extract"),
+    ("log_dir", ("LOG_DIR_PATH",), "path", "userdata/logs"),
+    ("bbc_dir", ("BBC_DIR_PATH",), "path", "userdata/BBC"),
+    ("archive_dir", ("ARCHIVE_DIR_PATH",), "path", "userdata/archive"),
+
+    ("encoding", ("ENCODING",), str, "utf-8"),
+    ("cookie_name", ("COOKIE_NAME",), str, "auth"),
+    ("password", ("PASSWORD",), "required", ""),
+    ("write_extract_files", ("WRITE_EXTRACT_FILES",), bool, "0"),
+
+    ("asr_backend", ("ASR_BACKEND",), str, "whisper"),
+    ("asr_compute_type", ("ASR_COMPUTE_TYPE",), str, "int8"),
+    ("asr_tiered", ("ASR_TIERED",), bool, "0"),
+
+    ("preload_models", ("PRELOAD_MODELS",), bool, "1"),
+    ("progress_feed", ("PROGRESS_FEED",), bool, "0"),
+    ("claim_timeout", ("CLAIM_TIMEOUT",), float, "3600"),
+    ("claim_max_attempts", ("CLAIM_MAX_ATTEMPTS",), int, "3"),
+    ("claim_retry_delay", ("CLAIM_RETRY_DELAY",), float, "300"),
+
+    ("retention_days", ("RETENTION_DAYS",), int, "0"),
+    ("retention_interval", ("RETENTION_INTERVAL",), float, "86400"),
+
+    ("recurrence_horizon_days", ("RECURRENCE_HORIZON_DAYS",), int, "90"),
+    ("recurrence_interval", ("RECURRENCE_INTERVAL",), float, "86400"),
+
+    ("ocr_backend", ("OCR_BACKEND",), str, "paddle"),
+    ("ocr_onnx_threads", ("OCR_ONNX_THREADS",), int, "0"),
+    ("ocr_preprocess", ("OCR_PREPROCESS",), bool, "1"),
+    ("ocr_target_text_px", ("OCR_TARGET_TEXT_PX",), float, "32"),
+    ("ocr_min_side", ("OCR_MIN_SIDE",), int, "960"),
+    ("ocr_max_side", ("OCR_MAX_SIDE",), int, "1920"),
+    ("ocr_tile_size", ("OCR_TILE_SIZE",), int, "0"),
+    ("ocr_grayscale", ("OCR_GRAYSCALE",), str, "auto"),
+
+    ("tagging", ("TAGGING",), bool, "0"),
+    ("tag_batch_size", ("TAG_BATCH_SIZE",), int, "8"),
+    ("tag_batch_wait", ("TAG_BATCH_WAIT",), float, "0.05"),
+    ("tag_min_confidence", ("TAG_MIN_CONFIDENCE",), float, "0.4"),
+    ("tag_img_size", ("TAG_IMG_SIZE",), int, "640"),
+
+    ("cpu_threads", ("CPU_THREADS",), int, "0"),
+    ("ingest_workers", ("INGEST_WORKERS",), int, "1"),
+    ("asr_threads", ("ASR_THREADS",), int, "0"),
+    ("ocr_threads", ("OCR_THREADS",), int, "0"),
+    ("tag_threads", ("TAG_THREADS",), int, "0"),
+
+    ("log_level", ("LOG_LEVEL",), str, "INFO"),
+    ("log_json", ("LOG_JSON",), bool, "0"),
+    ("log_max_bytes", ("LOG_MAX_BYTES",), int, str(20 * 1024 * 1024)),
+    ("log_queue_size", ("LOG_QUEUE_SIZE",), int, "10000"),
+    ("log_rate_burst", ("LOG_RATE_BURST",), int, "20"),
+    ("log_rate_window", ("LOG_RATE_WINDOW",), float, "10"),
+]
+
+
+settings = Settings.load()
@@ -0,0 +1,93 @@
+"""
+存储布局：上传目录只作为待处理的收件箱（平铺、不递归监控），
+原件与派生文件按日期分片存放：
+
+    STORAGE_DIR_PATH/YYYY/MM/DD/<name>      处理完成的原件、仅上传不解析的文件
+    EXTRACTED_DIR_PATH/YYYY/MM/DD/<name>    抽取文本副本（WRITE_EXTRACT_FILES=1 时）
+    STORAGE_DIR_PATH/failed/YYYY/MM/DD/<name>  重试 CLAIM_MAX_ATTEMPTS 次仍失败的文件
+
+unique_name() 以 Unix 时间戳开头，分片日期直接由文件名得出，按名查找无需遍历目录。
+超过保留期的原件由 app.retention 打包归档。
+"""
+import shutil
+from datetime import datetime
+from pathlib import Path
+from .settings import settings
+from .logger import logger
+
+
+def uploaded_at(name: str) -> datetime:
+    """由 unique_name 的时间戳前缀得出上传时刻；不是 unique_name 生成的名字时取当前时间"""
+    stamp = Path(name).name.split("_", 1)[0]
+    try:
+        return datetime.fromtimestamp(int(stamp))
+    except (ValueError, OverflowError, OSError):
+        return datetime.now()
+
+
+def shard_of(name: str) -> str:
+    """文件名对应的分片目录 YYYY/MM/DD"""
+    return uploaded_at(name).strftime("%Y/%m/%d")
+
+
+def sharded_path(root: Path, name: str) -> Path:
+    """root 下按分片存放 name 的完整路径，分片目录不存在时创建"""
+    folder = root / shard_of(name)
+    folder.mkdir(parents=True, exist_ok=True)
+    return folder / Path(name).name
+
+
+def settle_original(path) -> str:
+    """
+    处理完成后把原件从收件箱移到存储分片，返回新路径；
+    不在收件箱中（直接调用流水线）或移动失败时返回原路径。
+    """
+    path = Path(path)
+    if path.parent.resolve() != settings.upload_dir.resolve():
+        return str(path)
+    dst = sharded_path(settings.storage_dir, path.name)
+    try:
+        shutil.move(str(path), str(dst))
+    except OSError as e:
+        logger.error(f"[storage] 移动原件失败 {path} -> {dst}: {e}")
+        return str(path)
+    return str(dst)
+
+
+def quarantine(path) -> str:
+    """重试次数用尽的文件移出收件箱，避免失败文件在收件箱中堆积；返回新路径"""
+    path = Path(path)
+    if not path.is_file() or path.parent.resolve() != settings.upload_dir.resolve():
+        return str(path)
+    dst = sharded_path(settings.storage_dir / "failed", path.name)
+    try:
+        shutil.move(str(path), str(dst))
+    except OSError as e:
+        logger.error(f"[storage] 移出失败文件失败 {path} -> {dst}: {e}")
+        return str(path)
+    logger.warning(f"[storage] 文件多次处理失败，已移到 {dst}")
+    return str(dst)
+
+
+def candidates(name: str) -> list:
+    """文件名可能所在的位置：收件箱、存储分片、旧版平铺的存储目录"""
+    name = Path(name).name
+    return [
+        settings.upload_dir / name,
+        settings.storage_dir / shard_of(name) / name,
+        settings.storage_dir / name,
+    ]
+
+
+def locate(name: str):
+    """按文件名查找热数据，找不到（可能已归档）返回 None"""
+    return next((path for path in candidates(name) if path.is_file()), None)
+
+
+def is_managed(path) -> bool:
+    """是否位于本程序管理的收件箱 / 存储 / 抽取目录中（只有这些文件会被归档）"""
+    path = Path(path).resolve()
+    for root in (settings.upload_dir, settings.storage_dir, settings.extracted_dir):
+        if path.is_relative_to(root.resolve()):
+            return True
+    return False
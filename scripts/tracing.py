@@ -0,0 +1,223 @@
+import atexit
+import json
+import queue
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from scripts.logger import logger
+from scripts.settings import settings
+
+# 当前线程/协程所属的 trace
+_current_trace = ContextVar("trace_id", default=None)
+
+# span 先进入内存队列，由后台线程每 SPAN_FLUSH_INTERVAL 秒或攒够 SPAN_BATCH 条时一次事务写入；
+# 队列满时丢弃新的 span，trace 不能拖慢摄取
+SPAN_QUEUE_SIZE = 10000
+SPAN_BATCH = 500
+SPAN_FLUSH_INTERVAL = 1.0
+
+
+class TraceStore:
+    """
+    本地 trace 存储（独立 SQLite 文件，避免与事件库争用）。
+
+    一个上传文件对应一条 trace，各处理阶段记录为 span；
+    事件写入后把 event_id 关联到 trace，便于按事件回看耗时。
+    span 由后台线程批量写入，热路径上只有一次入队。
+    """
+    _instance = None
+
+    def __new__(cls, *a, **kw):
+        if not cls._instance:
+            cls._instance = super().__new__(cls)
+        return cls._instance
+
+    def __init__(self):
+        if getattr(self, "_initialized", False):
+            return
+        db_path = settings.trace_db_path
+        self.db = sqlite3.connect(db_path, check_same_thread=False)
+        self.lock = threading.Lock()
+        self.db.executescript("""
+            CREATE TABLE IF NOT EXISTS traces (
+                trace_id TEXT PRIMARY KEY,
+                file TEXT,
+                event_id INTEGER,
+                created_at REAL
+            );
+            CREATE INDEX IF NOT EXISTS idx_traces_file ON traces(file);
+            CREATE INDEX IF NOT EXISTS idx_traces_event ON traces(event_id);
+            CREATE TABLE IF NOT EXISTS spans (
+                trace_id TEXT,
+                name TEXT,
+                start REAL,
+                duration REAL,
+                status TEXT,
+                thread TEXT,
+                attrs TEXT
+            );
+            CREATE INDEX IF NOT EXISTS idx_spans_trace ON spans(trace_id);
+        """)
+        self.db.commit()
+        self.pending = queue.Queue(maxsize=SPAN_QUEUE_SIZE)
+        self.dropped = 0
+        threading.Thread(target=self._writer_loop, daemon=True, name="trace-writer").start()
+        atexit.register(self.flush)
+        self._initialized = True
+
+    def _write(self, sql: str, params: tuple):
+        try:
+            with self.lock:
+                self.db.execute(sql, params)
+                self.db.commit()
+        except sqlite3.Error as e:
+            # trace 失败不能影响业务流程
+            logger.error(f"[TraceStore] 写入失败: {e}")
+
+    def _write_spans(self, batch: list):
+        if not batch:
+            return
+        try:
+            with self.lock:
+                self.db.executemany(
+                    "INSERT INTO spans (trace_id, name, start, duration, status, thread, attrs) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)", batch,
+                )
+                self.db.commit()
+        except sqlite3.Error as e:
+            logger.error(f"[TraceStore] 批量写入 {len(batch)} 个 span 失败: {e}")
+
+    def _drain(self, batch: list, limit: int = SPAN_BATCH) -> list:
+        while len(batch) < limit:
+            try:
+                batch.append(self.pending.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _writer_loop(self):
+        while True:
+            batch = [self.pending.get()]
+            # 攒一段时间再写，一次提交覆盖一个文件的多个阶段
+            deadline = time.monotonic() + SPAN_FLUSH_INTERVAL
+            while len(batch) < SPAN_BATCH:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self.pending.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._write_spans(batch)
+
+    def flush(self):
+        """立即写入队列中的 span（查询前、进程退出时）"""
+        while batch := self._drain([]):
+            self._write_spans(batch)
+
+    # ---------------- trace ----------------
+
+    def start_trace(self, file: str) -> str:
+        trace_id = uuid.uuid4().hex
+        self._write("INSERT INTO traces (trace_id, file, created_at) VALUES (?, ?, ?)",
+                    (trace_id, file, time.time()))
+        return trace_id
+
+    def trace_for_file(self, file: str) -> str:
+        """按文件名找到上传时分配的 trace，监控目录里直接放入的文件则新建一条"""
+        with self.lock:
+            row = self.db.execute(
+                "SELECT trace_id FROM traces WHERE file=? ORDER BY created_at DESC LIMIT 1", (file,)
+            ).fetchone()
+        return row[0] if row else self.start_trace(file)
+
+    def link_event(self, trace_id: str, event_id: int):
+        self._write("UPDATE traces SET event_id=? WHERE trace_id=?", (event_id, trace_id))
+
+    def record_span(self, trace_id: str, name: str, start: float, duration: float,
+                    status: str = "ok", attrs: dict = None):
+        row = (trace_id, name, start, duration, status, threading.current_thread().name,
+               json.dumps(attrs or {}, ensure_ascii=False))
+        try:
+            self.pending.put_nowait(row)
+        except queue.Full:
+            self.dropped += 1
+            if self.dropped % 1000 == 1:
+                logger.warning(f"[TraceStore] span 队列已满，已丢弃 {self.dropped} 个")
+
+    # ---------------- 查询 ----------------
+
+    def timeline(self, event_id: int) -> dict:
+        """返回某事件对应 trace 的全部 span，按开始时间排序"""
+        self.flush()
+        with self.lock:
+            row = self.db.execute(
+                "SELECT trace_id, file, created_at FROM traces WHERE event_id=? LIMIT 1", (event_id,)
+            ).fetchone()
+            if not row:
+                return None
+            spans = self.db.execute(
+                "SELECT name, start, duration, status, thread, attrs FROM spans WHERE trace_id=? ORDER BY start",
+                (row[0],),
+            ).fetchall()
+
+        origin = min([row[2]] + [s[1] for s in spans])
+        total = max([s[1] + s[2] for s in spans], default=origin) - origin
+        return {
+            "trace_id": row[0],
+            "file": row[1],
+            "event_id": event_id,
+            "total": total,
+            "spans": [
+                {
+                    "name": name,
+                    "offset": start - origin,
+                    "duration": duration,
+                    "status": status,
+                    "thread": thread,
+                    "attrs": json.loads(attrs) if attrs else {},
+                }
+                for name, start, duration, status, thread, attrs in spans
+            ],
+        }
+
+
+# ---------------- 上下文辅助 ----------------
+
+def current_trace() -> str:
+    return _current_trace.get()
+
+
+@contextmanager
+def bind(trace_id: str):
+    """在当前上下文中绑定 trace，后续 span 自动归属该 trace"""
+    token = _current_trace.set(trace_id)
+    try:
+        yield trace_id
+    finally:
+        _current_trace.reset(token)
+
+
+@contextmanager
+def span(name: str, **attrs):
+    """记录一个阶段；当前没有 trace 时直接跳过"""
+    trace_id = _current_trace.get()
+    if trace_id is None:
+        yield
+        return
+    start_wall = time.time()
+    start = time.perf_counter()
+    status = "ok"
+    try:
+        yield
+    except BaseException:
+        status = "error"
+        raise
+    finally:
+        Tracer.record_span(trace_id, name, start_wall, time.perf_counter() - start, status, attrs)
+
+
+Tracer = TraceStore()
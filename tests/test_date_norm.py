@@ -0,0 +1,80 @@
+"""app.date_norm 的组合表达与区间：基准时刻固定为 2025-09-30 10:00（周二）"""
+from datetime import datetime
+
+from app.date_norm import normalize
+
+BASE = datetime(2025, 9, 30, 10)
+
+
+def test_year_word_with_month_day():
+    assert normalize("明年3月5日体检", BASE) == ("2026-03-05 00:00:00", "2026-03-06 00:00:00")
+    assert normalize("今年12月1日", BASE) == ("2025-12-01 00:00:00", "2025-12-02 00:00:00")
+
+
+def test_month_word_with_day():
+    assert normalize("本月25日还款", BASE) == ("2025-09-25 00:00:00", "2025-09-26 00:00:00")
+    assert normalize("下个月3号交房租", BASE) == ("2025-10-03 00:00:00", "2025-10-04 00:00:00")
+    # 11 月没有 31 号
+    assert normalize("下下个月31号", BASE) == (None, None)
+
+
+def test_bare_year_and_month_words():
+    assert normalize("明年", BASE) == ("2026-09-30 00:00:00", "2026-10-01 00:00:00")
+    assert normalize("下个月", BASE) == ("2025-10-30 00:00:00", "2025-10-31 00:00:00")
+
+
+def test_weekday_range_end_follows_start_week():
+    assert normalize("下周一至周三培训", BASE) == ("2025-10-06 00:00:00", "2025-10-09 00:00:00")
+    assert normalize("周五到周一", BASE) == ("2025-10-03 00:00:00", "2025-10-07 00:00:00")
+    # 带前缀的结束端仍以基准时刻为准
+    assert normalize("周五到下周二出差", BASE) == ("2025-10-03 00:00:00", "2025-10-08 00:00:00")
+
+
+def test_date_ranges():
+    assert normalize("10月1日至7日国庆", BASE) == ("2025-10-01 00:00:00", "2025-10-08 00:00:00")
+    assert normalize("12月30日至1月3日出差", BASE) == ("2025-12-30 00:00:00", "2026-01-04 00:00:00")
+    assert normalize("明年3月5日至8日", BASE) == ("2026-03-05 00:00:00", "2026-03-09 00:00:00")
+
+
+def test_evening_periods():
+    assert normalize("今晚8点吃饭", BASE) == ("2025-09-30 20:00:00", "2025-09-30 20:00:00")
+    assert normalize("明天晚9点半", BASE) == ("2025-10-01 21:30:00", "2025-10-01 21:30:00")
+
+
+def test_time_ranges():
+    assert normalize("下周三下午3点到5点在会议室", BASE) == ("2025-10-08 15:00:00", "2025-10-08 17:00:00")
+    assert normalize("晚上10点到凌晨2点值班", BASE) == ("2025-09-30 22:00:00", "2025-10-01 02:00:00")
+
+
+def test_numbered_places_are_not_days():
+    assert normalize("下午3点在3号楼开会", BASE) == ("2025-09-30 15:00:00", "2025-09-30 15:00:00")
+    assert normalize("坐10号线去公司", BASE) == (None, None)
+    assert normalize("5号房间集合", BASE) == (None, None)
+    assert normalize("3号楼5号开会", BASE) == ("2025-09-05 00:00:00", "2025-09-06 00:00:00")
+
+
+def test_counts_are_not_month_day():
+    assert normalize("3-5人小组讨论", BASE) == (None, None)
+    assert normalize("每天2-3次", BASE) == (None, None)
+    assert normalize("10/15 出发", BASE) == ("2025-10-15 00:00:00", "2025-10-16 00:00:00")
+
+
+def test_midnight_rolls_to_next_day():
+    assert normalize("晚上12点上线", BASE) == ("2025-10-01 00:00:00", "2025-10-01 00:00:00")
+    assert normalize("今天24点截止", BASE) == ("2025-10-01 00:00:00", "2025-10-01 00:00:00")
+    assert normalize("中午12点吃饭", BASE) == ("2025-09-30 12:00:00", "2025-09-30 12:00:00")
+    assert normalize("晚上10点到12点", BASE) == ("2025-09-30 22:00:00", "2025-10-01 00:00:00")
+
+
+def test_day_spans():
+    assert normalize("1-3号出差", BASE) == ("2025-09-01 00:00:00", "2025-09-04 00:00:00")
+    assert normalize("10月1-3日休假", BASE) == ("2025-10-01 00:00:00", "2025-10-04 00:00:00")
+    # 跨月
+    assert normalize("30-2号出差", BASE) == ("2025-09-30 00:00:00", "2025-10-03 00:00:00")
+
+
+def test_datetime_ranges_across_days():
+    assert normalize("9月30日 10:00至10月2日 12:00", BASE) == ("2025-09-30 10:00:00", "2025-10-02 12:00:00")
+    assert normalize("9月30日下午3点至10月1日上午9点", BASE) == ("2025-09-30 15:00:00", "2025-10-01 09:00:00")
+    # 只有开始端带时间时结束日期整天有效
+    assert normalize("9月30日 10:00至10月2日", BASE) == ("2025-09-30 10:00:00", "2025-10-03 00:00:00")